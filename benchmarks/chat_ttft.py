@@ -0,0 +1,89 @@
+"""
+Benchmark of the time to first token of a chat turn.
+
+Runs the same query through ``generate_chat_response`` with the
+pre-generation phase (history persistence and fetch, retrieval) run in
+sequence and run concurrently, and reports the time from the start of the
+turn to its first streamed token.
+
+Run from the repository root against a running database and Ollama; every
+turn is stored, so use a scratch chat session:
+
+    python -m benchmarks.chat_ttft --user-id <uuid> --session-id <uuid> \\
+        --llm-type rag --rag-system-id <uuid> --requests 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import src.llm._base_llm as base_llm
+from src.llm._llm_factory import create_llm
+from src.llm._llm_setup import setup_llm
+from src.llm._memory_extractor import memory_extractor
+from src.llm._summarizer import summarizer
+from src.operations._chat_history import setup_chat_history
+from src.operations._chat_writer import chat_writer
+from src.operations._db_setup import close_db, setup_langgraph_db, setup_sqlalchemy
+from src.operations._memory import memory_service
+from src.operations._vector_db import setup_vector_db
+from src.schema._llm import LLMType
+
+
+def _report(name: str, timings: list[float]) -> None:
+    timings = sorted(timings)
+    p95 = timings[int(0.95 * (len(timings) - 1))]
+    print(f"  {name:<12} mean {statistics.mean(timings):8.1f} ms   p95 {p95:8.1f} ms")
+
+
+async def _first_token_ms(args: argparse.Namespace) -> float:
+    start = time.perf_counter()
+    llm, config = await create_llm(
+        llm_type=LLMType(args.llm_type),
+        user_id=args.user_id,
+        session_id=args.session_id,
+        rag_system_id=args.rag_system_id,
+    )
+
+    first_token_ms = None
+    async for _ in llm.generate_chat_response(user_query=args.query, config=config, stream_format="ndjson"):
+        # the first frame of an ndjson stream is the first token (no progress frames asked for)
+        if first_token_ms is None:
+            first_token_ms = (time.perf_counter() - start) * 1000
+    return first_token_ms
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=uuid.UUID, required=True)
+    parser.add_argument("--session-id", type=uuid.UUID, required=True)
+    parser.add_argument("--llm-type", default="simple", help="LLM type of the session (e.g. simple, rag)")
+    parser.add_argument("--rag-system-id", type=uuid.UUID, default=None)
+    parser.add_argument("--query", default="سلام، خلاصه‌ای از موضوع اصلی را بگو.")
+    parser.add_argument("--requests", type=int, default=20, help="Chat turns per mode")
+    args = parser.parse_args()
+
+    setup_llm()
+    await setup_langgraph_db()
+    await setup_sqlalchemy()
+    await setup_chat_history()
+    await setup_vector_db()
+    try:
+        # one untimed turn loads the models and the session window
+        await _first_token_ms(args)
+
+        for name, concurrent in (("sequential", False), ("concurrent", True)):
+            base_llm.CONCURRENT_PRE_GENERATION = concurrent
+            _report(name, [await _first_token_ms(args) for _ in range(args.requests)])
+    finally:
+        await summarizer.close()
+        await memory_extractor.close()
+        await memory_service.close()
+        await chat_writer.close()
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+"""
+Benchmark of the parallel extraction of PDF and DOCX datasets.
+
+Generates a synthetic PDF (one text page per page) and a synthetic DOCX
+(paragraphs split into sections), extracts them with
+``DocumentService.aiter_documents`` with 1, 2, 4, ... extraction
+processes up to the number of cores, and reports pages/sec and
+paragraphs/sec by worker count. One process is the sequential,
+thread-based path.
+
+Run from the repository root (no database or model access):
+
+    python -m benchmarks.document_extraction --pages 400 --paragraphs 40000
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+from src.operations._document_hadling import DocumentService
+from src.schema._admin import AdminUploadedDatasetType
+
+
+_WORDS = (
+    "retrieval augmented generation splits each uploaded document into chunks "
+    "that are embedded and stored with their page or section number"
+).split()
+
+
+def _sentence(i: int, words: int = 16) -> str:
+    return " ".join(_WORDS[(i + k) % len(_WORDS)] for k in range(words))
+
+
+def make_pdf(pages: int, lines_per_page: int = 40) -> bytes:
+    """Build a PDF with ``pages`` pages of Helvetica text."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # page tree, filled in once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page in range(pages):
+        lines = "".join(
+            f"({_sentence(page * lines_per_page + line)}) Tj T* " for line in range(lines_per_page)
+        )
+        stream = f"BT /F1 10 Tf 12 TL 50 780 Td {lines}ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def make_docx(paragraphs: int, paragraphs_per_section: int = 500) -> bytes:
+    """Build a DOCX with ``paragraphs`` paragraphs, a section break every ``paragraphs_per_section``."""
+    body = []
+    for i in range(paragraphs):
+        section_break = "<w:pPr><w:sectPr/></w:pPr>" if (i + 1) % paragraphs_per_section == 0 else ""
+        body.append(f"<w:p>{section_break}<w:r><w:t>{escape(_sentence(i, words=40))}</w:t></w:r></w:p>")
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f'<w:body>{"".join(body)}<w:sectPr/></w:body></w:document>'
+    )
+
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zipf:
+        zipf.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '</Types>'
+        ))
+        zipf.writestr("word/document.xml", document)
+    return out.getvalue()
+
+
+async def _extract(service: DocumentService, content: bytes, file_format: AdminUploadedDatasetType) -> tuple[float, int]:
+    start = time.perf_counter()
+    chunks = 0
+    async for _ in service.aiter_documents(file_content=content, file_format=file_format):
+        chunks += 1
+    return time.perf_counter() - start, chunks
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=400, help="Pages of the synthetic PDF")
+    parser.add_argument("--paragraphs", type=int, default=40000, help="Paragraphs of the synthetic DOCX")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    corpus = [
+        ("pdf", AdminUploadedDatasetType.PDF, make_pdf(args.pages), args.pages, "pages"),
+        ("docx", AdminUploadedDatasetType.WORD, make_docx(args.paragraphs), args.paragraphs, "paragraphs"),
+    ]
+    workers = [1]
+    while workers[-1] * 2 <= args.max_workers:
+        workers.append(workers[-1] * 2)
+    if workers[-1] != args.max_workers:
+        workers.append(args.max_workers)
+
+    for name, file_format, content, units, unit_name in corpus:
+        print(f"{name}: {units} {unit_name}, {len(content) / 1e6:.1f} MB")
+        baseline = None
+        for n in workers:
+            service = DocumentService()
+            service.processes = n
+            # every size goes through the pool, so the run measures the scaling alone
+            service.parallel_min_bytes = 0
+            try:
+                if n > 1:
+                    # untimed run, so process start-up is not counted
+                    await _extract(service, content, file_format)
+                elapsed, chunks = await _extract(service, content, file_format)
+            finally:
+                service.close()
+            baseline = baseline or elapsed
+            print(
+                f"  {n:>3} workers   {units / elapsed:10.1f} {unit_name}/s   "
+                f"{chunks:>7} chunks   x{baseline / elapsed:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
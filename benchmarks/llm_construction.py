@@ -0,0 +1,63 @@
+"""
+Benchmark of the per-request LLM construction overhead.
+
+Compares building and compiling the LangGraph graph on every request
+(what ``create_llm`` used to do) with fetching the shared LLM handle and
+building a request config.
+
+Run from the repository root (needs the models configured in
+config/config.yaml, no database access):
+
+    python -m benchmarks.llm_construction --requests 200
+"""
+
+import argparse
+import statistics
+import time
+import uuid
+
+from src.llm._base_llm import get_run_config
+from src.llm._llm_factory import get_llm_handle
+from src.llm._rag_llm import RAGLLM
+from src.llm._simple_llm import SimpleLLM
+from src.llm._user_rag_llm import UserRAGLLM
+
+
+def _measure(fn, n_requests: int) -> list[float]:
+    timings = []
+    for _ in range(n_requests):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _report(name: str, timings: list[float]) -> None:
+    timings = sorted(timings)
+    p95 = timings[int(0.95 * (len(timings) - 1))]
+    print(f"  {name:<24} mean {statistics.mean(timings):8.3f} ms   p95 {p95:8.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="Simulated requests per LLM class")
+    args = parser.parse_args()
+
+    for llm_class in (SimpleLLM, RAGLLM, UserRAGLLM):
+        handle = get_llm_handle(llm_class)
+        dataset_id = None if llm_class is SimpleLLM else uuid.uuid4()
+
+        def per_request_graph():
+            handle._build_graph()
+
+        def shared_handle():
+            get_llm_handle(llm_class)
+            get_run_config(user_id=uuid.uuid4(), session_id=uuid.uuid4(), dataset_id=dataset_id)
+
+        print(llm_class.__name__)
+        _report("compile per request", _measure(per_request_graph, args.requests))
+        _report("shared handle + config", _measure(shared_handle, args.requests))
+
+
+if __name__ == "__main__":
+    main()
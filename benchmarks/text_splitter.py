@@ -0,0 +1,89 @@
+"""
+Benchmark of the token-aware splitter against the recursive character splitter.
+
+Extracts the text of a PDF and a DOCX fixture once, then splits it with
+each engine of ``DocumentService`` (through the same carry-over buffer as
+ingestion) and reports throughput, chunk count and chunk sizes in
+embedding-model tokens. The fixtures are synthetic unless files are given.
+
+Run from the repository root (needs the embedding model's tokenizer, no
+database access):
+
+    python -m benchmarks.text_splitter --pdf data/sample.pdf --docx data/sample.docx
+"""
+
+import argparse
+import io
+import statistics
+import time
+import zipfile
+from pathlib import Path
+
+from pypdf import PdfReader
+
+from benchmarks.document_extraction import make_docx, make_pdf
+from src.operations._document_hadling import CHUNK_OVERLAP, CHUNK_SIZE, DocumentService, _iter_docx_paragraphs, _iter_pdf_pages
+from src.operations._text_splitter import get_tokenizer
+
+
+def _pieces(content: bytes, file_format: str) -> list[tuple[int, str]]:
+    # the labelled pieces fed to the splitter during ingestion, extracted once
+    if file_format == "pdf":
+        reader = PdfReader(io.BytesIO(content))
+        return list(_iter_pdf_pages(reader, 0, len(reader.pages)))
+
+    with zipfile.ZipFile(io.BytesIO(content)) as zipf, zipf.open("word/document.xml") as xml:
+        return list(_iter_docx_paragraphs(xml))
+
+
+def _split(service: DocumentService, pieces: list[tuple[int, str]]) -> list[str]:
+    stream = service._new_chunk_stream()
+    chunks = [chunk for number, text in pieces for chunk in stream.feed(number, text)]
+    chunks.extend(stream.flush())
+    return [text for _, text, _, _ in chunks]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", type=Path, default=None, help="PDF fixture (default: synthetic)")
+    parser.add_argument("--docx", type=Path, default=None, help="DOCX fixture (default: synthetic)")
+    parser.add_argument("--pages", type=int, default=200, help="Pages of the synthetic PDF")
+    parser.add_argument("--paragraphs", type=int, default=20000, help="Paragraphs of the synthetic DOCX")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per engine (the best is kept)")
+    args = parser.parse_args()
+
+    tokenizer = get_tokenizer()
+    fixtures = [
+        ("pdf", args.pdf.read_bytes() if args.pdf else make_pdf(args.pages)),
+        ("docx", args.docx.read_bytes() if args.docx else make_docx(args.paragraphs)),
+    ]
+
+    for file_format, content in fixtures:
+        service = DocumentService(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        pieces = _pieces(content, file_format)
+        text_mb = sum(len(text.encode()) for _, text in pieces) / 1e6
+        print(f"{file_format}: {len(pieces)} pieces, {text_mb:.1f} MB of text")
+
+        for engine, name in (
+            ("recursive", f"recursive ({CHUNK_SIZE}/{CHUNK_OVERLAP} chars)"),
+            ("token", f"token ({service.chunk_tokens}/{service.chunk_overlap_tokens} tokens)"),
+        ):
+            service.splitter_engine = engine
+            # untimed run, so the tokenizer load is not counted
+            _ = _split(service, pieces[:10])
+
+            elapsed = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                chunks = _split(service, pieces)
+                elapsed = min(elapsed, time.perf_counter() - start)
+
+            tokens = [len(ids) for ids in tokenizer(chunks, add_special_tokens=False)["input_ids"]]
+            print(
+                f"  {name:<32} {text_mb / elapsed:7.2f} MB/s   {len(chunks):>7} chunks   "
+                f"tokens/chunk mean {statistics.mean(tokens):6.1f}  max {max(tokens):5d}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Add the full-text column and index hybrid search needs to existing dataset tables.
+
+Dataset tables get them when they are created with ``rag.search_type:
+hybrid``; tables created before fall back to similarity search until this
+is run. Adding the column rewrites each table under an exclusive lock
+(searches and ingestion of that dataset wait), so run it off-peak. Run
+from the repository root:
+
+    python -m scripts.add_hybrid_search
+"""
+
+import argparse
+import asyncio
+import time
+
+from src.operations._admin import AdminUploadedDatasetInfoOperations
+from src.operations._db_setup import close_db
+from src.operations._vector_db import vector_db_service
+
+
+async def main() -> None:
+    start = time.perf_counter()
+    try:
+        datasets = await AdminUploadedDatasetInfoOperations().list_by_vectorize_status(is_vectorized=True)
+        for dataset in datasets:
+            table_start = time.perf_counter()
+            await vector_db_service.add_hybrid_search(dataset_id=dataset.id)
+            print(f"Dataset {dataset.id}: {time.perf_counter() - table_start:.1f} s")
+    finally:
+        await close_db()
+
+    print(f"Updated {len(datasets)} dataset tables in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    _ = parser.parse_args()
+
+    asyncio.run(main())
@@ -0,0 +1,36 @@
+"""
+Move chat histories from the legacy per-user tables to the shared table.
+
+Safe to run while the API is serving requests: every batch is moved in its
+own short transaction, and a user touched by the API meanwhile is finished
+by the API itself. Run from the repository root:
+
+    python -m scripts.migrate_chat_history --batch-size 1000
+"""
+
+import argparse
+import asyncio
+import time
+
+from src.operations._chat_history import chat_history_service, setup_chat_history
+from src.operations._db_setup import close_db
+
+
+async def main(batch_size: int | None) -> None:
+    await setup_chat_history()
+
+    start = time.perf_counter()
+    try:
+        moved = await chat_history_service.migrate_legacy_tables(batch_size=batch_size)
+    finally:
+        await close_db()
+
+    print(f"Moved {moved} messages in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=None, help="Rows moved per transaction (default: chat_history.migration_batch_size)")
+    args = parser.parse_args()
+
+    asyncio.run(main(batch_size=args.batch_size))
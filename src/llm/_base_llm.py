@@ -5,33 +5,84 @@ This module provides the base class for all LLM implementations,
 with common functionality for chat, memory, and streaming.
 """
 
-from typing import List, Dict, Any, Optional, AsyncGenerator, Union, Tuple
+from typing import List, Dict, Any, Optional, AsyncGenerator, Union, Tuple, Hashable
 
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import MessagesState
+from langgraph.graph.state import CompiledStateGraph
+from langgraph.config import get_stream_writer
 from langchain_core.messages.utils import (
     trim_messages,
     count_tokens_approximately
 )
 
+import asyncio
 import uuid
 from contextlib import asynccontextmanager
 import json
+import time
 
 from abc import ABC, abstractmethod
 
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.messages import AIMessage, HumanMessage, AnyMessage, SystemMessage, BaseMessage
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, AnyMessage, SystemMessage, BaseMessage
 
 
+from src.utils.config import get_config
 from src.utils.logger import app_logger
+from src.utils.metrics import metrics
 from src.operations._memory import memory_service
 from src.operations._chat_history import chat_history_service
 from src.llm._llm_setup import get_chat_model
+from src.llm._streaming import StreamFormat, encode_frame
+from src.llm._summarizer import summarizer
+from src.llm._memory_extractor import memory_extractor
 
 logger = app_logger.getChild("src.llm._base_llm")
 
 
+HISTORY_WINDOW_MESSAGES = get_config("chat_history.window.max_messages", 20)
+HISTORY_WINDOW_TOKENS = get_config("chat_history.window.max_tokens", 2000)
+# overlap history persistence and fetch with the prefetch of each LLM (e.g. retrieval)
+CONCURRENT_PRE_GENERATION = get_config("llm.concurrent_pre_generation", True)
+
+
+def get_run_config(
+    user_id: uuid.UUID,
+    session_id: uuid.UUID,
+    dataset_id: uuid.UUID | None = None,
+    history_limit: int = 5,
+) -> RunnableConfig:
+    """
+    Build the per-request config passed to the compiled graph.
+    
+    Parameters
+    ----------
+    user_id : uuid.UUID
+        ID of the user.
+    session_id : uuid.UUID
+        ID of the chat session.
+    dataset_id : uuid.UUID, optional
+        ID of the dataset searched by RAG LLMs.
+    history_limit : int, optional
+        Maximum number of history messages. Default is 5.
+        
+    Returns
+    -------
+    RunnableConfig
+        Config with the request data under ``configurable``.
+    """
+    return {
+        "configurable": {
+            "thread_id": session_id,
+            "user_id": user_id,
+            "session_id": session_id,
+            "dataset_id": dataset_id,
+            "history_limit": history_limit,
+        }
+    }
+
+
 class BaseLLM(ABC):
     """
     Base class for all LLM implementations.
@@ -39,58 +90,46 @@ class BaseLLM(ABC):
     This class provides common functionality for chat, memory, and streaming
     that is used by all LLM types in the MultiRAG system.
     
+    Instances are stateless handles shared across requests: the user,
+    session and dataset of a request travel in the ``RunnableConfig``
+    built by ``get_run_config``, and compiled graphs are cached per class
+    and graph variant.
+    
     Attributes
     ----------
-    user_id : str
-        The ID of the user.
-    session_id : uuid.UUID
-        The ID of the chat session.
-    chat_history : List[Union[HumanMessage, AIMessage, SystemMessage]]
-        The chat history for this session.
-    memory_limit : int
-        Maximum number of memory entries to retrieve.
+    chat_model : BaseChatModel
+        The chat model used by the graph nodes.
+    compiled_graph : CompiledStateGraph
+        The compiled graph shared by every handle of the same class and variant.
     """
     
-    def __init__(
-        self,
-        user_id: uuid.UUID,
-        session_id: uuid.UUID,
-        history_limit: int = 5,
-        memory_limit: int = 5, 
-    ) -> None:
-        """
-        Initialize the base LLM.
-        
-        Parameters
-        ----------
-        user_id : str
-            ID of the user.
-        session_id : uuid.UUID
-            ID of the chat session.
-        memory_limit : int, optional
-            Maximum number of memory entries to retrieve.
-            Default is 5.
-        """
-        self.user_id = user_id
-        self.session_id = session_id
-        self.config = {
-            "configurable": {
-            "thread_id": session_id,
-            "user_id": user_id,
-            }
-        }
-        
-        self.memory_limit = memory_limit
-        self.history_limit = history_limit
-        
+    _compiled_graphs: dict[tuple[type, Hashable], CompiledStateGraph] = {}
+    # whether the graph reads the chat history (and so benefits from a rolling summary)
+    uses_history_summary: bool = False
+    
+    def __init__(self) -> None:
+        """Initialize the LLM handle and get (or build) its compiled graph."""
         self.memory = memory_service
         self.chat_history = chat_history_service
         
         self.chat_model = get_chat_model()
         
-        self.compiled_graph = self._build_graph()
+        self.compiled_graph = self._get_compiled_graph()
+    
+    
+    def _get_graph_variant(self) -> Hashable:
+        """Settings changing the graph topology of this class, if any."""
+        return None
+    
+    def _get_compiled_graph(self) -> CompiledStateGraph:
+        key = (type(self), self._get_graph_variant())
+        graph = self._compiled_graphs.get(key)
+        if graph is None:
+            graph = self._build_graph()
+            self._compiled_graphs[key] = graph
+            logger.info(f"Compiled graph of {type(self).__name__} (variant {key[1]})")
         
-        logger.info(f"Initialized LLM for user {user_id}, session {session_id}")
+        return graph
     
     
     def _custom_trim_messages(self, messages: list[AnyMessage],
@@ -134,8 +173,61 @@ class BaseLLM(ABC):
     def _build_graph(self):
         pass
     
+    async def _prefetch(self, user_query: str, config: RunnableConfig) -> dict[str, Any]:
+        """Work of the graph that only needs the query, run next to the history round trips."""
+        return {}
+    
+    async def _get_graph_input(
+        self, chat_history: list[BaseMessage], prefetched: dict[str, Any], config: RunnableConfig
+    ) -> dict[str, Any]:
+        """Build the input state of the graph from the history window and the prefetch."""
+        return {"messages": chat_history, **prefetched}
+    
+    async def _prepare_graph_input(self, user_query: str, config: RunnableConfig) -> dict[str, Any]:
+        user_id = config["configurable"]["user_id"]
+        session_id = config["configurable"]["session_id"]
+        
+        async def load_history() -> list[BaseMessage]:
+            # read before the query is stored, so the window never depends on which runs first
+            chat_history = await self.chat_history.get_session_messages(
+                user_id=user_id,
+                session_id=session_id,
+                last_n=HISTORY_WINDOW_MESSAGES - 1,
+                max_tokens=HISTORY_WINDOW_TOKENS,
+            )
+            await self.chat_history.add_user_message(
+                message=user_query,
+                user_id=user_id,
+                session_id=session_id,
+            )
+            return chat_history
+        
+        if CONCURRENT_PRE_GENERATION:
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    history_task = tg.create_task(load_history())
+                    prefetch_task = tg.create_task(self._prefetch(user_query, config))
+            except ExceptionGroup as eg:
+                # surface the failure itself, as a sequential await would
+                raise eg.exceptions[0]
+            chat_history, prefetched = history_task.result(), prefetch_task.result()
+        else:
+            chat_history = await load_history()
+            prefetched = await self._prefetch(user_query, config)
+        
+        chat_history = chat_history + [HumanMessage(content=user_query)]
+        return await self._get_graph_input(chat_history, prefetched, config)
+    
+    def _report_progress(self, stage: str) -> None:
+        """Emit a progress frame (e.g. "retrieving") from inside a graph node."""
+        get_stream_writer()({"progress": stage})
+    
     async def generate_chat_response(
-        self, user_query: str
+        self,
+        user_query: str,
+        config: RunnableConfig,
+        stream_format: StreamFormat = "legacy",
+        progress: bool = False,
     ) -> AsyncGenerator[str, None]:
         """
         Generate a chat response to the user query.
@@ -144,54 +236,97 @@ class BaseLLM(ABC):
         ----------
         user_query : str
             The user query.
+        config : RunnableConfig
+            Request config built by ``get_run_config``.
+        stream_format : StreamFormat, optional
+            ``"legacy"`` resends the completion so far with every token;
+            ``"ndjson"`` and ``"sse"`` send token deltas and a final
+            summary frame. Default is ``"legacy"``.
+        progress : bool, optional
+            Send progress frames ("retrieving", "grading", ...) in the
+            delta formats. Default is False.
             
         Yields
         ------
         str
             Chunks of the response as they are generated.
         """
+        user_id = config["configurable"]["user_id"]
+        session_id = config["configurable"]["session_id"]
+        start = time.perf_counter()
         try:
             
-            await self.chat_history.add_user_message(
-                message=user_query,
-                user_id=self.user_id,
-                session_id=self.session_id,
-            )
-            
-            chat_history = await self.chat_history.get_session_messages(
-                user_id=self.user_id,
-                session_id=self.session_id,
-            )
-            # chat_history = chat_history[-self.history_limit:]
+            # only the tail survives _custom_trim_messages, so only the tail is read
+            graph_input = await self._prepare_graph_input(user_query, config)
+            metrics.observe("chat.pre_generation_ms", (time.perf_counter() - start) * 1000)
             
             # Stream the response in json lines format
             counter = 0
+            tokens: list[str] = []
             completion = ""
-            async for msg, metadata in self.compiled_graph.astream(
-                {"messages": chat_history},
-                self.config,
-                stream_mode="messages",
+            first_token_ms = None
+            async for stream_mode, chunk in self.compiled_graph.astream(
+                graph_input,
+                config,
+                stream_mode=["messages", "custom"],
             ):
-                if msg.content and metadata["langgraph_node"]=="_generation_node":
+                # "custom" carries progress and tokens a node generated ahead and flushes itself
+                if stream_mode == "custom":
+                    token = chunk.get("token")
+                    if progress and stream_format != "legacy" and chunk.get("progress"):
+                        yield encode_frame(stream_format, "progress", {"stage": chunk["progress"]})
+                else:
+                    msg, metadata = chunk
+                    # whole messages returned by a node (e.g. one it already streamed
+                    # through "custom") are emitted too; only streamed chunks are tokens
+                    is_token = isinstance(msg, AIMessageChunk) and metadata["langgraph_node"]=="_generation_node"
+                    token = msg.content if is_token else None
+                
+                if token:
                     counter += 1
-                    completion += msg.content
-                    result ={
-                        "token": msg.content,
-                        "index": counter,
-                        "completion": completion,
-                    }
+                    tokens.append(token)
+                    if first_token_ms is None:
+                        first_token_ms = (time.perf_counter() - start) * 1000
+                        metrics.observe("chat.first_token_ms", first_token_ms)
                     
-                    # add \n to create json lines format
-                    yield json.dumps(result, ensure_ascii=False) + "\n"
+                    if stream_format == "legacy":
+                        completion += token
+                        result ={
+                            "token": token,
+                            "index": counter,
+                            "completion": completion,
+                        }
+                        
+                        # add \n to create json lines format
+                        yield json.dumps(result, ensure_ascii=False) + "\n"
+                    else:
+                        yield encode_frame(stream_format, "delta", {"token": token, "index": counter})
+            
+            completion = "".join(tokens)
+            if stream_format != "legacy":
+                yield encode_frame(stream_format, "done", {
+                    "completion": completion,
+                    "tokens": counter,
+                    "first_token_ms": first_token_ms,
+                    "total_ms": (time.perf_counter() - start) * 1000,
+                })
             
             # Add the assistant's message to the chat history
             await self.chat_history.add_ai_message(
                 message=completion,
-                user_id=self.user_id,
-                session_id=self.session_id,
+                user_id=user_id,
+                session_id=session_id,
             )
             
+            if self.uses_history_summary:
+                summarizer.schedule(user_id=user_id, session_id=session_id)
+            # memories are extracted, deduplicated and written off the request path
+            memory_extractor.schedule(user_id=user_id, user_message=user_query, ai_message=completion)
+            
         except Exception as e:
             error_msg = f"Error generating chat response: {str(e)}"
             logger.error(error_msg)
-            yield f"I'm sorry, there was an error processing your request: {str(e)}" 
\ No newline at end of file
+            if stream_format == "legacy":
+                yield f"I'm sorry, there was an error processing your request: {str(e)}"
+            else:
+                yield encode_frame(stream_format, "error", {"detail": str(e)})
@@ -0,0 +1,207 @@
+"""
+Coalescing embedding service for MultiRAG.
+
+This module provides an ``Embeddings`` wrapper that collects concurrent
+async ``embed_query``/``embed_documents`` calls over a short window,
+runs them as one batch on a dedicated executor and hands every caller
+its own vectors back. Queries have an executor of their own, so chat
+turns never wait behind the document batches of an ingestion.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Literal
+
+from langchain_core.embeddings import Embeddings
+
+from src.utils.logger import app_logger
+from src.utils.metrics import metrics
+
+logger = app_logger.getChild("src.llm._embedding_service")
+
+
+EmbeddingKind = Literal["query", "documents"]
+
+
+@dataclass
+class _EmbeddingRequest:
+    texts: list[str]
+    future: asyncio.Future
+
+
+@dataclass
+class _Lane:
+    requests: list[_EmbeddingRequest] = field(default_factory=list)
+    size: int = 0
+    timer: asyncio.TimerHandle | None = None
+
+
+class EmbeddingService(Embeddings):
+    """
+    Micro-batching front end for an embedding model.
+
+    Queries and documents are batched in separate lanes, each run on its
+    own executor. A lane is flushed when ``max_batch_size`` texts are
+    waiting or ``max_wait_ms`` after its first request, whichever comes
+    first. Synchronous calls bypass batching and go straight to the
+    wrapped model.
+
+    Attributes
+    ----------
+    model : Embeddings
+        The wrapped embedding model.
+    max_batch_size : int
+        Number of texts that triggers an immediate flush.
+    max_wait_ms : float
+        Longest time a request waits for others to join its batch.
+    """
+
+    def __init__(
+        self,
+        model: Embeddings,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5,
+        executor_workers: int = 1,
+    ) -> None:
+        """
+        Initialize the embedding service.
+
+        Parameters
+        ----------
+        model : Embeddings
+            The embedding model to wrap.
+        max_batch_size : int, optional
+            Flush threshold in texts. Default is 32.
+        max_wait_ms : float, optional
+            Coalescing window in milliseconds. Default is 5.
+        executor_workers : int, optional
+            Threads running document batches. Default is 1, since torch
+            already parallelizes a single batch across cores. Queries
+            always get one thread of their own.
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        # a query batch starts at once instead of queueing behind ingestion batches
+        self._executors: dict[EmbeddingKind, ThreadPoolExecutor] = {
+            "query": ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-query"),
+            "documents": ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix="embedding-documents"),
+        }
+        self._lanes: dict[EmbeddingKind, _Lane] = {"query": _Lane(), "documents": _Lane()}
+        self._tasks: set[asyncio.Task] = set()
+        self._in_flight = 0
+
+        metrics.register_collector("embedding", self.stats)
+
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(lane.size for lane in self._lanes.values())
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight_batches": self._in_flight,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+        }
+
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.model.embed_query(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+
+        # already a full batch, nothing to coalesce with
+        if len(texts) >= self.max_batch_size:
+            return await self._run_in_executor("documents", texts)
+
+        return await self._submit("documents", texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        vectors = await self._submit("query", [text])
+        return vectors[0]
+
+
+    def _embed(self, kind: EmbeddingKind, texts: list[str]) -> list[list[float]]:
+        # a query only embeds differently when dedicated query encode kwargs are configured
+        if kind == "query" and getattr(self.model, "query_encode_kwargs", None):
+            return [self.model.embed_query(text) for text in texts]
+        return self.model.embed_documents(texts)
+
+    async def _run_in_executor(self, kind: EmbeddingKind, texts: list[str]) -> list[list[float]]:
+        loop = asyncio.get_running_loop()
+
+        self._in_flight += 1
+        start = time.perf_counter()
+        try:
+            vectors = await loop.run_in_executor(self._executors[kind], self._embed, kind, texts)
+        finally:
+            self._in_flight -= 1
+
+        metrics.increment(f"embedding.{kind}.batches")
+        metrics.increment(f"embedding.{kind}.texts", len(texts))
+        metrics.observe(f"embedding.{kind}.batch_size", len(texts))
+        metrics.observe(f"embedding.{kind}.batch_latency_ms", (time.perf_counter() - start) * 1000)
+
+        return vectors
+
+    async def _submit(self, kind: EmbeddingKind, texts: list[str]) -> list[list[float]]:
+        loop = asyncio.get_running_loop()
+        lane = self._lanes[kind]
+
+        request = _EmbeddingRequest(texts=texts, future=loop.create_future())
+        lane.requests.append(request)
+        lane.size += len(texts)
+        metrics.set_gauge("embedding.queue_depth", self.queue_depth)
+
+        if lane.size >= self.max_batch_size:
+            self._flush(kind)
+        elif lane.timer is None:
+            lane.timer = loop.call_later(self.max_wait_ms / 1000, self._flush, kind)
+
+        return await request.future
+
+    def _flush(self, kind: EmbeddingKind) -> None:
+        lane = self._lanes[kind]
+        if lane.timer is not None:
+            lane.timer.cancel()
+            lane.timer = None
+
+        requests = lane.requests
+        lane.requests = []
+        lane.size = 0
+        metrics.set_gauge("embedding.queue_depth", self.queue_depth)
+
+        if requests:
+            task = asyncio.ensure_future(self._run_batch(kind, requests))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, kind: EmbeddingKind, requests: list[_EmbeddingRequest]) -> None:
+        texts = [text for request in requests for text in request.texts]
+
+        try:
+            vectors = await self._run_in_executor(kind, texts)
+        except Exception as e:
+            logger.error(f"Error embedding batch of {len(texts)} texts: {str(e)}")
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        offset = 0
+        for request in requests:
+            n_texts = len(request.texts)
+            # the caller may have been cancelled while waiting
+            if not request.future.done():
+                request.future.set_result(vectors[offset: offset + n_texts])
+            offset += n_texts
@@ -6,7 +6,9 @@ based on the LLM type and other parameters.
 """
 import uuid
 
-from src.llm._base_llm import BaseLLM
+from langchain_core.runnables import RunnableConfig
+
+from src.llm._base_llm import BaseLLM, get_run_config
 from src.llm._simple_llm import SimpleLLM
 from src.llm._rag_llm import RAGLLM
 from src.llm._user_rag_llm import UserRAGLLM
@@ -20,22 +22,49 @@ from src.utils.logger import app_logger
 logger = app_logger.getChild("src.llm._llm_factory")
 
 
+# LLM handles are stateless, one per class serves every request
+llm_handles: dict[type[BaseLLM], BaseLLM] = {}
+
+
+def get_llm_handle(llm_class: type[BaseLLM]) -> BaseLLM:
+    llm = llm_handles.get(llm_class)
+    if llm is None:
+        llm = llm_class()
+        llm_handles[llm_class] = llm
+    
+    return llm
+
+
 async def create_llm(
     llm_type: LLMType,
     user_id: uuid.UUID,
     session_id: uuid.UUID,
     history_limit: int = 5,
     rag_system_id: uuid.UUID | None = None,
-) -> BaseLLM:
+) -> tuple[BaseLLM, RunnableConfig]:
+    """
+    Return the LLM handle for a chat request and the config to run it with.
+    
+    Raises
+    ------
+    ValueError
+        If the RAG system or its dataset is missing or not vectorized.
+    """
 
     if llm_type == LLMType.SIMPLE:
         logger.info(f"Creating Simple LLM for user {user_id}, session {session_id}")
-        return SimpleLLM(user_id=user_id, session_id=session_id, history_limit=history_limit)
+        config = get_run_config(user_id=user_id, session_id=session_id, history_limit=history_limit)
+        return get_llm_handle(SimpleLLM), config
         
     elif llm_type in (LLMType.RAG, LLMType.USER_RAG):
         # Check if RAG dataset ID is provided
         if rag_system_id:
-            rag_system_obj = await RAGSystemOperations().get(rag_system_id=rag_system_id)
+            # cached snapshots, steady-state requests make no metadata queries
+            rag_system_obj = await RAGSystemOperations().get_info(rag_system_id=rag_system_id)
+            if not rag_system_obj:
+                error_msg = f"RAG system with ID {rag_system_id} not found"
+                logger.error(error_msg)
+                raise ValueError(error_msg)
             dataset_id = rag_system_obj.dataset_id
         else:
             error_msg = f"RAG system ID is required for LLM type {llm_type.value}"
@@ -46,7 +75,7 @@ async def create_llm(
         if llm_type == LLMType.RAG:
 
             # Get dataset from database
-            dataset = await AdminUploadedDatasetInfoOperations().get_by_dataset_id(dataset_id=dataset_id)
+            dataset = await AdminUploadedDatasetInfoOperations().get_info(dataset_id=dataset_id)
             if not dataset:
                 error_msg = f"RAG dataset with ID {dataset_id} not found"
                 logger.error(error_msg)
@@ -59,17 +88,18 @@ async def create_llm(
                 raise ValueError(error_msg)
             
             logger.info(f"Creating RAG LLM for user {user_id}, session {session_id}, dataset {dataset_id}, expertise: {dataset.expertise}")
-            return RAGLLM(
+            config = get_run_config(
                 user_id=user_id,
                 session_id=session_id,
                 dataset_id=dataset_id,
                 history_limit=history_limit,
             )
+            return get_llm_handle(RAGLLM), config
             
         else:  # LLMType.USER_RAG
 
             # Get dataset from database
-            dataset = await UserUploadedDatasetOperation().get_by_dataset_id(dataset_id=dataset_id)
+            dataset = await UserUploadedDatasetOperation().get_info(dataset_id=dataset_id)
             if not dataset:
                 error_msg = f"User dataset with ID {dataset_id} not found"
                 logger.error(error_msg)
@@ -82,11 +112,12 @@ async def create_llm(
                 raise ValueError(error_msg)
             
             logger.info(f"Creating User RAG LLM for user {user_id}, session {session_id}, dataset {dataset_id}.")
-            return UserRAGLLM(
+            config = get_run_config(
                 user_id=user_id,
                 session_id=session_id,
                 dataset_id=dataset_id,
             )
+            return get_llm_handle(UserRAGLLM), config
     
     else:
         # This should never happen as we're explicitly checking against enum values
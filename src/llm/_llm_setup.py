@@ -3,12 +3,19 @@ import os
 from langchain_huggingface.embeddings.huggingface import HuggingFaceEmbeddings
 from langchain_ollama import OllamaEmbeddings
 from langchain_ollama import ChatOllama
+from sentence_transformers import CrossEncoder
 import torch
 
 from langchain_core.language_models import BaseChatModel
 from langchain_core.embeddings import Embeddings
 
+from src.llm._embedding_service import EmbeddingService
+from src.llm._reranker import RerankerService
 from src.utils.config import get_config
+from src.utils.logger import app_logger
+
+
+logger = app_logger.getChild("src.llm._llm_setup")
 
 CHAT_MODEL = get_config('llm.chat.model')
 CHAT_TEMPERATURE = get_config('llm.chat.temperature')
@@ -20,12 +27,23 @@ CHAT_NUM_CTX = get_config('llm.chat.num_ctx')
 
 EMBEDDING_MODEL = get_config('llm.embedding.model')
 OFFLINE = get_config('llm.embedding.offline', True)
+EMBEDDING_MAX_BATCH_SIZE = get_config('llm.embedding.batching.max_batch_size', 32)
+EMBEDDING_MAX_WAIT_MS = get_config('llm.embedding.batching.max_wait_ms', 5)
+EMBEDDING_EXECUTOR_WORKERS = get_config('llm.embedding.batching.executor_workers', 1)
+
+RERANKER_MODEL = get_config('llm.reranker.model')
+RERANKER_ENABLED = get_config('llm.reranker.enabled', False)
+RERANKER_BATCH_SIZE = get_config('llm.reranker.batch_size', 16)
+RERANKER_CACHE_SIZE = get_config('llm.reranker.cache_size', 4096)
 
 DEVICE = 'cuda' if torch.cuda.is_available() else 'cpu'
 
 
 chat_model: BaseChatModel | None = None
 embedding_model: Embeddings | None = None
+embedding_service: EmbeddingService | None = None
+reranker_service: RerankerService | None = None
+reranker_unavailable = False
 
 
 # ensure system will work in fully local environments
@@ -73,8 +91,49 @@ def get_embedding_model() -> Embeddings:
     return embedding_model
 
 
+def get_embedding_service() -> EmbeddingService:
+    global embedding_service
+    if embedding_service is None:
+        embedding_service = EmbeddingService(
+            model=get_embedding_model(),
+            max_batch_size=EMBEDDING_MAX_BATCH_SIZE,
+            max_wait_ms=EMBEDDING_MAX_WAIT_MS,
+            executor_workers=EMBEDDING_EXECUTOR_WORKERS,
+        )
+    
+    return embedding_service
+
+
+def get_reranker_service() -> RerankerService | None:
+    """Load the reranker; ``None`` if its weights can't be loaded, so retrieval ranks by similarity."""
+    global reranker_service, reranker_unavailable
+    _setup_offline_mode()
+    if reranker_service is None and not reranker_unavailable:
+        try:
+            model = CrossEncoder(
+                RERANKER_MODEL,
+                device=DEVICE,
+                trust_remote_code=True,
+                local_files_only=OFFLINE,
+            )
+        except Exception as e:
+            # e.g. weights not downloaded while offline
+            logger.warning(f"Could not load reranker {RERANKER_MODEL}, ranking by similarity: {str(e)}")
+            reranker_unavailable = True
+            return None
+        reranker_service = RerankerService(
+            model=model,
+            batch_size=RERANKER_BATCH_SIZE,
+            cache_size=RERANKER_CACHE_SIZE,
+        )
+    
+    return reranker_service
+
+
 
 def setup_llm():
-    _ = get_embedding_model().embed_query("Hi")
+    _ = get_embedding_service().embed_query("Hi")
+    if RERANKER_ENABLED:
+        _ = get_reranker_service()
     _ = get_chat_model().invoke("Hi.")
 
@@ -0,0 +1,125 @@
+"""
+Background extraction of long-term user memories.
+
+This module pulls durable facts about the user out of a chat turn, in the
+background once the response has been streamed, drops the ones already
+remembered and hands the rest to the batched memory writer.
+"""
+
+import asyncio
+import time
+import uuid
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from src.llm._llm_setup import get_chat_model
+from src.llm._prompts import Memory_Prompt
+from src.llm._states import ExtractedMemories
+from src.operations._memory import MemoryService, memory_service
+from src.utils.config import get_config
+from src.utils.logger import app_logger
+from src.utils.metrics import metrics
+
+logger = app_logger.getChild("src.llm._memory_extractor")
+
+
+class MemoryExtractor:
+    """
+    Background extractor of user memories.
+
+    Candidates whose closest stored memory has an embedding similarity of
+    at least ``dedup_threshold`` are dropped as duplicates; the others are
+    queued on the memory service, which embeds and stores them in batches.
+
+    Attributes
+    ----------
+    enabled : bool
+        Whether chat turns are mined for memories.
+    dedup_threshold : float
+        Similarity to an existing memory above which a candidate is a duplicate.
+    max_memories : int
+        Most memories extracted from one turn.
+    """
+
+    def __init__(self, memory: MemoryService = memory_service) -> None:
+        self.memory = memory
+
+        self.enabled = get_config("memory.extraction.enabled", False)
+        self.dedup_threshold = get_config("memory.extraction.dedup_threshold", 0.9)
+        self.max_memories = get_config("memory.extraction.max_memories", 3)
+        self.max_concurrency = get_config("memory.extraction.max_concurrency", 4)
+
+        self._tasks: set[asyncio.Task] = set()
+        self._semaphore: asyncio.Semaphore | None = None
+
+
+    def schedule(self, user_id: uuid.UUID, user_message: str, ai_message: str) -> None:
+        """Extract the memories of a chat turn in the background."""
+        if not self.enabled:
+            return
+
+        # asyncio primitives are created inside the running loop
+        self._semaphore = self._semaphore or asyncio.Semaphore(self.max_concurrency)
+        task = asyncio.create_task(self._run(user_id, user_message, ai_message))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self) -> None:
+        tasks = [task for task in self._tasks if not task.done()]
+        for task in tasks:
+            _ = task.cancel()
+        _ = await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+
+    async def _run(self, user_id: uuid.UUID, user_message: str, ai_message: str) -> None:
+        try:
+            async with self._semaphore:
+                await self.extract(user_id=user_id, user_message=user_message, ai_message=ai_message)
+        except Exception as e:
+            metrics.increment("memory.extraction.failed")
+            logger.error(f"Error extracting memories of user {user_id}: {str(e)}")
+
+    async def extract(self, user_id: uuid.UUID, user_message: str, ai_message: str) -> list[str]:
+        """
+        Extract the new memories of a chat turn and queue them for writing.
+
+        Returns
+        -------
+        list[str]
+            The queued memories.
+        """
+        start = time.perf_counter()
+        extracted = await get_chat_model().with_structured_output(ExtractedMemories).ainvoke([
+            SystemMessage(content=Memory_Prompt.instruction.format(max_memories=self.max_memories)),
+            HumanMessage(content=Memory_Prompt.extract.format(user_message=user_message, ai_message=ai_message)),
+        ])
+
+        # drop blanks and repeats within the turn before touching the store
+        candidates = list(dict.fromkeys(m.strip() for m in extracted.memories if m.strip()))[:self.max_memories]
+        if not candidates:
+            return []
+
+        # the searches run together, so their query embeddings can share a batch
+        matches = await asyncio.gather(*(
+            self.memory.search_memories(user_id=str(user_id), query=candidate, limit=1)
+            for candidate in candidates
+        ))
+        new_memories = [
+            candidate for candidate, match in zip(candidates, matches)
+            if not match or match[0].score is None or match[0].score < self.dedup_threshold
+        ]
+
+        if new_memories:
+            self.memory.queue_memories(user_id=str(user_id), contents=new_memories, metadata={"source": "chat"})
+
+        metrics.increment("memory.extraction.runs")
+        metrics.increment("memory.extraction.duplicates", len(candidates) - len(new_memories))
+        metrics.observe("memory.extraction.latency_ms", (time.perf_counter() - start) * 1000)
+        return new_memories
+
+
+
+
+# Singleton instance
+memory_extractor = MemoryExtractor()
@@ -16,6 +16,12 @@ class SimpleLLM_Prompt:
     - موضوعات حساس: بی‌طرف باش و به منابع/متخصصان معتبر ارجاع بده.
     """
 
+    summary = """
+    <CONVERSATION SUMMARY>
+    {summary}
+    </CONVERSATION SUMMARY>
+    """
+
 
 
 class RAGLLM_Prompt:
@@ -112,3 +118,55 @@ class UserRAGLLM_Prompt:
     Context that may help:
     {context}
     """
+
+
+
+class Summary_Prompt:
+
+    instruction = """
+    You maintain a running summary of a conversation between a user and an assistant.
+    Merge the new messages (tagged with <NEW MESSAGES>) into the previous summary (tagged with <PREVIOUS SUMMARY>).
+    Adhere to these rules:
+    - Keep facts, names, numbers, user preferences and open questions; drop greetings and filler.
+    - Write at most {max_words} words, in the language of the conversation (usually Persian).
+    - Output only the updated summary.
+    """
+
+    summarize = """
+    <PREVIOUS SUMMARY>
+    {summary}
+    </PREVIOUS SUMMARY>
+
+    <NEW MESSAGES>
+    {messages}
+    </NEW MESSAGES>
+    """
+
+
+
+class Memory_Prompt:
+
+    instruction = """
+    You extract long-term memories about the user from one turn of a conversation.
+    Adhere to these rules:
+    - Keep only durable facts worth remembering in later conversations: the user's name, role, preferences, goals, projects and constraints.
+    - Skip the question itself, general knowledge, anything taken from the assistant's answer alone, and small talk.
+    - Write every memory as one short, self-contained sentence about the user, in the language of the conversation (usually Persian).
+    - Return at most {max_memories} memories; return none when nothing is worth remembering.
+    """
+
+    extract = """
+    <USER MESSAGE>
+    {user_message}
+    </USER MESSAGE>
+
+    <ASSISTANT MESSAGE>
+    {ai_message}
+    </ASSISTANT MESSAGE>
+    """
+
+    memories = """
+    <USER MEMORIES>
+    {memories}
+    </USER MEMORIES>
+    """
@@ -1,6 +1,8 @@
 
 
 
+import asyncio
+import time
 import uuid
 
 
@@ -8,23 +10,44 @@ import uuid
 
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, MessagesState, START, END
+from langgraph.config import get_stream_writer
+from langgraph.constants import TAG_NOSTREAM
 
 
-from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, AIMessageChunk, AnyMessage, HumanMessage, SystemMessage
 from langchain_core.prompts import PromptTemplate
+from langchain_core.documents import Document
 
 
 
+from typing import Any, Hashable
 from typing_extensions import override
 from collections.abc import AsyncGenerator
 
 
 from src.operations._vector_db import vector_db_service
 from src.llm._base_llm import BaseLLM
-from src.llm._prompts import RAGLLM_Prompt
+from src.llm._llm_setup import get_reranker_service
+from src.llm._prompts import Memory_Prompt, RAGLLM_Prompt
 from src.llm._states import RAGLLMStates, RelevanceContext
+from src.utils.config import get_config
+from src.utils.logger import app_logger
+from src.utils.metrics import metrics
 
 
+logger = app_logger.getChild("src.llm._rag_llm")
+
+
+RERANKER_ENABLED = get_config("llm.reranker.enabled", False)
+RERANKER_CANDIDATES_K = get_config("llm.reranker.candidates_k", 20)
+RERANKER_TOP_N = get_config("llm.reranker.top_n", 3)
+
+RELEVANCE_BANDS = get_config("rag.relevance_grading", {}) or {}
+SPECULATIVE_GENERATION = get_config("rag.speculative_generation", False)
+
+MEMORY_RETRIEVAL_ENABLED = get_config("memory.retrieval.enabled", False)
+MEMORY_RETRIEVAL_LIMIT = get_config("memory.retrieval.limit", 3)
+
 
 
 class RAGLLM(BaseLLM):
@@ -36,34 +59,33 @@ class RAGLLM(BaseLLM):
     """
     
     
-    def __init__(
-        self,
-        user_id: uuid.UUID,
-        session_id: uuid.UUID,
-        dataset_id: uuid.UUID,
-        history_limit: int = 5,
-    ) -> None:
-        super().__init__(
-            user_id=user_id,
-            session_id=session_id,
-            history_limit=history_limit,
-        )
-
-        self.dataset_id = dataset_id
-        
+    def __init__(self) -> None:
+        # set before the graph is built, it decides whether the rerank node exists
         self.vector_db = vector_db_service
+        self.reranker = get_reranker_service() if RERANKER_ENABLED else None
+        
+        super().__init__()
+    
+    
+    @override
+    def _get_graph_variant(self) -> Hashable:
+        return ("reranked" if self.reranker is not None else "plain")
     
 
 
     @override
-    def _get_system_prompt(self, mode: str | None = None) -> SystemMessage:
+    def _get_system_prompt(self, mode: str | None = None, memories: list[str] | None = None) -> SystemMessage:
         if mode == "no_context":
             return SystemMessage(content=RAGLLM_Prompt.system_no_context)
         elif mode == "insufficient_context":
-            return SystemMessage(content=RAGLLM_Prompt.system_insufficient_context)
+            content = RAGLLM_Prompt.system_insufficient_context
         # elif mode == "sufficient_context":
         else:
-            return SystemMessage(content=RAGLLM_Prompt.system_sufficient_context)
+            content = RAGLLM_Prompt.system_sufficient_context
+        
+        if memories:
+            content += Memory_Prompt.memories.format(memories="\n".join(f"- {memory}" for memory in memories))
+        return SystemMessage(content=content)
 
     
     def _get_rag_prompt(self) -> PromptTemplate:
@@ -80,13 +102,7 @@ class RAGLLM(BaseLLM):
         return relevance_prompt_template
 
 
-    async def _retrieve_node(self, state: RAGLLMStates, config: RunnableConfig):
-        query = state["messages"][-1].content
-        retrieved_docs = await self.vector_db.search(
-            query=query,
-            dataset_id=self.dataset_id,
-        )
-        
+    def _build_context(self, retrieved_docs: list[Document]) -> str:
         if retrieved_docs:
             context = "\n".join([doc.page_content + doc.metadata["answer"] for doc in retrieved_docs])
             # chunks = []
@@ -98,12 +114,133 @@ class RAGLLM(BaseLLM):
         else:
             context = ""
         
-        return {"retrieved_docs": retrieved_docs, "context": context}
+        return context
+
+
+    async def _search_documents(self, query: str, config: RunnableConfig) -> list[Document]:
+        return await self.vector_db.search(
+            query=query,
+            dataset_id=config["configurable"]["dataset_id"],
+            # over-fetch, the reranker keeps the best top_n
+            k=RERANKER_CANDIDATES_K if self.reranker is not None else None,
+        )
+    
+    async def _search_memories(self, query: str, config: RunnableConfig) -> list[str]:
+        if not MEMORY_RETRIEVAL_ENABLED:
+            return []
+        
+        try:
+            results = await self.memory.search_memories(
+                user_id=str(config["configurable"]["user_id"]),
+                query=query,
+                limit=MEMORY_RETRIEVAL_LIMIT,
+            )
+        except Exception as e:
+            # memories only enrich the answer, a failed search must not fail the turn
+            logger.error(f"Error retrieving memories: {str(e)}")
+            return []
+        
+        return [item.value["content"] for item in results]
     
+    @override
+    async def _prefetch(self, user_query: str, config: RunnableConfig) -> dict[str, Any]:
+        # query embedding and both searches overlap the history round trips;
+        # the memory search swallows its errors, so nothing is left running on failure
+        retrieved_docs, memories = await asyncio.gather(
+            self._search_documents(user_query, config),
+            self._search_memories(user_query, config),
+        )
+        return {
+            "retrieved_docs": retrieved_docs,
+            "context": self._build_context(retrieved_docs),
+            "memories": memories,
+        }
+
 
+    async def _retrieve_node(self, state: RAGLLMStates, config: RunnableConfig):
+        self._report_progress("retrieving")
+        if "retrieved_docs" in state:
+            # prefetched by generate_chat_response
+            return {}
+        
+        retrieved_docs = await self._search_documents(state["messages"][-1].content, config)
+        return {"retrieved_docs": retrieved_docs, "context": self._build_context(retrieved_docs)}
+    
+    async def _retrieve_memory_node(self, state: RAGLLMStates, config: RunnableConfig):
+        # runs next to _retrieve_node, so it adds no latency of its own
+        if "memories" in state:
+            return {}
+        
+        return {"memories": await self._search_memories(state["messages"][-1].content, config)}
+    
+
+    async def _rerank_node(self, state: RAGLLMStates, config: RunnableConfig):
+        if not state["retrieved_docs"]:
+            return {}
+        
+        self._report_progress("reranking")
+        ranked = await self.reranker.arerank(
+            query=state["messages"][-1].content,
+            documents=state["retrieved_docs"],
+            top_n=RERANKER_TOP_N,
+        )
+        retrieved_docs = [doc for doc, _ in ranked]
+        rerank_scores = [score for _, score in ranked]
+        for doc, score in ranked:
+            doc.metadata["rerank_score"] = score
+        
+        return {
+            "retrieved_docs": retrieved_docs,
+            "context": self._build_context(retrieved_docs),
+            "rerank_scores": rerank_scores,
+        }
+    
+
+    
+
+    def _get_top_score(self, state: RAGLLMStates) -> tuple[str, float | None]:
+        if state.get("rerank_scores"):
+            return "rerank", state["rerank_scores"][0]
+        
+        # lexical-only hybrid matches and mmr results carry no similarity
+        similarities = [doc.metadata.get("similarity") for doc in state["retrieved_docs"]]
+        return "similarity", max([s for s in similarities if s is not None], default=None)
+    
+    def _grade_from_score(self, state: RAGLLMStates) -> str | None:
+        score_source, top_score = self._get_top_score(state)
+        band = RELEVANCE_BANDS.get(score_source) or {}
+        if top_score is None:
+            return None
+        
+        if band.get("high") is not None and top_score >= band["high"]:
+            return "yes"
+        if band.get("low") is not None and top_score <= band["low"]:
+            return "no"
+        return None
     
 
     async def _specify_context_relevance(self, state: RAGLLMStates, config: RunnableConfig):
+        self._report_progress("grading")
+        if state["context"] == "":
+            metrics.increment("rag.relevance.no_context")
+            return {}
+        
+        score_grade = self._grade_from_score(state)
+        if score_grade is not None:
+            metrics.increment(f"rag.relevance.score_{score_grade}")
+            return {"does_use_context": score_grade}
+        
+        # ambiguous score: let the generation node grade while it already answers
+        if SPECULATIVE_GENERATION:
+            metrics.increment("rag.relevance.speculative")
+            return {}
+        
+        return {"does_use_context": await self._grade_with_llm(state)}
+
+
+    async def _grade_with_llm(self, state: RAGLLMStates) -> str:
+        metrics.increment("rag.relevance.llm")
+        start = time.perf_counter()
 
         system_prompt = self._get_relevance_instruction()
         relevance_prompt = self._get_relevance_prompt().format(
@@ -112,22 +249,92 @@ class RAGLLM(BaseLLM):
         )
         relevance_message = HumanMessage(content=relevance_prompt)
 
-        relevance_grade = await self.chat_model.with_structured_output(RelevanceContext).ainvoke([system_prompt] + [relevance_message])
+        # nostream keeps the grader output out of the "messages" stream of the node running it
+        relevance_grade = await self.chat_model.with_structured_output(RelevanceContext).ainvoke(
+            [system_prompt] + [relevance_message],
+            config={"tags": [TAG_NOSTREAM]},
+        )
+        metrics.observe("rag.relevance.llm_latency_ms", (time.perf_counter() - start) * 1000)
+        metrics.increment(f"rag.relevance.llm_{relevance_grade.binary_score}")
 
-        if relevance_grade.binary_score == "yes":
-            return {"does_use_context": "yes"}
-        elif relevance_grade.binary_score == "no":
-            return {"does_use_context": "no"}
+        return relevance_grade.binary_score
 
 
+    def _get_sufficient_context_messages(self, state: RAGLLMStates) -> list[AnyMessage]:
+        system_message = self._get_system_prompt(mode="sufficient_context", memories=state.get("memories"))
+        # chat_history = state["messages"][:-1]
+        # if chat_history:
+        #     chat_history = self._custom_trim_messages(chat_history)
+        
+        rag_prompt = self._get_rag_prompt().format(
+            user_query=state["messages"][-1].content,
+            context=state["context"],
+        )
+        rag_message = HumanMessage(content=rag_prompt)
+        
+        # return [system_message] + chat_history + [rag_message]
+        return [system_message] + [rag_message]
+
+    async def _speculative_generation(self, state: RAGLLMStates, config: RunnableConfig):
+        """
+        Grade the context while already generating the context-based answer.
+
+        The answer is streamed silently into a queue. On "yes" the queued
+        tokens are flushed through the custom stream and the rest follows
+        live; on "no" the generation (and its Ollama request) is cancelled
+        and the insufficient-context answer is generated instead.
+        """
+        writer = get_stream_writer()
+        chunks: asyncio.Queue[AIMessageChunk | None] = asyncio.Queue()
+
+        async def generate():
+            try:
+                async for chunk in self.chat_model.astream(
+                    self._get_sufficient_context_messages(state),
+                    config={"tags": [TAG_NOSTREAM]},
+                ):
+                    chunks.put_nowait(chunk)
+            finally:
+                chunks.put_nowait(None)
+
+        generation = asyncio.create_task(generate())
+        try:
+            relevance = await self._grade_with_llm(state)
+        except BaseException:
+            _ = generation.cancel()
+            _ = await asyncio.gather(generation, return_exceptions=True)
+            raise
+
+        if relevance == "no":
+            _ = generation.cancel()
+            _ = await asyncio.gather(generation, return_exceptions=True)
+            metrics.increment("rag.speculative.discarded")
+            update = await self._generation_node({**state, "does_use_context": "no"}, config)
+            return {"does_use_context": "no", **update}
+
+        metrics.increment("rag.speculative.used")
+        metrics.observe("rag.speculative.buffered_chunks", chunks.qsize())
+        response = None
+        while (chunk := await chunks.get()) is not None:
+            if chunk.content:
+                writer({"token": chunk.content})
+            response = chunk if response is None else response + chunk
+        # surfaces errors of the generation task
+        await generation
+
+        # the tokens went out through the custom stream; the whole message the messages
+        # stream emits for this return value is skipped by generate_chat_response
+        message = AIMessage(content=response.content, id=response.id) if response else AIMessage(content="")
+        return {"does_use_context": "yes", "messages": message}
 
 
 
     @override
     async def _generation_node(self, state: RAGLLMStates, config: RunnableConfig):
+        self._report_progress("generating")
         
         if state["context"] == "":
-            system_message = self._get_system_prompt(mode="insufficient_context")
+            system_message = self._get_system_prompt(mode="insufficient_context", memories=state.get("memories"))
             
             user_message = HumanMessage(content=state["messages"][-1].content)
             
@@ -138,21 +345,13 @@ class RAGLLM(BaseLLM):
             return {"messages": response}
 
 
+        elif state.get("does_use_context") is None:
+            return await self._speculative_generation(state, config)
+
+
         elif state["does_use_context"] == "yes":
-            system_message = self._get_system_prompt(mode="sufficient_context")
-            # chat_history = state["messages"][:-1]
-            # if chat_history:
-            #     chat_history = self._custom_trim_messages(chat_history)
-            
-            rag_prompt = self._get_rag_prompt().format(
-                user_query=state["messages"][-1].content,
-                context=state["context"],
-            )
-            rag_message = HumanMessage(content=rag_prompt)
-            
             response = await self.chat_model.ainvoke(
-                # [system_message] + chat_history + [rag_message]
-                [system_message] + [rag_message]
+                self._get_sufficient_context_messages(state)
             )
             
             return {"messages": response}
@@ -160,7 +359,7 @@ class RAGLLM(BaseLLM):
 
         elif state["does_use_context"] == "no":
             # system_message = self._get_system_prompt(mode="insufficient_context")
-            system_message = self._get_system_prompt(mode="insufficient_context")
+            system_message = self._get_system_prompt(mode="insufficient_context", memories=state.get("memories"))
             # chat_history = state["messages"][:-1]
             # if chat_history:
             #     chat_history = self._custom_trim_messages(chat_history)
@@ -181,11 +380,19 @@ class RAGLLM(BaseLLM):
         builder = StateGraph(RAGLLMStates)
         
         builder.add_node("_retrieve_node", self._retrieve_node)
+        builder.add_node("_retrieve_memory_node", self._retrieve_memory_node)
         builder.add_node("_specify_context_relevance", self._specify_context_relevance)
         builder.add_node("_generation_node", self._generation_node)
         
+        # documents and memories are retrieved in the same superstep
         builder.add_edge(START, "_retrieve_node")
-        builder.add_edge("_retrieve_node", "_specify_context_relevance")
+        builder.add_edge(START, "_retrieve_memory_node")
+        if self.reranker is not None:
+            builder.add_node("_rerank_node", self._rerank_node)
+            builder.add_edge("_retrieve_node", "_rerank_node")
+            builder.add_edge(["_rerank_node", "_retrieve_memory_node"], "_specify_context_relevance")
+        else:
+            builder.add_edge(["_retrieve_node", "_retrieve_memory_node"], "_specify_context_relevance")
         builder.add_edge("_specify_context_relevance", "_generation_node")
         builder.add_edge("_generation_node", END)
         
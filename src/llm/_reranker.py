@@ -0,0 +1,119 @@
+"""
+Cross-encoder reranking for MultiRAG.
+
+This module provides a service scoring (query, chunk) pairs with the
+configured cross-encoder model, in batches on a dedicated executor,
+with a cache of scores already computed.
+"""
+
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.documents import Document
+from sentence_transformers import CrossEncoder
+
+from src.utils.cache import LRUCache
+from src.utils.logger import app_logger
+from src.utils.metrics import metrics
+
+logger = app_logger.getChild("src.llm._reranker")
+
+
+class RerankerService:
+    """
+    Reranks retrieved chunks against a query.
+
+    Attributes
+    ----------
+    model : CrossEncoder
+        The cross-encoder scoring (query, chunk) pairs.
+    batch_size : int
+        Number of pairs per forward pass.
+    """
+
+    def __init__(
+        self,
+        model: CrossEncoder,
+        batch_size: int = 16,
+        cache_size: int = 4096,
+        executor_workers: int = 1,
+    ) -> None:
+        """
+        Initialize the reranker service.
+
+        Parameters
+        ----------
+        model : CrossEncoder
+            The cross-encoder model.
+        batch_size : int, optional
+            Pairs per forward pass. Default is 16.
+        cache_size : int, optional
+            Number of (query, chunk) scores kept. Default is 4096.
+        executor_workers : int, optional
+            Threads running the model. Default is 1.
+        """
+        self.model = model
+        self.batch_size = batch_size
+
+        self._executor = ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix="reranker")
+        self._scores: LRUCache[tuple[str, str], float] = LRUCache(max_size=cache_size)
+
+        metrics.register_collector("reranker_cache", self._scores.stats)
+
+
+    @staticmethod
+    def get_document_text(document: Document) -> str:
+        return document.page_content + document.metadata.get("answer", "")
+
+    def _cache_key(self, query: str, text: str) -> tuple[str, str]:
+        return (query, hashlib.sha1(text.encode("utf-8")).hexdigest())
+
+    def _predict(self, pairs: list[tuple[str, str]]) -> list[float]:
+        scores = self.model.predict(pairs, batch_size=self.batch_size, convert_to_numpy=True, show_progress_bar=False)
+        return [float(score) for score in scores]
+
+    async def arerank(self, query: str, documents: list[Document], top_n: int) -> list[tuple[Document, float]]:
+        """
+        Score documents against a query and keep the best ones.
+
+        Parameters
+        ----------
+        query : str
+            The user query.
+        documents : list[Document]
+            Candidate chunks.
+        top_n : int
+            Number of documents to keep.
+
+        Returns
+        -------
+        list[tuple[Document, float]]
+            The ``top_n`` documents with their scores, best first.
+        """
+        if not documents:
+            return []
+
+        texts = [self.get_document_text(doc) for doc in documents]
+        keys = [self._cache_key(query, text) for text in texts]
+        scores = [self._scores.get(key) for key in keys]
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            loop = asyncio.get_running_loop()
+            start = time.perf_counter()
+            predicted = await loop.run_in_executor(
+                self._executor,
+                self._predict,
+                [(query, texts[i]) for i in missing],
+            )
+            metrics.observe("reranker.batch_size", len(missing))
+            metrics.observe("reranker.latency_ms", (time.perf_counter() - start) * 1000)
+
+            for i, score in zip(missing, predicted):
+                scores[i] = score
+                self._scores.put(keys[i], score)
+
+        ranked = sorted(zip(documents, scores), key=lambda pair: pair[1], reverse=True)
+        return ranked[:top_n]
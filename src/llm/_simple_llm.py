@@ -8,12 +8,13 @@ from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, START, END
 
 
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 
 # from langchain_text_splitters.character import CharacterTextSplitter
 
 
 
+from typing import Any
 from typing_extensions import override
 from collections.abc import AsyncGenerator
 
@@ -34,27 +35,47 @@ class SimpleLLM(BaseLLM):
     """
     
     
-    def __init__(
-        self, user_id: uuid.UUID, session_id: uuid.UUID, history_limit: int = 5,
-    ) -> None:
-        super().__init__(
-            user_id=user_id,
-            session_id=session_id,
-            history_limit=history_limit,
-        )
     
-
+    
+    uses_history_summary = True
     
     
     @override
     def _get_system_prompt(self, mode: str | None = None) -> SystemMessage:
         return SystemMessage(content=SimpleLLM_Prompt.system)
     
+    @override
+    async def _prefetch(self, user_query: str, config: RunnableConfig) -> dict[str, Any]:
+        return {"summary": await self.chat_history.get_summary(session_id=config["configurable"]["session_id"])}
+    
+    @override
+    async def _get_graph_input(
+        self, chat_history: list[BaseMessage], prefetched: dict[str, Any], config: RunnableConfig
+    ) -> dict[str, Any]:
+        summary = prefetched["summary"]
+        if summary is None:
+            return {"messages": chat_history}
+        
+        summary_text, last_message_id = summary
+        # messages still in the window may already be folded into the summary;
+        # cached messages get their (numeric) row id once written, and only
+        # written messages can be summarized; the current query has none
+        chat_history = [
+            message for message in chat_history
+            if not (message.id or "").isdigit() or int(message.id) > last_message_id
+        ]
+        return {"messages": chat_history, "summary": summary_text}
+    
     @override
     async def _generation_node(self, state: SimpleLLMStates, config: RunnableConfig):
+        self._report_progress("generating")
         
         system_message = self._get_system_prompt()
-        # chat_history = state["messages"][-self.history_limit:-1]
+        if state.get("summary"):
+            system_message = SystemMessage(
+                content=system_message.content + SimpleLLM_Prompt.summary.format(summary=state["summary"])
+            )
+        # chat_history = state["messages"][-config["configurable"]["history_limit"]:-1]
         chat_history = state["messages"][:-1]
         human_message = state["messages"][-1]
 
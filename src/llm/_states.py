@@ -12,17 +12,25 @@ from typing_extensions import Annotated, Literal
 
 
 class SimpleLLMStates(MessagesState):
-    pass
+    # rolling summary of the messages older than the history window
+    summary: str
 
 
 class RAGLLMStates(MessagesState):
     retrieved_docs: list[Document]
     context: str
+    rerank_scores: list[float]
     does_use_context: Literal["yes", "no"]
+    # long-term memories of the user relevant to the query
+    memories: list[str]
     
     # messages: Annotated[list[AnyMessage], add_messages]
 
 
 
 class RelevanceContext(BaseModel):
-    binary_score: Literal["yes", "no"]
\ No newline at end of file
+    binary_score: Literal["yes", "no"]
+
+
+class ExtractedMemories(BaseModel):
+    memories: list[str] = Field(default_factory=list)
@@ -0,0 +1,78 @@
+"""
+Wire formats of the chat response stream.
+
+This module encodes the frames streamed by ``/user/chat``. Besides the
+legacy NDJSON format (every token with the full completion so far) it
+provides delta-only NDJSON and Server-Sent Events, which send each token
+once and finish with a summary frame holding the full text.
+"""
+
+import json
+from typing import Any, Literal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+StreamFormat = Literal["legacy", "ndjson", "sse"]
+
+MEDIA_TYPES: dict[str, str] = {
+    "legacy": "application/x-ndjson; charset=utf-8",
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "sse": "text/event-stream; charset=utf-8",
+}
+
+
+def dumps(data: Any) -> str:
+    """Serialize a frame to compact JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def negotiate_stream_format(stream: str | None, accept: str | None) -> StreamFormat:
+    """
+    Pick the stream format of a chat request.
+
+    Parameters
+    ----------
+    stream : str, optional
+        Format asked for in the query string; takes precedence.
+    accept : str, optional
+        The ``Accept`` header of the request.
+
+    Returns
+    -------
+    StreamFormat
+        ``"sse"`` for ``text/event-stream`` clients, ``"legacy"`` otherwise.
+    """
+    if stream is not None:
+        return stream
+    if accept and "text/event-stream" in accept:
+        return "sse"
+    return "legacy"
+
+
+def encode_frame(stream_format: StreamFormat, event: str, data: dict) -> str:
+    """
+    Encode one frame of a delta stream.
+
+    Parameters
+    ----------
+    stream_format : StreamFormat
+        ``"ndjson"`` or ``"sse"``.
+    event : str
+        Frame type: ``progress``, ``delta``, ``done`` or ``error``.
+    data : dict
+        Payload of the frame.
+
+    Returns
+    -------
+    str
+        The encoded frame, including its line terminator.
+    """
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {dumps(data)}\n\n"
+    return dumps({"type": event, **data}) + "\n"
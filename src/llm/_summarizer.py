@@ -0,0 +1,131 @@
+"""
+Rolling summary of long conversations.
+
+This module folds the older messages of a chat session into a stored
+summary, in the background once a response has been streamed, so a
+chat turn only sends the summary and a recent window to the model.
+"""
+
+import asyncio
+import time
+import uuid
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from src.llm._llm_setup import get_chat_model
+from src.llm._prompts import Summary_Prompt
+from src.operations._chat_history import ChatHistoryService, chat_history_service
+from src.utils.config import get_config
+from src.utils.logger import app_logger
+from src.utils.metrics import metrics
+
+logger = app_logger.getChild("src.llm._summarizer")
+
+
+class ConversationSummarizer:
+    """
+    Background summarizer of chat sessions.
+
+    Once the messages not covered by the summary of a session exceed
+    ``trigger_tokens``, all but the most recent ``keep_tokens`` of them
+    are merged into the summary. At most one update runs per session.
+
+    Attributes
+    ----------
+    trigger_tokens : int
+        Unsummarized tokens that start an update.
+    keep_tokens : int
+        Recent tokens left out of the summary; matches the history window
+        read for each turn, so summary and window cover the whole session.
+    """
+
+    def __init__(self, chat_history: ChatHistoryService = chat_history_service) -> None:
+        self.chat_history = chat_history
+
+        self.enabled = get_config("chat_history.summary.enabled", False)
+        self.trigger_tokens = get_config("chat_history.summary.trigger_tokens", 3000)
+        self.keep_tokens = get_config("chat_history.summary.keep_tokens", get_config("chat_history.window.max_tokens", 2000))
+        self.max_words = get_config("chat_history.summary.max_words", 300)
+
+        self._tasks: dict[uuid.UUID, asyncio.Task] = {}
+
+
+    def schedule(self, user_id: uuid.UUID, session_id: uuid.UUID) -> None:
+        """Update the summary of a session in the background, if it needs one."""
+        if not self.enabled:
+            return
+
+        task = self._tasks.get(session_id)
+        if task is not None and not task.done():
+            return
+
+        task = asyncio.create_task(self._run(user_id, session_id))
+        self._tasks[session_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(session_id, None) if self._tasks.get(session_id) is task else None)
+
+    async def close(self) -> None:
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            _ = task.cancel()
+        _ = await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+
+    async def _run(self, user_id: uuid.UUID, session_id: uuid.UUID) -> None:
+        try:
+            await self.update(user_id=user_id, session_id=session_id)
+        except Exception as e:
+            metrics.increment("chat_summary.failed")
+            logger.error(f"Error summarizing session {session_id}: {str(e)}")
+
+    async def update(self, user_id: uuid.UUID, session_id: uuid.UUID) -> bool:
+        """
+        Fold the older unsummarized messages of a session into its summary.
+
+        Returns
+        -------
+        bool
+            Whether the summary was updated.
+        """
+        current = await self.chat_history.get_summary(session_id=session_id)
+        summary, last_message_id = current if current is not None else ("", 0)
+
+        rows = await self.chat_history.get_messages_after(user_id=user_id, session_id=session_id, after_id=last_message_id)
+        if sum(token_count for _, _, token_count in rows) <= self.trigger_tokens:
+            return False
+
+        # keep the most recent keep_tokens out of the summary
+        split = len(rows)
+        kept_tokens = 0
+        while split > 0 and kept_tokens + rows[split - 1][2] <= self.keep_tokens:
+            kept_tokens += rows[split - 1][2]
+            split -= 1
+        to_fold = rows[:split]
+        if not to_fold:
+            return False
+
+        start = time.perf_counter()
+        transcript = "\n".join(f"{message.type}: {message.content}" for _, message, _ in to_fold)
+        response = await get_chat_model().ainvoke([
+            SystemMessage(content=Summary_Prompt.instruction.format(max_words=self.max_words)),
+            HumanMessage(content=Summary_Prompt.summarize.format(summary=summary, messages=transcript)),
+        ])
+
+        await self.chat_history.save_summary(
+            user_id=user_id,
+            session_id=session_id,
+            summary=response.content,
+            last_message_id=to_fold[-1][0],
+        )
+
+        metrics.increment("chat_summary.updates")
+        metrics.observe("chat_summary.folded_messages", len(to_fold))
+        metrics.observe("chat_summary.latency_ms", (time.perf_counter() - start) * 1000)
+        logger.info(f"Folded {len(to_fold)} messages into the summary of session {session_id}")
+        return True
+
+
+
+
+# Singleton instance
+summarizer = ConversationSummarizer()
@@ -15,7 +15,7 @@ from typing_extensions import override
 
 
 from src.llm._rag_llm import RAGLLM
-from src.llm._prompts import UserRAGLLM_Prompt
+from src.llm._prompts import Memory_Prompt, UserRAGLLM_Prompt
 
 
 
@@ -28,24 +28,13 @@ class UserRAGLLM(RAGLLM):
     """
     
     
-    def __init__(
-        self,
-        user_id: uuid.UUID,
-        session_id: uuid.UUID,
-        dataset_id: uuid.UUID,
-        history_limit: int = 5,
-    ) -> None:
-        super().__init__(
-            user_id=user_id,
-            session_id=session_id,
-            dataset_id=dataset_id,
-            history_limit=history_limit,
-        )
-
     
     @override
-    def _get_system_prompt(self) -> SystemMessage:
-        return SystemMessage(content=UserRAGLLM_Prompt.system)
+    def _get_system_prompt(self, mode: str | None = None, memories: list[str] | None = None) -> SystemMessage:
+        content = UserRAGLLM_Prompt.system
+        if memories:
+            content += Memory_Prompt.memories.format(memories="\n".join(f"- {memory}" for memory in memories))
+        return SystemMessage(content=content)
     
     @override
     def _get_rag_prompt(self) -> PromptTemplate:
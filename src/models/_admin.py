@@ -3,7 +3,7 @@
 
 
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import DateTime, ForeignKey, String, Boolean, Enum as SQLEnum, LargeBinary
+from sqlalchemy import DateTime, ForeignKey, String, Text, Boolean, Enum as SQLEnum, LargeBinary
 
 
 import uuid
@@ -11,7 +11,7 @@ from enum import Enum
 
 
 from src.models._base_sqlalchemy import Base, CURRENT_TIME
-from src.schema._admin import AdminUploadedDatasetType
+from src.schema._admin import AdminUploadedDatasetType, VectorizationJobState
 
 
 
@@ -40,3 +40,29 @@ class AdminUploadedDatasetContent(Base):
 
     dataset_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("admin_uploaded_dataset_info.id", ondelete="CASCADE"), primary_key=True)
     content: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+
+
+class VectorizationJob(Base):
+    __tablename__ = "vectorization_job"
+    __table_args__ = {'extend_existing': True}
+
+    dataset_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("admin_uploaded_dataset_info.id", ondelete="CASCADE"), index=True, nullable=False)
+    # name of the RAG system created once the job succeeds
+    rag_name: Mapped[str] = mapped_column(String(80), nullable=False)
+    state: Mapped[VectorizationJobState] = mapped_column(SQLEnum(VectorizationJobState), index=True, default=VectorizationJobState.QUEUED)
+    stage: Mapped[str | None] = mapped_column(String(32), nullable=True, default=None)
+    processed: Mapped[int] = mapped_column(default=0)
+    total: Mapped[int | None] = mapped_column(nullable=True, default=None)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True, default=None)
+    # documents whose embedding came from the shared embedding cache, or had to be computed
+    embedding_cache_hits: Mapped[int] = mapped_column(default=0)
+    embedding_cache_misses: Mapped[int] = mapped_column(default=0)
+    rag_system_id: Mapped[uuid.UUID | None] = mapped_column(nullable=True, default=None)
+    created_at: Mapped[DateTime] = mapped_column(DateTime, default_factory=CURRENT_TIME)
+    started_at: Mapped[DateTime | None] = mapped_column(DateTime, nullable=True, default=None)
+    finished_at: Mapped[DateTime | None] = mapped_column(DateTime, nullable=True, default=None)
+    # refreshed by the process running the job; a stale one means that process is gone
+    heartbeat_at: Mapped[DateTime | None] = mapped_column(DateTime, nullable=True, default=None)
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, index=True, default_factory=uuid.uuid4)
+
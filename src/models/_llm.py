@@ -2,7 +2,8 @@
 
 
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import DateTime, String, Enum as SQLEnum, ForeignKey
+from sqlalchemy import DateTime, String, Enum as SQLEnum, ForeignKey, LargeBinary, REAL
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
 
 import uuid
@@ -47,3 +48,14 @@ class ChatSession(Base):
     last_active: Mapped[DateTime] = mapped_column(DateTime, default_factory=CURRENT_TIME)
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, index=True, nullable=False, default_factory=uuid.uuid4)
 
+
+
+class EmbeddingCacheEntry(Base):
+    __tablename__ = "embedding_cache"
+    __table_args__ = {'extend_existing': True}
+
+    # shared by every dataset: the same text embedded by the same model gives the same vector
+    model: Mapped[str] = mapped_column(String(255), primary_key=True)
+    text_hash: Mapped[bytes] = mapped_column(LargeBinary(32), primary_key=True)  # SHA-256 of the UTF-8 text
+    embedding: Mapped[list[float]] = mapped_column(ARRAY(REAL), nullable=False)
+    created_at: Mapped[DateTime] = mapped_column(DateTime, default_factory=CURRENT_TIME)
@@ -6,18 +6,21 @@ import sqlalchemy as sa
 from pydantic import validate_call
 
 import uuid
+from datetime import datetime
 
 
-from src.operations._db_setup import get_sqlalchemy_db
-from src.models._admin import AdminUploadedDatasetInfo, AdminUploadedDatasetContent
-from src.schema._admin import AdminUploadedDatasetType
+from src.models._base_sqlalchemy import CURRENT_TIME
+from src.operations._db_setup import DatabaseManager, db_manager
+from src.operations._metadata_cache import DatasetInfo, metadata_cache
+from src.models._admin import AdminUploadedDatasetInfo, AdminUploadedDatasetContent, VectorizationJob
+from src.schema._admin import AdminUploadedDatasetType, VectorizationJobState
 from src.utils.logger import app_logger
 
 logger = app_logger.getChild("src.operations._admin")
 
 class AdminUploadedDatasetContentOperations:
-    def __init__(self) -> None:
-        self.session = get_sqlalchemy_db
+    def __init__(self, db: DatabaseManager = db_manager) -> None:
+        self.session = db.get_sqlalchemy_db
     
 
     async def create(self, dataset_id: uuid.UUID, content: bytes):
@@ -45,8 +48,8 @@ class AdminUploadedDatasetContentOperations:
 
 
 class AdminUploadedDatasetInfoOperations:
-    def __init__(self) -> None:
-        self.session = get_sqlalchemy_db
+    def __init__(self, db: DatabaseManager = db_manager) -> None:
+        self.session = db.get_sqlalchemy_db
     
     
     @validate_call
@@ -72,6 +75,7 @@ class AdminUploadedDatasetInfoOperations:
         async with self.session() as session:
             _ = await session.execute(query)
             await session.commit()
+        metadata_cache.invalidate_dataset("admin", dataset_id)
     
     async def get_by_dataset_id(self, dataset_id: uuid.UUID):
         query = sa.select(AdminUploadedDatasetInfo).where(AdminUploadedDatasetInfo.id==dataset_id)
@@ -81,6 +85,18 @@ class AdminUploadedDatasetInfoOperations:
         
         return dataset
     
+    async def get_info(self, dataset_id: uuid.UUID) -> DatasetInfo | None:
+        """Return a cached snapshot of a dataset, querying it on a miss."""
+        info = metadata_cache.get_dataset("admin", dataset_id)
+        if info is None:
+            dataset = await self.get_by_dataset_id(dataset_id=dataset_id)
+            if dataset is None:
+                return None
+            info = DatasetInfo(id=dataset.id, is_vectorized=dataset.is_vectorized, expertise=dataset.expertise)
+            metadata_cache.put_dataset("admin", info)
+        
+        return info
+    
     async def list_by_admin_id(self, admin_id: uuid.UUID):
         query = sa.select(AdminUploadedDatasetInfo).where(AdminUploadedDatasetInfo.admin_id==admin_id)
         
@@ -111,8 +127,140 @@ class AdminUploadedDatasetInfoOperations:
             if dataset:
                 _ = await session.execute(update_query)
                 await session.commit()
+                metadata_cache.invalidate_dataset("admin", dataset_id)
                 dataset.is_vectorized = is_vectorized
                 return dataset
             else:
                 raise ValueError(f"Upload with ID {dataset_id} not found")
 
+
+
+class VectorizationJobOperations:
+    def __init__(self, db: DatabaseManager = db_manager) -> None:
+        self.session = db.get_sqlalchemy_db
+    
+    
+    async def create(self, dataset_id: uuid.UUID, rag_name: str):
+        job = VectorizationJob(dataset_id=dataset_id, rag_name=rag_name)
+        
+        async with self.session() as session:
+            session.add(job)
+            await session.commit()
+        
+        return job
+    
+    async def get(self, job_id: uuid.UUID):
+        query = sa.select(VectorizationJob).where(VectorizationJob.id==job_id)
+        
+        async with self.session() as session:
+            job = await session.scalar(query)
+        
+        return job
+    
+    async def get_active_by_dataset_id(self, dataset_id: uuid.UUID):
+        query = sa.select(VectorizationJob).where(
+            VectorizationJob.dataset_id==dataset_id,
+            VectorizationJob.state.in_([VectorizationJobState.QUEUED, VectorizationJobState.RUNNING]),
+        )
+        
+        async with self.session() as session:
+            job = await session.scalar(query)
+        
+        return job
+    
+    async def list_by_dataset_id(self, dataset_id: uuid.UUID):
+        query = sa.select(VectorizationJob).where(VectorizationJob.dataset_id==dataset_id)\
+            .order_by(VectorizationJob.created_at.desc())
+        
+        async with self.session() as session:
+            jobs = await session.scalars(query)
+        
+        return jobs.all()
+    
+    async def list_by_state(self, states: list[VectorizationJobState]):
+        query = sa.select(VectorizationJob).where(VectorizationJob.state.in_(states))\
+            .order_by(VectorizationJob.created_at)
+        
+        async with self.session() as session:
+            jobs = await session.scalars(query)
+        
+        return jobs.all()
+    
+    async def update(
+        self,
+        job_id: uuid.UUID,
+        only_if_state: list[VectorizationJobState] | None = None,
+        unless_stage: str | None = None,
+        **values,
+    ) -> bool:
+        """
+        Update columns of a job.
+        
+        Parameters
+        ----------
+        job_id : uuid.UUID
+            ID of the job.
+        only_if_state : list[VectorizationJobState], optional
+            Update only while the job is in one of these states, so a
+            cancelled job is never moved back to running or succeeded.
+        unless_stage : str, optional
+            Skip the update while the job is in this stage.
+        **values
+            Column values to set.
+            
+        Returns
+        -------
+        bool
+            Whether the job was updated.
+        """
+        query = sa.update(VectorizationJob).where(VectorizationJob.id==job_id).values(**values)
+        if only_if_state is not None:
+            query = query.where(VectorizationJob.state.in_(only_if_state))
+        if unless_stage is not None:
+            query = query.where(VectorizationJob.stage.is_distinct_from(unless_stage))
+        
+        async with self.session() as session:
+            result = await session.execute(query)
+            await session.commit()
+        
+        return result.rowcount > 0
+    
+    async def heartbeat(self, job_ids: list[uuid.UUID]) -> None:
+        """Mark running jobs of this process as alive."""
+        query = sa.update(VectorizationJob).where(
+            VectorizationJob.id.in_(job_ids),
+            VectorizationJob.state==VectorizationJobState.RUNNING,
+        ).values(heartbeat_at=CURRENT_TIME())
+        
+        async with self.session() as session:
+            _ = await session.execute(query)
+            await session.commit()
+    
+    async def fail_stale(self, stale_before: datetime, error: str) -> list[tuple[uuid.UUID, uuid.UUID]]:
+        """
+        Fail running jobs whose heartbeat is older than ``stale_before``.
+        
+        One statement, so a job left by a stopped process is taken over by
+        exactly one of the processes sharing the table.
+        
+        Returns
+        -------
+        list[tuple[uuid.UUID, uuid.UUID]]
+            ``(job_id, dataset_id)`` of every job failed by this call.
+        """
+        query = sa.update(VectorizationJob).where(
+            VectorizationJob.state==VectorizationJobState.RUNNING,
+            sa.or_(VectorizationJob.heartbeat_at.is_(None), VectorizationJob.heartbeat_at < stale_before),
+        ).values(
+            state=VectorizationJobState.FAILED,
+            error=error,
+            finished_at=CURRENT_TIME(),
+        ).returning(VectorizationJob.id, VectorizationJob.dataset_id)
+        
+        async with self.session() as session:
+            result = await session.execute(query)
+            jobs = [(job_id, dataset_id) for job_id, dataset_id in result.all()]
+            await session.commit()
+        
+        return jobs
+
@@ -7,7 +7,7 @@ import uuid
 from src.models._llm import RAGSystem
 from src.models._user import User
 from src.models._association_tables import UserRAGSystemJunction
-from src.operations._db_setup import get_sqlalchemy_db
+from src.operations._db_setup import DatabaseManager, db_manager
 from src.utils.logger import app_logger
 
 logger = app_logger.getChild("src.operations._association")
@@ -16,8 +16,8 @@ logger = app_logger.getChild("src.operations._association")
 
 
 class UserRAGSystemJunctionOperations:
-    def __init__(self) -> None:
-        self.session = get_sqlalchemy_db
+    def __init__(self, db: DatabaseManager = db_manager) -> None:
+        self.session = db.get_sqlalchemy_db
     
 
     async def add_user_access(self, user_id: uuid.UUID, rag_system_id: uuid.UUID):
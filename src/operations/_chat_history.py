@@ -1,84 +1,556 @@
 
 import uuid
-from langchain_postgres import PostgresChatMessageHistory
-from langchain_core.messages import HumanMessage, AIMessage
+from collections import deque
+from dataclasses import dataclass, field
 
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, message_to_dict, messages_from_dict
+from langchain_core.messages.utils import count_tokens_approximately
+from psycopg import AsyncConnection, sql
+from psycopg.types.json import Jsonb
 
-from src.operations._db_setup import get_psycopg_db, drop_table
+
+from src.operations._chat_writer import ChatWriteBehind, chat_writer
+from src.operations._db_setup import DatabaseManager, db_manager
+from src.utils.cache import LRUCache
+from src.utils.config import get_config
 from src.utils.logger import app_logger
+from src.utils.metrics import metrics
 
 
 logger = app_logger.getChild("src.operations._chat_history")
 
 
+# per-user tables created by PostgresChatMessageHistory before the shared table
+LEGACY_TABLE_PREFIX = "chat_histories_user_id_"
+
+
+@dataclass
+class _SessionWindow:
+    """Most recent messages of a session, oldest first."""
+    messages: deque[BaseMessage] = field(default_factory=deque)
+    tokens: deque[int] = field(default_factory=deque)
+    # the window holds the whole session
+    complete: bool = False
+    # messages kept on append when a request needed more than the configured window
+    max_messages: int = 0
+
+    def append(self, message: BaseMessage, token_count: int, max_messages: int) -> None:
+        self.messages.append(message)
+        self.tokens.append(token_count)
+        while len(self.messages) > max(max_messages, self.max_messages):
+            self.messages.popleft()
+            self.tokens.popleft()
+            self.complete = False
+
+    def covers(self, last_n: int | None, max_tokens: int | None) -> bool:
+        if self.complete:
+            return True
+        if last_n is None and max_tokens is None:
+            return False
+        # either limit reached inside the window bounds the tail
+        return (last_n is not None and last_n <= len(self.messages)) or (max_tokens is not None and max_tokens <= sum(self.tokens))
+
+
+def _tail(messages: list[BaseMessage], tokens: list[int], last_n: int | None, max_tokens: int | None) -> list[BaseMessage]:
+    """Keep the last ``last_n`` messages fitting in ``max_tokens``, and at least the last one."""
+    start = len(messages)
+    budget = max_tokens
+    while start > 0 and (last_n is None or len(messages) - start < last_n):
+        if budget is not None:
+            if tokens[start - 1] > budget and start < len(messages):
+                break
+            budget -= tokens[start - 1]
+        start -= 1
+    return messages[start:]
+
+
 class ChatHistoryService:
-    def __init__(self) -> None:
-        self.connection = get_psycopg_db
-    
+    """
+    Chat history of every user in one hash-partitioned table.
+
+    Rows are partitioned by ``user_id`` and indexed on ``(session_id, id)``,
+    and keep the approximate token count of their message so windows and
+    summaries never recount them. Long sessions get a rolling summary of
+    their older messages in a separate table.
+    Users whose messages still live in a legacy per-user table are moved
+    to the shared table the first time their history is touched, and
+    ``migrate_legacy_tables`` moves the rest in the background.
+    """
+
+    def __init__(self, db: DatabaseManager = db_manager, writer: ChatWriteBehind = chat_writer) -> None:
+        self.connection = db.get_psycopg_db
+        self.writer = writer
+
+        self.table_name = get_config("chat_history.table_name", "chat_message")
+        self.summary_table_name = get_config("chat_history.summary.table_name", "chat_summary")
+        self.partitions = get_config("chat_history.partitions", 16)
+        self.migration_batch_size = get_config("chat_history.migration_batch_size", 1000)
+        self.page_size = get_config("chat_history.page_size", 50)
+        self.window_messages = get_config("chat_history.cache.window_messages", 50)
+        # a window enlarged by a longer request is only cached up to this size
+        self.max_window_messages = get_config("chat_history.cache.max_window_messages", 200)
+
+        # write-through cache of the recent messages of hot sessions
+        self._windows: LRUCache[tuple[uuid.UUID, uuid.UUID], _SessionWindow] = LRUCache(
+            max_size=get_config("chat_history.cache.max_sessions", 1024),
+        )
+        metrics.register_collector("chat_history_cache", self._windows.stats)
+        # summary text and id of the last summarized message per session
+        self._summaries: LRUCache[uuid.UUID, tuple[str, int] | None] = LRUCache(
+            max_size=get_config("chat_history.cache.max_sessions", 1024),
+        )
+
+        # users known to have no legacy table left
+        self._migrated_users: set[uuid.UUID] = set()
+
     def _get_table_name(self, user_id: uuid.UUID) -> str:
-        return f"chat_histories_user_id_{str(user_id).replace('-', '_')}"
-    
-    
-    async def create_user_chat_history(self, user_id: uuid.UUID):
-        TABLE_NAME = self._get_table_name(user_id=user_id)
-        
+        return f"{LEGACY_TABLE_PREFIX}{str(user_id).replace('-', '_')}"
+
+
+    async def setup(self) -> None:
+        table = sql.Identifier(self.table_name)
+
+        async with self.connection() as conn:
+            async with conn.transaction():
+                await conn.execute(sql.SQL(
+                    "CREATE TABLE IF NOT EXISTS {table} ("
+                    " id BIGSERIAL,"
+                    " user_id UUID NOT NULL,"
+                    " session_id UUID NOT NULL,"
+                    " message JSONB NOT NULL,"
+                    " token_count INT,"
+                    " created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),"
+                    " PRIMARY KEY (user_id, id)"
+                    ") PARTITION BY HASH (user_id)"
+                ).format(table=table))
+
+                for remainder in range(self.partitions):
+                    await conn.execute(sql.SQL(
+                        "CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {table} "
+                        "FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})"
+                    ).format(
+                        partition=sql.Identifier(f"{self.table_name}_p{remainder}"),
+                        table=table,
+                        modulus=sql.Literal(self.partitions),
+                        remainder=sql.Literal(remainder),
+                    ))
+
+                await conn.execute(sql.SQL(
+                    "CREATE INDEX IF NOT EXISTS {index} ON {table} (session_id, id)"
+                ).format(index=sql.Identifier(f"{self.table_name}_session_id_id_idx"), table=table))
+
+                # tables created before token counts were stored
+                await conn.execute(sql.SQL(
+                    "ALTER TABLE {table} ADD COLUMN IF NOT EXISTS token_count INT"
+                ).format(table=table))
+
+                await conn.execute(sql.SQL(
+                    "CREATE TABLE IF NOT EXISTS {summary_table} ("
+                    " session_id UUID PRIMARY KEY,"
+                    " user_id UUID NOT NULL,"
+                    " summary TEXT NOT NULL,"
+                    " last_message_id BIGINT NOT NULL,"
+                    " updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()"
+                    ")"
+                ).format(summary_table=sql.Identifier(self.summary_table_name)))
+                await conn.execute(sql.SQL(
+                    "CREATE INDEX IF NOT EXISTS {index} ON {summary_table} (user_id)"
+                ).format(
+                    index=sql.Identifier(f"{self.summary_table_name}_user_id_idx"),
+                    summary_table=sql.Identifier(self.summary_table_name),
+                ))
+
+
+    async def _migrate_user_batch(self, conn: AsyncConnection, user_id: uuid.UUID, batch_size: int | None) -> int | None:
+        """
+        Move the oldest rows of a legacy table to the shared table.
+
+        Returns the number of rows moved, or None once the legacy table
+        is gone. Rows are moved in id order, so they keep their order
+        in the shared table.
+        """
+        legacy_name = self._get_table_name(user_id=user_id)
+        legacy_table = sql.Identifier(legacy_name)
+
+        async with conn.transaction():
+            # serializes the background migration with first-touch migration of the same user
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (legacy_name,))
+
+            cursor = await conn.execute("SELECT to_regclass(%s)", (legacy_name,))
+            if (await cursor.fetchone())[0] is None:
+                return None
+
+            limit = sql.SQL("LIMIT {}").format(sql.Literal(batch_size)) if batch_size else sql.SQL("")
+            cursor = await conn.execute(sql.SQL(
+                "WITH moved AS ("
+                " DELETE FROM {legacy} WHERE id IN (SELECT id FROM {legacy} ORDER BY id {limit})"
+                " RETURNING id, session_id, message, created_at"
+                ") "
+                "INSERT INTO {table} (user_id, session_id, message, created_at) "
+                "SELECT %s, session_id, message, created_at FROM moved ORDER BY id"
+            ).format(legacy=legacy_table, limit=limit, table=sql.Identifier(self.table_name)), (user_id,))
+            moved = cursor.rowcount
+
+            if moved == 0:
+                await conn.execute(sql.SQL("DROP TABLE {legacy}").format(legacy=legacy_table))
+                return None
+
+        metrics.increment("chat_history.migrated_rows", moved)
+        return moved
+
+    async def _ensure_migrated(self, conn: AsyncConnection | None, user_id: uuid.UUID) -> None:
+        if user_id in self._migrated_users:
+            return
+
+        if conn is None:
+            async with self.connection() as conn:
+                await self._ensure_migrated(conn, user_id=user_id)
+            return
+
+        while await self._migrate_user_batch(conn, user_id=user_id, batch_size=None) is not None:
+            pass
+        self._migrated_users.add(user_id)
+
+    async def _flush_pending(self, session_id: uuid.UUID | None = None) -> None:
+        # reads and deletes must see (or remove) appends still queued in the writer
+        if session_id is None or self.writer.has_pending(session_id):
+            await self.writer.flush()
+
+    async def migrate_legacy_tables(self, batch_size: int | None = None) -> int:
+        """
+        Move every legacy per-user table into the shared table.
+
+        Tables are moved batch by batch, each batch in its own short
+        transaction, so the service keeps serving requests meanwhile.
+
+        Parameters
+        ----------
+        batch_size : int, optional
+            Rows moved per transaction. Default is
+            ``chat_history.migration_batch_size``.
+
+        Returns
+        -------
+        int
+            Number of rows moved.
+        """
+        batch_size = batch_size or self.migration_batch_size
+
         async with self.connection() as conn:
-            await PostgresChatMessageHistory.acreate_tables(conn, TABLE_NAME)
-            
-    
+            cursor = await conn.execute(
+                "SELECT tablename FROM pg_tables WHERE schemaname = current_schema() AND tablename LIKE %s",
+                (LEGACY_TABLE_PREFIX.replace("_", r"\_") + "%",),
+            )
+            legacy_tables = [row[0] for row in await cursor.fetchall()]
+
+        total = 0
+        for i, legacy_name in enumerate(legacy_tables, 1):
+            user_id = uuid.UUID(legacy_name.removeprefix(LEGACY_TABLE_PREFIX).replace("_", "-"))
+
+            async with self.connection() as conn:
+                while (moved := await self._migrate_user_batch(conn, user_id=user_id, batch_size=batch_size)) is not None:
+                    total += moved
+            self._migrated_users.add(user_id)
+
+            logger.info(f"Migrated chat history of user {user_id} ({i}/{len(legacy_tables)})")
+
+        return total
+
+
+    async def create_user_chat_history(self, user_id: uuid.UUID):
+        # nothing to create per user, the shared table is partitioned by user_id
+        self._migrated_users.add(user_id)
+
+
     async def delete_user_chat_history(self, user_id: uuid.UUID):
-        TABLE_NAME = self._get_table_name(user_id=user_id)
-        
-        await drop_table(TABLE_NAME)
-    
+        await self._flush_pending()
+        async with self.connection() as conn:
+            await conn.execute(
+                sql.SQL("DROP TABLE IF EXISTS {legacy}").format(legacy=sql.Identifier(self._get_table_name(user_id=user_id)))
+            )
+            await conn.execute(
+                sql.SQL("DELETE FROM {table} WHERE user_id = %s").format(table=sql.Identifier(self.table_name)),
+                (user_id,),
+            )
+            await conn.execute(
+                sql.SQL("DELETE FROM {summary_table} WHERE user_id = %s").format(summary_table=sql.Identifier(self.summary_table_name)),
+                (user_id,),
+            )
+        self._migrated_users.discard(user_id)
+        for key in self._windows:
+            if key[0] == user_id:
+                _ = self._windows.pop(key)
+                _ = self._summaries.pop(key[1])
+
     async def delete_session_history(self, user_id: uuid.UUID, session_id: uuid.UUID):
-        TABLE_NAME = self._get_table_name(user_id=user_id)
-        
+        await self._flush_pending(session_id)
         async with self.connection() as conn:
-            session_history = PostgresChatMessageHistory(
-                TABLE_NAME,  # Optional custom table
-                str(session_id),
-                async_connection=conn,
+            await self._ensure_migrated(conn, user_id=user_id)
+            await conn.execute(
+                sql.SQL("DELETE FROM {table} WHERE user_id = %s AND session_id = %s").format(table=sql.Identifier(self.table_name)),
+                (user_id, session_id),
+            )
+            await conn.execute(
+                sql.SQL("DELETE FROM {summary_table} WHERE session_id = %s").format(summary_table=sql.Identifier(self.summary_table_name)),
+                (session_id,),
             )
-            await session_history.aclear()
-    
-    async def get_session_messages(self, user_id: uuid.UUID, session_id: uuid.UUID):
-        TABLE_NAME = self._get_table_name(user_id=user_id)
+        _ = self._windows.pop((user_id, session_id))
+        _ = self._summaries.pop(session_id)
+
+
+    async def _fetch_page(
+        self,
+        conn: AsyncConnection,
+        user_id: uuid.UUID,
+        session_id: uuid.UUID,
+        before_id: int | None,
+        limit: int,
+    ) -> list[tuple[int, BaseMessage, int]]:
+        # newest first, keyset on (session_id, id)
+        cursor = await conn.execute(
+            sql.SQL(
+                "SELECT id, message, token_count FROM {table} "
+                "WHERE user_id = %s AND session_id = %s AND (%s::bigint IS NULL OR id < %s) "
+                "ORDER BY id DESC LIMIT %s"
+            ).format(table=sql.Identifier(self.table_name)),
+            (user_id, session_id, before_id, before_id, limit),
+        )
+        return self._parse_rows(await cursor.fetchall())
+
+    def _parse_rows(self, rows: list[tuple]) -> list[tuple[int, BaseMessage, int]]:
+        messages = messages_from_dict([row[1] for row in rows])
+        parsed = []
+        for (message_id, _, token_count), message in zip(rows, messages):
+            # the row id tells the summarizer which messages it already folded
+            message.id = str(message_id)
+            if token_count is None:
+                # rows moved from the legacy tables
+                token_count = count_tokens_approximately([message])
+            parsed.append((message_id, message, token_count))
+        return parsed
+
+    async def _load_tail(
+        self,
+        user_id: uuid.UUID,
+        session_id: uuid.UUID,
+        last_n: int | None,
+        max_tokens: int | None = None,
+    ) -> _SessionWindow:
+        await self._flush_pending(session_id)
+        window = _SessionWindow()
+        before_id = None
+        total_tokens = 0
+
+        async with self.connection() as conn:
+            await self._ensure_migrated(conn, user_id=user_id)
+            while True:
+                page = await self._fetch_page(conn, user_id, session_id, before_id=before_id, limit=self.page_size)
+                for message_id, message, tokens in page:
+                    window.messages.appendleft(message)
+                    window.tokens.appendleft(tokens)
+                    total_tokens += tokens
+                    before_id = message_id
+
+                if len(page) < self.page_size:
+                    window.complete = True
+                    break
+                if last_n is not None and len(window.messages) >= last_n:
+                    break
+                if max_tokens is not None and total_tokens >= max_tokens:
+                    break
+
+        return window
+
+    async def get_session_messages(
+        self,
+        user_id: uuid.UUID,
+        session_id: uuid.UUID,
+        last_n: int | None = None,
+        max_tokens: int | None = None,
+    ) -> list[BaseMessage]:
+        """
+        Return the messages of a session, oldest first.
+
+        Parameters
+        ----------
+        user_id : uuid.UUID
+            ID of the user.
+        session_id : uuid.UUID
+            ID of the chat session.
+        last_n : int, optional
+            Return at most the last ``last_n`` messages.
+        max_tokens : int, optional
+            Return the last messages fitting in ``max_tokens``
+            (approximate count).
+
+        Returns
+        -------
+        list[BaseMessage]
+            The whole session, or its tail when a limit is given.
+        """
+        key = (user_id, session_id)
+        window = self._windows.get(key)
+        if window is None:
+            window = await self._load_tail(user_id, session_id, last_n=self.window_messages)
+            self._windows.put(key, window)
+
+        if not window.covers(last_n, max_tokens):
+            # the request reaches past the cached window
+            metrics.increment("chat_history.window_miss")
+            window = await self._load_tail(user_id, session_id, last_n=last_n, max_tokens=max_tokens)
+            # a bounded larger window is kept, so the next turn of the session is served from it;
+            # longer loads (e.g. the whole session, without limits) are returned uncached
+            if len(window.messages) <= self.max_window_messages:
+                window.max_messages = len(window.messages)
+                self._windows.put(key, window)
+
+        return _tail(list(window.messages), list(window.tokens), last_n=last_n, max_tokens=max_tokens)
+
+    async def warm_session(self, user_id: uuid.UUID, session_id: uuid.UUID) -> None:
+        """Load the cached window of a session ahead of a chat turn."""
+        key = (user_id, session_id)
+        if self._windows.get(key) is None:
+            self._windows.put(key, await self._load_tail(user_id, session_id, last_n=self.window_messages))
+
+    async def get_session_messages_page(
+        self,
+        user_id: uuid.UUID,
+        session_id: uuid.UUID,
+        before_id: int | None = None,
+        limit: int | None = None,
+    ) -> dict:
+        """
+        Return one page of a session, for browsing it backwards.
+
+        Parameters
+        ----------
+        before_id : int, optional
+            Cursor returned by the previous page; the newest page when None.
+        limit : int, optional
+            Messages per page. Default is ``chat_history.page_size``.
+
+        Returns
+        -------
+        dict
+            ``messages`` oldest first and ``next_before_id``, the cursor
+            of the previous page (None on the first page of the session).
+        """
+        limit = limit or self.page_size
+        await self._flush_pending(session_id)
+        async with self.connection() as conn:
+            await self._ensure_migrated(conn, user_id=user_id)
+            page = await self._fetch_page(conn, user_id, session_id, before_id=before_id, limit=limit)
+
+        return {
+            "messages": [message for _, message, _ in reversed(page)],
+            "next_before_id": page[-1][0] if len(page) == limit else None,
+        }
+
+    async def _add_messages(self, messages: list[BaseMessage], user_id: uuid.UUID, session_id: uuid.UUID):
+        # legacy rows must land before the new ones, whichever path writes them
+        await self._ensure_migrated(None, user_id=user_id)
+        token_counts = [count_tokens_approximately([message]) for message in messages]
         
+        if self.writer.enabled:
+            await self.writer.append_messages(
+                [(message_to_dict(message), token_count) for message, token_count in zip(messages, token_counts)],
+                user_id=user_id,
+                session_id=session_id,
+                targets=messages,
+            )
+        else:
+            async with self.connection() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.executemany(
+                        sql.SQL(
+                            "INSERT INTO {table} (user_id, session_id, message, token_count) VALUES (%s, %s, %s, %s) RETURNING id"
+                        ).format(table=sql.Identifier(self.table_name)),
+                        [
+                            (user_id, session_id, Jsonb(message_to_dict(message)), token_count)
+                            for message, token_count in zip(messages, token_counts)
+                        ],
+                        returning=True,
+                    )
+                    # the cached messages carry their row id, like the ones read back from the table
+                    for message in messages:
+                        message.id = str((await cursor.fetchone())[0])
+                        if not cursor.nextset():
+                            break
+
+        window = self._windows.get((user_id, session_id))
+        if window is not None:
+            for message, token_count in zip(messages, token_counts):
+                window.append(message, token_count=token_count, max_messages=self.window_messages)
+
+    async def get_summary(self, session_id: uuid.UUID) -> tuple[str, int] | None:
+        """
+        Return the rolling summary of a session.
+
+        Returns
+        -------
+        tuple[str, int] or None
+            The summary and the id of the last message it covers, or
+            None while the session is short enough to need none.
+        """
+        if session_id in self._summaries:
+            return self._summaries.get(session_id)
+
         async with self.connection() as conn:
-            session_history = PostgresChatMessageHistory(
-                TABLE_NAME,  # Optional custom table
-                str(session_id),
-                async_connection=conn,
+            cursor = await conn.execute(
+                sql.SQL(
+                    "SELECT summary, last_message_id FROM {summary_table} WHERE session_id = %s"
+                ).format(summary_table=sql.Identifier(self.summary_table_name)),
+                (session_id,),
             )
-            messages = await session_history.aget_messages()
-            return messages
-    
-    async def add_user_message(self, message:str, user_id: uuid.UUID, session_id: uuid.UUID):
-        TABLE_NAME = self._get_table_name(user_id=user_id)
-        
+            row = await cursor.fetchone()
+
+        summary = (row[0], row[1]) if row else None
+        self._summaries.put(session_id, summary)
+        return summary
+
+    async def save_summary(self, user_id: uuid.UUID, session_id: uuid.UUID, summary: str, last_message_id: int) -> None:
         async with self.connection() as conn:
-            session_history = PostgresChatMessageHistory(
-                TABLE_NAME,  # Optional custom table
-                str(session_id),
-                async_connection=conn,
+            await conn.execute(
+                sql.SQL(
+                    "INSERT INTO {summary_table} (session_id, user_id, summary, last_message_id) "
+                    "VALUES (%s, %s, %s, %s) "
+                    "ON CONFLICT (session_id) DO UPDATE "
+                    "SET summary = EXCLUDED.summary, last_message_id = EXCLUDED.last_message_id, updated_at = NOW()"
+                ).format(summary_table=sql.Identifier(self.summary_table_name)),
+                (session_id, user_id, summary, last_message_id),
             )
-            user_message = HumanMessage(content=message)
-            await session_history.aadd_messages([user_message])
-    
-    async def add_ai_message(self, message:str, user_id: uuid.UUID, session_id: uuid.UUID):
-        TABLE_NAME = self._get_table_name(user_id=user_id)
-        
+        self._summaries.put(session_id, (summary, last_message_id))
+
+    async def get_messages_after(
+        self, user_id: uuid.UUID, session_id: uuid.UUID, after_id: int,
+    ) -> list[tuple[int, BaseMessage, int]]:
+        """Return (id, message, token count) of the messages newer than ``after_id``, oldest first."""
+        await self._flush_pending(session_id)
         async with self.connection() as conn:
-            session_history = PostgresChatMessageHistory(
-                TABLE_NAME,  # Optional custom table
-                str(session_id),
-                async_connection=conn,
+            await self._ensure_migrated(conn, user_id=user_id)
+            cursor = await conn.execute(
+                sql.SQL(
+                    "SELECT id, message, token_count FROM {table} "
+                    "WHERE user_id = %s AND session_id = %s AND id > %s ORDER BY id"
+                ).format(table=sql.Identifier(self.table_name)),
+                (user_id, session_id, after_id),
             )
-            ai_message = AIMessage(content=message)
-            await session_history.aadd_messages([ai_message])
+            return self._parse_rows(await cursor.fetchall())
+
+    async def add_user_message(self, message:str, user_id: uuid.UUID, session_id: uuid.UUID):
+        user_message = HumanMessage(content=message)
+        await self._add_messages([user_message], user_id=user_id, session_id=session_id)
+
+    async def add_ai_message(self, message:str, user_id: uuid.UUID, session_id: uuid.UUID):
+        ai_message = AIMessage(content=message)
+        await self._add_messages([ai_message], user_id=user_id, session_id=session_id)
+
+
+
 
+chat_history_service = ChatHistoryService()
 
 
 
-chat_history_service = ChatHistoryService()
\ No newline at end of file
+async def setup_chat_history():
+    await chat_history_service.setup()
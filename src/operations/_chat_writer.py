@@ -0,0 +1,313 @@
+"""
+Write-behind persistence of chat messages.
+
+This module queues chat message appends and ``last_active`` touches of
+chat sessions and writes them in batches: all queued messages in one
+multi-row insert and all touches in one update, in a single transaction,
+on a short interval or as soon as enough rows are waiting. A batch that
+fails on a row Postgres rejects is retried row by row, so the rejected
+row is dropped alone; rows failing on connection errors are retried a
+few times before being dropped.
+"""
+
+import asyncio
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Literal
+
+from psycopg import OperationalError, sql
+from psycopg.types.json import Jsonb
+
+from src.models._base_sqlalchemy import CURRENT_TIME
+from src.operations._db_setup import DatabaseManager, db_manager
+from src.utils.config import get_config
+from src.utils.logger import app_logger
+from src.utils.metrics import metrics
+
+
+logger = app_logger.getChild("src.operations._chat_writer")
+
+
+# immediate: written before the call returns, one transaction per call
+# group_commit: the call returns once the batch holding it is written
+# deferred: the call returns at once, rows queued at shutdown or crash time may be lost
+Durability = Literal["immediate", "group_commit", "deferred"]
+
+
+@dataclass
+class _PendingMessage:
+    user_id: uuid.UUID
+    session_id: uuid.UUID
+    message: dict
+    token_count: int
+    # group_commit: resolved once the row is written, or failed with the error that dropped it
+    waiter: asyncio.Future | None = None
+    # flushes failed on connection errors so far
+    attempts: int = 0
+    # cached message object that gets the row id once written
+    target: Any = None
+
+
+class ChatWriteBehind:
+    """
+    Batching writer for chat messages and session activity.
+
+    Attributes
+    ----------
+    durability : Durability
+        When an append is considered written (see ``Durability``).
+    flush_interval_ms : float
+        Longest time a queued row waits before being written.
+    max_batch_size : int
+        Number of queued rows that triggers an immediate flush.
+    max_attempts : int
+        Flushes a row may fail on connection errors before it is dropped.
+    """
+
+    def __init__(self, db: DatabaseManager = db_manager) -> None:
+        self.connection = db.get_psycopg_db
+
+        self.table_name = get_config("chat_history.table_name", "chat_message")
+        self.durability: Durability = get_config("chat_history.write_behind.durability", "deferred")
+        self.flush_interval_ms = get_config("chat_history.write_behind.flush_interval_ms", 200)
+        self.max_batch_size = get_config("chat_history.write_behind.max_batch_size", 500)
+        self.max_attempts = get_config("chat_history.write_behind.max_attempts", 5)
+
+        self._messages: list[_PendingMessage] = []
+        self._touches: dict[uuid.UUID, datetime] = {}
+        self._pending_sessions: Counter[uuid.UUID] = Counter()
+
+        self._flush_lock: asyncio.Lock | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+        metrics.register_collector("chat_writer", self.stats)
+
+
+    @property
+    def enabled(self) -> bool:
+        return self.durability != "immediate"
+
+    def stats(self) -> dict:
+        return {
+            "durability": self.durability,
+            "queued_messages": len(self._messages),
+            "queued_touches": len(self._touches),
+        }
+
+    def has_pending(self, session_id: uuid.UUID) -> bool:
+        return self._pending_sessions[session_id] > 0
+
+
+    def _start(self) -> None:
+        # asyncio primitives are created inside the running loop
+        if self._task is None or self._task.done():
+            self._flush_lock = self._flush_lock or asyncio.Lock()
+            self._wakeup = self._wakeup or asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval_ms / 1000)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                # rows stay queued for the next round
+                logger.error(f"Error flushing chat writes: {str(e)}")
+
+    async def append_messages(
+        self,
+        messages: list[tuple[dict, int]],
+        user_id: uuid.UUID,
+        session_id: uuid.UUID,
+        targets: list[Any] | None = None,
+    ) -> None:
+        """
+        Queue serialized messages of a session.
+
+        Parameters
+        ----------
+        messages : list[tuple[dict, int]]
+            Messages serialized with ``message_to_dict`` and their token count.
+        user_id : uuid.UUID
+            ID of the user.
+        session_id : uuid.UUID
+            ID of the chat session.
+        targets : list[BaseMessage], optional
+            Message objects (e.g. in a cache) whose ``id`` is set to the
+            row id of the matching message once it is written.
+        """
+        self._start()
+        loop = asyncio.get_running_loop()
+        pending = [
+            _PendingMessage(
+                user_id,
+                session_id,
+                message,
+                token_count,
+                waiter=loop.create_future() if self.durability == "group_commit" else None,
+                target=target,
+            )
+            for (message, token_count), target in zip(messages, targets or [None] * len(messages))
+        ]
+        self._messages.extend(pending)
+        self._pending_sessions[session_id] += len(pending)
+
+        if len(self._messages) >= self.max_batch_size:
+            self._wakeup.set()
+
+        if self.durability == "group_commit":
+            # raises if a message was dropped
+            _ = await asyncio.gather(*(message.waiter for message in pending))
+
+    def touch_session(self, session_id: uuid.UUID) -> None:
+        """Queue an update of the ``last_active`` time of a chat session."""
+        self._start()
+        self._touches[session_id] = CURRENT_TIME()
+
+
+    async def flush(self) -> None:
+        """
+        Write every queued message and touch in one transaction.
+
+        Rows that cannot be written are dropped and logged rather than
+        retried forever, so they never hold back later rows.
+        """
+        if self._flush_lock is None:
+            return
+
+        async with self._flush_lock:
+            messages, self._messages = self._messages, []
+            touches, self._touches = self._touches, {}
+            if not messages and not touches:
+                return
+
+            start = time.perf_counter()
+            try:
+                self._set_row_ids(messages, await self._write(messages, touches))
+            except asyncio.CancelledError:
+                # put everything back in front of what was queued meanwhile
+                self._messages[:0] = messages
+                self._touches = {**touches, **self._touches}
+                raise
+            except OperationalError as e:
+                # connection errors: the whole batch is retried on the next round
+                metrics.increment("chat_writer.failed_flushes")
+                logger.error(f"Error flushing chat writes, retrying: {str(e)}")
+                self._requeue(messages, touches, error=e)
+                return
+            except Exception as e:
+                # a row Postgres rejects (e.g. a \u0000 in JSONB) must not block the others
+                metrics.increment("chat_writer.failed_flushes")
+                logger.error(f"Error flushing chat writes, writing the batch row by row: {str(e)}")
+                messages = await self._write_row_by_row(messages, touches)
+
+            self._written(messages)
+            metrics.increment("chat_writer.flushes")
+            metrics.observe("chat_writer.batch_messages", len(messages))
+            metrics.observe("chat_writer.batch_touches", len(touches))
+            metrics.observe("chat_writer.flush_latency_ms", (time.perf_counter() - start) * 1000)
+
+    async def _write_row_by_row(self, messages: list[_PendingMessage], touches: dict[uuid.UUID, datetime]) -> list[_PendingMessage]:
+        """Write a failed batch one row at a time; returns the written messages."""
+        if touches:
+            try:
+                await self._write([], touches)
+            except OperationalError as e:
+                self._requeue([], touches, error=e)
+            except Exception as e:
+                logger.error(f"Dropped last_active updates of {len(touches)} chat sessions: {str(e)}")
+
+        written = []
+        for i, message in enumerate(messages):
+            try:
+                self._set_row_ids([message], await self._write([message], {}))
+            except OperationalError as e:
+                # keep the order of the rest: they are retried together on the next round
+                self._requeue(messages[i:], {}, error=e)
+                break
+            except Exception as e:
+                self._drop(message, error=e)
+            else:
+                written.append(message)
+        return written
+
+    def _requeue(self, messages: list[_PendingMessage], touches: dict[uuid.UUID, datetime], error: Exception) -> None:
+        retried = []
+        for message in messages:
+            message.attempts += 1
+            if message.attempts >= self.max_attempts:
+                self._drop(message, error=error)
+            else:
+                retried.append(message)
+        self._messages[:0] = retried
+        self._touches = {**touches, **self._touches}
+
+    def _drop(self, message: _PendingMessage, error: Exception) -> None:
+        logger.error(f"Dropped a chat message of session {message.session_id}: {str(error)}")
+        metrics.increment("chat_writer.dropped_messages")
+        self._pending_sessions[message.session_id] -= 1
+        self._pending_sessions = +self._pending_sessions
+        if message.waiter is not None and not message.waiter.done():
+            message.waiter.set_exception(error)
+
+    def _set_row_ids(self, messages: list[_PendingMessage], row_ids: list[int]) -> None:
+        # the row id tells the summarizer which cached messages it already folded
+        for message, row_id in zip(messages, row_ids):
+            if message.target is not None:
+                message.target.id = str(row_id)
+
+    def _written(self, messages: list[_PendingMessage]) -> None:
+        for message in messages:
+            self._pending_sessions[message.session_id] -= 1
+            if message.waiter is not None and not message.waiter.done():
+                message.waiter.set_result(None)
+        self._pending_sessions = +self._pending_sessions
+
+    async def _write(self, messages: list[_PendingMessage], touches: dict[uuid.UUID, datetime]) -> list[int]:
+        row_ids = []
+        async with self.connection() as conn:
+            async with conn.transaction():
+                if messages:
+                    # executemany runs in pipeline mode: one round trip, ids follow queue order
+                    async with conn.cursor() as cursor:
+                        await cursor.executemany(
+                            sql.SQL(
+                                "INSERT INTO {table} (user_id, session_id, message, token_count) VALUES (%s, %s, %s, %s) RETURNING id"
+                            ).format(table=sql.Identifier(self.table_name)),
+                            [(m.user_id, m.session_id, Jsonb(m.message), m.token_count) for m in messages],
+                            returning=True,
+                        )
+                        while True:
+                            row_ids.append((await cursor.fetchone())[0])
+                            if not cursor.nextset():
+                                break
+                if touches:
+                    await conn.execute(
+                        "UPDATE chat_session AS s SET last_active = v.last_active "
+                        "FROM unnest(%s::uuid[], %s::timestamp[]) AS v(id, last_active) "
+                        "WHERE s.id = v.id",
+                        (list(touches), list(touches.values())),
+                    )
+        return row_ids
+
+    async def close(self) -> None:
+        """Stop the flush loop and write what is still queued."""
+        if self._task is not None:
+            _ = self._task.cancel()
+            _ = await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+
+
+
+chat_writer = ChatWriteBehind()
@@ -3,8 +3,14 @@ Database connection and setup utilities.
 
 This module provides functions for setting up database connections
 and initializing the database.
+
+All four access paths to PostgreSQL (SQLAlchemy ORM, raw psycopg,
+the LangGraph store and the pgvector ``PGEngine``) are served from
+long-lived, bounded pools owned by a single ``DatabaseManager``.
 """
 
+import asyncio
+
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from langgraph.store.postgres.aio import AsyncPostgresStore
 from langchain_postgres import PostgresChatMessageHistory
@@ -15,6 +21,8 @@ from langchain_postgres.v2.async_vectorstore import AsyncPGVectorStore
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 import psycopg
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
 
 
 from contextlib import asynccontextmanager
@@ -25,7 +33,8 @@ from src.models import (_user, _admin, _association_tables, _llm)
 
 from src.utils.config import get_config
 from src.utils.logger import app_logger
-from src.llm._llm_setup import get_embedding_model
+from src.utils.metrics import metrics
+from src.llm._llm_setup import get_embedding_service
 from src.utils.config import get_config
 
 
@@ -43,78 +52,216 @@ SQLALCHEMY_DB_URI = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB
 PGVECTOR_DB_URI = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 LANGGRAPH_DB_URI = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}?sslmode=disable"
 
-# sqlalchemy engine and session
-sqlalchemy_engine = create_async_engine(SQLALCHEMY_DB_URI, echo=False)
-sqlalchemy_session = async_sessionmaker(bind=sqlalchemy_engine, autocommit=False, autoflush=False, expire_on_commit=False)
-
-# pgvector engine
-pg_engine = PGEngine.from_connection_string(url=PGVECTOR_DB_URI)
+# pool settings
+POOL_SIZE = get_config("database.pool_size", 10)
+MAX_OVERFLOW = get_config("database.max_overflow", 20)
+POOL_TIMEOUT = get_config("database.pool_timeout", 30)
+POOL_RECYCLE = get_config("database.pool_recycle", 1800)
+POOL_PRE_PING = get_config("database.pool_pre_ping", True)
+ECHO_SQL = get_config("database.echo_sql", False)
+PSYCOPG_POOL_MIN_SIZE = get_config("database.psycopg_pool.min_size", 2)
+PSYCOPG_POOL_MAX_SIZE = get_config("database.psycopg_pool.max_size", 10)
+LANGGRAPH_POOL_MIN_SIZE = get_config("database.langgraph_pool.min_size", 1)
+LANGGRAPH_POOL_MAX_SIZE = get_config("database.langgraph_pool.max_size", 5)
 
 # embedding model
-embedding = get_embedding_model()
+embedding = get_embedding_service()
 VECTOR_SIZE = get_config("llm.embedding.vector_size")
 
-async def setup_langgraph_db():
 
-    async with (
-        AsyncPostgresStore.from_conn_string(
+class DatabaseManager:
+    """
+    Owner of every long-lived database pool used by MultiRAG.
+
+    A single instance is created at import time and opened once in the
+    FastAPI ``lifespan``; services receive it through their constructors
+    instead of opening their own connections.
+
+    Attributes
+    ----------
+    sqlalchemy_engine : AsyncEngine
+        Sized SQLAlchemy engine used by the ORM operations.
+    sqlalchemy_session : async_sessionmaker
+        Session factory bound to ``sqlalchemy_engine``.
+    pg_engine : PGEngine
+        pgvector engine sharing the SQLAlchemy connection pool.
+    psycopg_pool : AsyncConnectionPool
+        Pool of raw psycopg connections (chat history).
+    langgraph_pool : AsyncConnectionPool
+        Pool of dict-row psycopg connections for the LangGraph store.
+    memory_store : AsyncPostgresStore | None
+        Shared LangGraph store, available once the manager is opened.
+    """
+
+    def __init__(self) -> None:
+        """Create the pools; connections are only opened by ``open``."""
+        self.sqlalchemy_engine = create_async_engine(
+            SQLALCHEMY_DB_URI,
+            echo=ECHO_SQL,
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT,
+            pool_recycle=POOL_RECYCLE,
+            pool_pre_ping=POOL_PRE_PING,
+        )
+        self.sqlalchemy_session = async_sessionmaker(bind=self.sqlalchemy_engine, autocommit=False, autoflush=False, expire_on_commit=False)
+
+        # pgvector shares the sized sqlalchemy pool instead of owning another one
+        self.pg_engine = PGEngine.from_engine(self.sqlalchemy_engine)
+
+        check = AsyncConnectionPool.check_connection if POOL_PRE_PING else None
+        self.psycopg_pool = AsyncConnectionPool(
+            PSYCOPG_DB_URI,
+            min_size=PSYCOPG_POOL_MIN_SIZE,
+            max_size=PSYCOPG_POOL_MAX_SIZE,
+            max_lifetime=POOL_RECYCLE,
+            timeout=POOL_TIMEOUT,
+            kwargs={"autocommit": True},
+            check=check,
+            name="psycopg",
+            open=False,
+        )
+        # same connection settings AsyncPostgresStore.from_conn_string uses
+        self.langgraph_pool = AsyncConnectionPool(
             LANGGRAPH_DB_URI,
-            index={
-                "dims": VECTOR_SIZE,
-                "embed": embedding,
-                "fields": ["content"],
+            min_size=LANGGRAPH_POOL_MIN_SIZE,
+            max_size=LANGGRAPH_POOL_MAX_SIZE,
+            max_lifetime=POOL_RECYCLE,
+            timeout=POOL_TIMEOUT,
+            kwargs={
+                "autocommit": True,
+                "prepare_threshold": 0,
+                "row_factory": dict_row,
             },
-        ) as store,
-        AsyncPostgresSaver.from_conn_string(LANGGRAPH_DB_URI) as checkpointer,
-    ):
-        await store.setup()
-        await checkpointer.setup()
-
-
-@asynccontextmanager
-async def get_memory_db():
-    
-    async with (
-        AsyncPostgresStore.from_conn_string(
-            LANGGRAPH_DB_URI,
-            index={
-                "dims": VECTOR_SIZE,
-                "embed": embedding,
-                "fields": ["content"],
+            check=check,
+            name="langgraph",
+            open=False,
+        )
+
+        self.memory_store: AsyncPostgresStore | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.memory_store is not None
+
+    async def open(self) -> None:
+        """Open the psycopg pools and create the shared LangGraph store."""
+        async with self._lock:
+            if self.is_open:
+                return
+
+            await self.psycopg_pool.open(wait=True)
+            await self.langgraph_pool.open(wait=True)
+            # AsyncPostgresStore binds to the running loop, so it is built here
+            self.memory_store = AsyncPostgresStore(
+                self.langgraph_pool,
+                index={
+                    "dims": VECTOR_SIZE,
+                    "embed": embedding,
+                    "fields": ["content"],
+                },
+            )
+            logger.info("Database pools opened")
+
+    async def close(self) -> None:
+        """Close every pool owned by the manager."""
+        async with self._lock:
+            self.memory_store = None
+            await self.psycopg_pool.close()
+            await self.langgraph_pool.close()
+            await self.sqlalchemy_engine.dispose()
+            logger.info("Database pools closed")
+
+    # sqlalchemy
+    @asynccontextmanager
+    async def get_sqlalchemy_db(self):
+        async with self.sqlalchemy_session() as session:
+            yield session
+
+    # psycopg
+    @asynccontextmanager
+    async def get_psycopg_db(self):
+        if not self.is_open:
+            await self.open()
+        async with self.psycopg_pool.connection() as conn:
+            yield conn
+
+    # langgraph store
+    @asynccontextmanager
+    async def get_memory_db(self):
+        yield await self.get_memory_store()
+
+    async def get_memory_store(self) -> AsyncPostgresStore:
+        if not self.is_open:
+            await self.open()
+        return self.memory_store
+
+    # pgvector
+    def get_pg_engine(self) -> PGEngine:
+        return self.pg_engine
+
+    def get_pool_stats(self) -> dict:
+        """
+        Report usage of every pool.
+
+        Returns
+        -------
+        dict
+            Checked-in/checked-out/overflow counts of the SQLAlchemy pool
+            and the psycopg pool statistics.
+        """
+        pool = self.sqlalchemy_engine.pool
+        return {
+            "sqlalchemy": {
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
             },
-        ) as store
-    ):
-        yield store
+            "psycopg": self.psycopg_pool.get_stats(),
+            "langgraph": self.langgraph_pool.get_stats(),
+        }
+
+
+db_manager = DatabaseManager()
+metrics.register_collector("db_pool", db_manager.get_pool_stats)
+
+
+async def setup_langgraph_db():
+    await db_manager.open()
+
+    checkpointer = AsyncPostgresSaver(db_manager.langgraph_pool)
+    await db_manager.memory_store.setup()
+    await checkpointer.setup()
+
+
+def get_memory_db():
+    return db_manager.get_memory_db()
 
 
 # sqlalchemy
-@asynccontextmanager
-async def get_sqlalchemy_db():
-    async with sqlalchemy_session() as session:
-        yield session
+def get_sqlalchemy_db():
+    return db_manager.get_sqlalchemy_db()
 
 # psycopg
-@asynccontextmanager
-async def get_psycopg_db():
-    async_connection = await psycopg.AsyncConnection.connect(PSYCOPG_DB_URI)
-    async with async_connection as conn:
-        yield conn
+def get_psycopg_db():
+    return db_manager.get_psycopg_db()
 
 # pgvector
 def get_pg_engine():
-    return pg_engine
+    return db_manager.get_pg_engine()
 
 async def drop_table(table_name: str):
-    await pg_engine.adrop_table(table_name)
+    await db_manager.pg_engine.adrop_table(table_name)
 
 
 
 async def setup_sqlalchemy():
-    async with sqlalchemy_engine.begin() as conn:
+    async with db_manager.sqlalchemy_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
 
-
-
-
+async def close_db():
+    await db_manager.close()
 
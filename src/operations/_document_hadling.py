@@ -1,15 +1,32 @@
+import asyncio
+import bisect
+import io
+import itertools
+import os
 import re
+import tempfile
+import zipfile
+import multiprocessing
+import xml.etree.ElementTree as ET
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import IO, Any
 
-import docx2txt
 from pypdf import PdfReader
 import pandas as pd
 
-from pathlib import Path
-import uuid
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = pa_csv = None
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
+from src.operations._text_splitter import TokenTextSplitter, get_tokenizer
 from src.schema._admin import AdminUploadedDatasetType
 
 
@@ -23,8 +40,194 @@ CHUNK_SIZE = get_config("rag.chunk_size")
 CHUNK_OVERLAP = get_config("rag.chunk_overlap")
 
 
+# link removal and sanitization, compiled once and applied to each page or paragraph
+_INLINE_LINKS = re.compile(r'\[([^\]]+)\]\([^)]+\)')
+_REFERENCE_LINKS = re.compile(r'\[([^\]]+)\]\[[^\]]*\]')
+_LINK_DEFINITIONS = re.compile(r'^\s*\[[^\]]+\]:\s+[^\s]+\s*$', flags=re.MULTILINE)
+_AUTO_LINKS = re.compile(r'<(https?://[^>]+)>')
+_IMAGES = re.compile(r'!\[.*?\]\(.*?\)(?:\{.*?\})?')
+_BLANK_LINES = re.compile(r'\n\s*\n\s*\n')
+# null bytes and control characters other than \t, \n, \r break asyncpg inserts
+_CONTROL_CHARACTERS = re.compile(r"[\x00-\x08\x0B\x0C\x0E-\x1F]")
+
+# columns of a question/answer CSV dataset
+CSV_COLUMNS = ("question", "answer")
+# between the pieces (pages, paragraphs) of the document text chunk offsets refer to
+PIECE_SEPARATOR = "\n\n"
+
+# WordprocessingML tags read by the DOCX extractor
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DOCX_HEADERS = re.compile(r'word/header[0-9]*\.xml')
+_DOCX_FOOTERS = re.compile(r'word/footer[0-9]*\.xml')
+# tags the body is split around: a body is only cut after a paragraph outside tables and text boxes
+_DOCX_BLOCK_TAGS = re.compile(rb'<w:tbl[\s>]|</w:tbl>|<w:txbxContent[\s>]|</w:txbxContent>|</w:p>')
+_DOCX_SECTIONS = re.compile(rb'<w:sectPr[\s>/]')
+
+
+def _remove_markdown_links(markdown_text: str) -> str:
+    # Remove inline links including text: [text](url)
+    text_without_inline_links = _INLINE_LINKS.sub('', markdown_text)
+
+    # Remove reference-style links including text: [text][id]
+    text_without_ref_links = _REFERENCE_LINKS.sub('', text_without_inline_links)
+
+    # Remove reference link definitions: [id]: url
+    text_without_definitions = _LINK_DEFINITIONS.sub('', text_without_ref_links)
+
+    # Remove automatic/bare links: <http://example.com>
+    text_without_auto_links = _AUTO_LINKS.sub('', text_without_definitions)
+
+    # Remove images
+    text_without_images: str = _IMAGES.sub('', text_without_auto_links)
+
+    # Remove consecutive blank lines that might be created after link removal
+    clean_text = _BLANK_LINES.sub('\n\n', text_without_images)
+
+    return clean_text
+
+
+def join_pieces(pieces: Iterable[str]) -> str:
+    """Rebuild the document text the byte offsets of chunks refer to from its pieces."""
+    return PIECE_SEPARATOR.join(pieces)
+
+
+def _clean_text(text: str) -> str:
+    # link removal and sanitization fused into one pass over each piece
+    return _CONTROL_CHARACTERS.sub("", _remove_markdown_links(text))
+
+
+def _iter_pdf_pages(reader: PdfReader, start: int, stop: int) -> Iterator[tuple[int, str]]:
+    # page numbers are 1-based, as shown by PDF viewers
+    for number in range(start, stop):
+        yield number + 1, _clean_text(reader.pages[number].extract_text())
+
+
+def _iter_docx_paragraphs(xml: IO[bytes], section: int = 0) -> Iterator[tuple[int, str]]:
+    # same text rules as docx2txt.xml2text, parsed incrementally;
+    # a section ends with the paragraph holding its w:sectPr
+    paragraph: list[str] = []
+    section_ends = False
+    for _, element in ET.iterparse(xml, events=("end",)):
+        if element.tag == _W + "t":
+            paragraph.append(element.text or "")
+        elif element.tag == _W + "tab":
+            paragraph.append("\t")
+        elif element.tag in (_W + "br", _W + "cr"):
+            paragraph.append("\n")
+        elif element.tag == _W + "sectPr":
+            section_ends = True
+        elif element.tag == _W + "p":
+            yield section, _clean_text("".join(paragraph))
+            paragraph = []
+            if section_ends:
+                section += 1
+                section_ends = False
+            # drop the parsed paragraph, so memory stays flat
+            element.clear()
+
+
+def _extract_pdf_pages(path: str, start: int, stop: int) -> list[tuple[int, str]]:
+    """Extract a page range of a spooled PDF; runs in the process pool."""
+    reader = PdfReader(path)
+    try:
+        return list(_iter_pdf_pages(reader, start, stop))
+    finally:
+        reader.close()
+
+
+def _extract_docx_xml(xml: bytes, section: int) -> list[tuple[int, str]]:
+    """Extract the paragraphs of a DOCX part or body fragment; runs in the process pool."""
+    return list(_iter_docx_paragraphs(io.BytesIO(xml), section=section))
+
+
+class _ChunkStream:
+    """
+    Incremental splitter over labelled text pieces (pages, paragraphs).
+
+    Pieces are accumulated up to ``buffer_chars`` and split; the last
+    chunk may go on in the next piece, so the text from its start is
+    carried over and split again with it. Every chunk is labelled with
+    the piece it starts in, and located by the UTF-8 byte offsets of its
+    start and end in the document text (see ``join_pieces``).
+    """
+
+    def __init__(self, split_spans: Callable[[str], list[tuple[int, int]]], buffer_chars: int) -> None:
+        self.split_spans = split_spans
+        self.buffer_chars = buffer_chars
+        self._buffer = ""
+        # bytes of the document text before the buffer
+        self._buffer_byte = 0
+        self._fed = False
+        self._offsets: list[int] = []
+        self._labels: list[Any] = []
+
+    def _label_at(self, offset: int) -> Any:
+        return self._labels[max(bisect.bisect_right(self._offsets, offset) - 1, 0)]
+
+    def _chunks(self, spans: list[tuple[int, int]]) -> list[tuple[Any, str, int, int]]:
+        # spans start in order, so byte offsets are counted forward from the previous start
+        chunks = []
+        char, byte = 0, self._buffer_byte
+        for start, end in spans:
+            byte += len(self._buffer[char:start].encode())
+            text = self._buffer[start:end]
+            chunks.append((self._label_at(start), text, byte, byte + len(text.encode())))
+            char = start
+        return chunks
+
+    def feed(self, label: Any, text: str) -> list[tuple[Any, str, int, int]]:
+        if self._fed:
+            # pieces are separated like paragraphs, so no word spans two pages;
+            # also after empty pieces, so offsets match join_pieces
+            self._buffer += PIECE_SEPARATOR
+        self._fed = True
+        self._offsets.append(len(self._buffer))
+        self._labels.append(label)
+        self._buffer += text
+        if len(self._buffer) < self.buffer_chars:
+            return []
+
+        spans = self.split_spans(self._buffer)
+        carried = spans[-1][0] if spans else len(self._buffer)
+        if carried <= 0:
+            # a single chunk so far, keep the whole buffer for the next split
+            return []
+
+        chunks = self._chunks(spans[:-1])
+        first = max(bisect.bisect_right(self._offsets, carried) - 1, 0)
+        self._offsets = [0] + [offset - carried for offset in self._offsets[first + 1:]]
+        self._labels = self._labels[first:]
+        self._buffer_byte += len(self._buffer[:carried].encode())
+        self._buffer = self._buffer[carried:]
+        return chunks
+
+    def flush(self) -> list[tuple[Any, str, int, int]]:
+        if not self._buffer:
+            return []
+        chunks = self._chunks(self.split_spans(self._buffer))
+        self._buffer_byte += len(self._buffer.encode())
+        self._buffer = ""
+        self._offsets = []
+        self._labels = []
+        return chunks
+
+
 class DocumentService:
-    
+    """
+    Streaming extraction of uploaded datasets into documents.
+
+    Files are read from in-memory buffers or a spool file in the system
+    temp directory, never from the working directory. Each format yields
+    its text piece by piece (PDF pages, DOCX paragraphs, CSV rows); pieces
+    are cleaned one at a time and split through a small carry-over buffer,
+    so no stage holds the full text. CSV datasets are decoded a block of
+    rows at a time (with pyarrow's streaming reader when it is installed),
+    reading only the question and answer columns. Large PDFs (by page
+    range) and DOCX bodies (by fragment) are extracted in parallel in a
+    process pool and reassembled in file order; chunks keep their page or
+    section number and their byte range in the extracted text.
+    """
+
     def __init__(self,
         chunk_size: int = 1000,
         chunk_overlap: int = 200,
@@ -34,121 +237,338 @@ class DocumentService:
             separators=["\n\n", "\n", " ", ""],
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
+            add_start_index=True,
         )
+        # "token": single-pass splitter sized in embedding-model tokens;
+        # "recursive": the LangChain splitter, sized in characters (chunk_size, chunk_overlap)
+        self.splitter_engine = get_config("rag.splitter.engine", "token")
+        self.chunk_tokens = get_config("rag.splitter.chunk_tokens", 256)
+        self.chunk_overlap_tokens = get_config("rag.splitter.chunk_overlap_tokens", 128)
+        self._token_text_splitter: TokenTextSplitter | None = None
+        # text accumulated before splitting; the last chunk is carried over
+        self.split_buffer_chars = get_config("rag.extraction.split_buffer_chars", max(8 * chunk_size, 16000))
+        self.csv_chunk_rows = get_config("rag.extraction.csv_chunk_rows", 10000)
+        self.csv_block_bytes = get_config("rag.extraction.csv_block_bytes", 1024 * 1024)
+
+        # parallel extraction, 0 processes means one per core
+        self.processes = get_config("rag.extraction.processes", 0) or os.cpu_count() or 1
+        self.pdf_pages_per_task = get_config("rag.extraction.pdf_pages_per_task", 8)
+        self.docx_min_fragment_bytes = get_config("rag.extraction.docx_min_fragment_bytes", 256 * 1024)
+        self.parallel_min_bytes = get_config("rag.extraction.parallel_min_bytes", 1024 * 1024)
+        self._process_pool: ProcessPoolExecutor | None = None
 
     def _remove_markdown_links(self, markdown_text: str):
-        # Remove inline links including text: [text](url)
-        text_without_inline_links = re.sub(r'\[([^\]]+)\]\([^)]+\)', '', markdown_text)
-        
-        # Remove reference-style links including text: [text][id]
-        text_without_ref_links = re.sub(r'\[([^\]]+)\]\[[^\]]*\]', '', text_without_inline_links)
-        
-        # Remove reference link definitions: [id]: url
-        text_without_definitions = re.sub(r'^\s*\[[^\]]+\]:\s+[^\s]+\s*$', '', text_without_ref_links, flags=re.MULTILINE)
-        
-        # Remove automatic/bare links: <http://example.com>
-        text_without_auto_links = re.sub(r'<(https?://[^>]+)>', '', text_without_definitions)
-        
-        # Remove images
-        text_without_images: str = re.sub(r'!\[.*?\]\(.*?\)(?:\{.*?\})?', '', text_without_auto_links)
-
-        # Remove consecutive blank lines that might be created after link removal
-        clean_text = re.sub(r'\n\s*\n\s*\n', '\n\n', text_without_images)
-
-        
-        return clean_text
-
-
-
-    def _pdf_to_documents(self, file_content: bytes) -> list[Document]:
-
-        # write content to a temporary file, so pypdf will be able to read it
-        unique_name = uuid.uuid4()
-        with open(f"{unique_name}.pdf", "wb") as f:
-            _ = f.write(file_content)
-
-        file_path = Path(f"{unique_name}.pdf")
-
-        markdown_text = ""
-        reader = PdfReader(file_path)
-        for page in reader.pages:
-            markdown_text += page.extract_text()
-
-        clean_markdown_text = self._remove_markdown_links(markdown_text)
-
-
-        # delete temporary file
-        reader.close()
-        file_path.unlink()
-
-        docs = self._recursive_character_text_splitter.create_documents(texts=[clean_markdown_text], metadatas=[{"answer": ""}])
-
-        return docs
-
-
-    def _docx_to_documents(self, file_content: bytes) -> list[Document]:
-
-        # write content to a temporary file, so docx2txt will be able to read it
-        unique_name = uuid.uuid4()
-        with open(f"{unique_name}.docx", "wb") as f:
-            _ = f.write(file_content)
-
-        file_path = Path(f"{unique_name}.docx")
-
-        markdown_text = docx2txt.process(file_path)
-
-        clean_markdown_text = self._remove_markdown_links(markdown_text)
-
-        # delete temporary file
-        file_path.unlink()
-
-        docs = self._recursive_character_text_splitter.create_documents(texts=[clean_markdown_text], metadatas=[{"answer": ""}])
-
-        return docs
-
-
-    def _csv_to_documents(self, file_content: bytes) -> list[Document]:
-
-
-        # write content to a temporary file, so pandas will be able to read it
-        unique_name = uuid.uuid4()
-        with open(f"{unique_name}.csv", "wb") as f:
-            _ = f.write(file_content)
+        return _remove_markdown_links(markdown_text)
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            # spawn: forked children would inherit the loaded models and the event loop
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._process_pool
+
+    def close(self) -> None:
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+
+    def _recursive_spans(self, text: str) -> list[tuple[int, int]]:
+        docs = self._recursive_character_text_splitter.create_documents([text])
+        return [(doc.metadata["start_index"], doc.metadata["start_index"] + len(doc.page_content)) for doc in docs]
+
+    def _get_split_spans(self) -> Callable[[str], list[tuple[int, int]]]:
+        if self.splitter_engine == "recursive":
+            return self._recursive_spans
+        if self._token_text_splitter is None:
+            # the tokenizer is loaded on the first split, off the event loop
+            self._token_text_splitter = TokenTextSplitter(
+                chunk_size=self.chunk_tokens,
+                chunk_overlap=self.chunk_overlap_tokens,
+                tokenizer=get_tokenizer(),
+            )
+        return self._token_text_splitter.split_spans
 
-        file_path = Path(f"{unique_name}.csv")
-        
-        df = pd.read_csv(file_path)
+    def _new_chunk_stream(self) -> _ChunkStream:
+        return _ChunkStream(self._get_split_spans(), self.split_buffer_chars)
 
-        # delete temporary file
-        file_path.unlink()
+    def _chunk_document(self, label: str, chunk: tuple[Any, str, int, int]) -> Document:
+        number, text, start_byte, end_byte = chunk
+        # the byte range locates the chunk in the extracted text of the file
+        return Document(
+            page_content=text,
+            metadata={"answer": "", label: number, "start_byte": start_byte, "end_byte": end_byte},
+        )
 
-        docs = []
-        for row in df.itertuples(index=False):
-            doc = Document(
-                page_content=row.question,
-                metadata={"answer": row.answer},
+    def _text_to_documents(self, pieces: Iterable[tuple[int, str]], label: str) -> Iterator[Document]:
+        stream = self._new_chunk_stream()
+        for number, text in pieces:
+            for chunk in stream.feed(number, text):
+                yield self._chunk_document(label, chunk)
+        for chunk in stream.flush():
+            yield self._chunk_document(label, chunk)
+
+    async def _atext_to_documents(self, pieces: AsyncIterator[list[tuple[int, str]]], label: str) -> AsyncIterator[Document]:
+        stream = await asyncio.to_thread(self._new_chunk_stream)
+        async for batch in pieces:
+            chunks = await asyncio.to_thread(lambda: [c for number, text in batch for c in stream.feed(number, text)])
+            for chunk in chunks:
+                yield self._chunk_document(label, chunk)
+        for chunk in await asyncio.to_thread(stream.flush):
+            yield self._chunk_document(label, chunk)
+
+    async def _aiter_in_pool(self, tasks: Iterable[tuple[Callable, tuple]]) -> AsyncIterator[Any]:
+        # results come back in submission order; at most two tasks per process are in flight
+        loop = asyncio.get_running_loop()
+        pool = self._get_process_pool()
+        pending: deque[asyncio.Future] = deque()
+        try:
+            for fn, args in tasks:
+                pending.append(loop.run_in_executor(pool, fn, *args))
+                if len(pending) >= 2 * self.processes:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for future in pending:
+                _ = future.cancel()
+
+
+
+    def _pdf_to_documents(self, file_content: bytes) -> Iterator[Document]:
+        reader = PdfReader(io.BytesIO(file_content))
+        try:
+            yield from self._text_to_documents(_iter_pdf_pages(reader, 0, len(reader.pages)), label="page")
+        finally:
+            reader.close()
+
+    def _spool_pdf(self, file_content: bytes) -> tuple[str, int]:
+        # the workers read a spool file, instead of each receiving a copy of the upload
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as spool:
+            pass
+        try:
+            Path(spool.name).write_bytes(file_content)
+            reader = PdfReader(spool.name)
+            try:
+                return spool.name, len(reader.pages)
+            finally:
+                reader.close()
+        except BaseException:
+            Path(spool.name).unlink(missing_ok=True)
+            raise
+
+    async def _apdf_to_documents(self, file_content: bytes) -> AsyncIterator[Document]:
+        # writing the spool and parsing the page tree are blocking, off the event loop
+        path, page_count = await asyncio.to_thread(self._spool_pdf, file_content)
+        try:
+            tasks = (
+                (_extract_pdf_pages, (path, start, min(start + self.pdf_pages_per_task, page_count)))
+                for start in range(0, page_count, self.pdf_pages_per_task)
             )
-            docs.append(doc)
-        
-        return docs
-
-    def to_documents(self, file_content: bytes, file_format: AdminUploadedDatasetType):
-        
+            async for doc in self._atext_to_documents(self._aiter_in_pool(tasks), label="page"):
+                yield doc
+        finally:
+            Path(path).unlink(missing_ok=True)
+
+
+    def _docx_parts(self, zipf: zipfile.ZipFile) -> tuple[list[str], list[str]]:
+        # same parts as docx2txt.process: headers, document, footers
+        names = zipf.namelist()
+        headers = [name for name in names if _DOCX_HEADERS.match(name)]
+        footers = [name for name in names if _DOCX_FOOTERS.match(name)]
+        return headers, footers
+
+    def _split_docx_body(self, xml: bytes, fragments: int) -> list[tuple[bytes, int]]:
+        """
+        Cut ``word/document.xml`` into standalone XML documents.
+
+        Cuts fall after top-level paragraphs, so every fragment is the
+        document head, a run of whole paragraphs and tables, and the
+        closing tags. Each fragment comes with the number of sections
+        ended before it.
+        """
+        body_start = xml.find(b"<w:body>")
+        body_end = xml.rfind(b"</w:body>")
+        if body_start < 0 or body_end < 0 or fragments < 2:
+            return [(xml, 0)]
+        body_start += len(b"<w:body>")
+        head, tail = xml[:body_start], xml[body_end:]
+
+        target = max((body_end - body_start) // fragments, self.docx_min_fragment_bytes)
+        cuts = [body_start]
+        depth = 0
+        for match in _DOCX_BLOCK_TAGS.finditer(xml, body_start, body_end):
+            tag = match.group()
+            if tag == b"</w:p>":
+                if depth == 0 and match.end() - cuts[-1] >= target:
+                    cuts.append(match.end())
+            elif tag.startswith(b"</"):
+                depth -= 1
+            else:
+                depth += 1
+        cuts.append(body_end)
+
+        return [
+            (head + xml[start:stop] + tail, len(_DOCX_SECTIONS.findall(xml, body_start, start)))
+            for start, stop in zip(cuts, cuts[1:])
+            if stop > start
+        ]
+
+    def _docx_to_documents(self, file_content: bytes) -> Iterator[Document]:
+        def paragraphs() -> Iterator[tuple[int, str]]:
+            with zipfile.ZipFile(io.BytesIO(file_content)) as zipf:
+                headers, footers = self._docx_parts(zipf)
+                for part in headers + ["word/document.xml"] + footers:
+                    with zipf.open(part) as xml:
+                        yield from _iter_docx_paragraphs(xml)
+
+        return self._text_to_documents(paragraphs(), label="section")
+
+    def _read_docx(self, file_content: bytes) -> tuple[list[bytes], list[tuple[bytes, int]], list[bytes]]:
+        # header parts, body fragments and footer parts, decompressed
+        with zipfile.ZipFile(io.BytesIO(file_content)) as zipf:
+            headers, footers = self._docx_parts(zipf)
+            body = zipf.read("word/document.xml")
+            header_xmls = [zipf.read(part) for part in headers]
+            footer_xmls = [zipf.read(part) for part in footers]
+        return header_xmls, self._split_docx_body(body, 2 * self.processes), footer_xmls
+
+    async def _adocx_to_documents(self, file_content: bytes) -> AsyncIterator[Document]:
+        # decompressing and cutting the parts are blocking, off the event loop
+        header_xmls, fragments, footer_xmls = await asyncio.to_thread(self._read_docx, file_content)
+        tasks = itertools.chain(
+            ((_extract_docx_xml, (xml, 0)) for xml in header_xmls),
+            ((_extract_docx_xml, (xml, section)) for xml, section in fragments),
+            ((_extract_docx_xml, (xml, 0)) for xml in footer_xmls),
+        )
+        async for doc in self._atext_to_documents(self._aiter_in_pool(tasks), label="section"):
+            yield doc
+
+
+    def validate_csv(self, file_content: bytes) -> None:
+        """
+        Check that a CSV dataset has the question and answer columns.
+
+        Only the header row is parsed.
+
+        Raises
+        ------
+        ValueError
+            If the file cannot be parsed or a column is missing.
+        """
+        try:
+            columns = pd.read_csv(io.BytesIO(file_content), nrows=0).columns
+        except (ValueError, pd.errors.ParserError) as e:
+            raise ValueError(f"Invalid CSV file: {str(e)}") from e
+
+        missing = [column for column in CSV_COLUMNS if column not in columns]
+        if missing:
+            raise ValueError(f"CSV file is missing the column(s): {', '.join(missing)}")
+
+    def _iter_csv_batches(self, file_content: bytes) -> Iterator[tuple[list[str], list[str]]]:
+        # only the two columns are read, as strings (empty cells are "", not NaN)
+        if pa_csv is not None:
+            # streaming reader: one block of about csv_block_bytes is decoded at a time
+            reader = pa_csv.open_csv(
+                io.BytesIO(file_content),
+                read_options=pa_csv.ReadOptions(block_size=self.csv_block_bytes),
+                convert_options=pa_csv.ConvertOptions(
+                    include_columns=list(CSV_COLUMNS),
+                    column_types={column: pa.string() for column in CSV_COLUMNS},
+                    strings_can_be_null=False,
+                ),
+            )
+            for batch in reader:
+                yield batch.column("question").to_pylist(), batch.column("answer").to_pylist()
+        else:
+            # pandas' own pyarrow engine cannot read in chunks, so the C engine is used
+            for df in pd.read_csv(
+                io.BytesIO(file_content),
+                usecols=list(CSV_COLUMNS),
+                dtype=str,
+                keep_default_na=False,
+                chunksize=self.csv_chunk_rows,
+            ):
+                yield df["question"].tolist(), df["answer"].tolist()
+
+    def _csv_to_documents(self, file_content: bytes) -> Iterator[Document]:
+        self.validate_csv(file_content)
+        for questions, answers in self._iter_csv_batches(file_content):
+            for question, answer in zip(questions, answers):
+                # rows without a question have nothing to embed
+                if question and question.strip():
+                    yield Document(page_content=question, metadata={"answer": answer or ""})
+
+    def iter_documents(self, file_content: bytes, file_format: AdminUploadedDatasetType) -> Iterator[Document]:
+        """
+        Yield the documents of an uploaded dataset as they are extracted.
+
+        Parameters
+        ----------
+        file_content : bytes
+            The uploaded file.
+        file_format : AdminUploadedDatasetType
+            Format of the file.
+
+        Yields
+        ------
+        Document
+            Text chunks (PDF, DOCX) or question/answer rows (CSV), in file order.
+        """
         file_format = file_format.value
 
         if file_format == "pdf":
-            docs = self._pdf_to_documents(file_content=file_content)
+            return self._pdf_to_documents(file_content=file_content)
         elif file_format == "docx":
-            docs = self._docx_to_documents(file_content=file_content)
+            return self._docx_to_documents(file_content=file_content)
         elif file_format == "csv":
-            docs = self._csv_to_documents(file_content=file_content)
+            return self._csv_to_documents(file_content=file_content)
         else:
             raise ValueError(f"File format: {file_format} not supported.")
 
-        return docs
+    async def _aiter_in_thread(self, documents: Iterator[Document], batch_size: int) -> AsyncIterator[Document]:
+        loop = asyncio.get_running_loop()
+        while batch := await loop.run_in_executor(None, lambda: list(itertools.islice(documents, batch_size))):
+            for doc in batch:
+                yield doc
+
+    async def aiter_documents(
+        self,
+        file_content: bytes,
+        file_format: AdminUploadedDatasetType,
+        batch_size: int = 64,
+    ) -> AsyncIterator[Document]:
+        """
+        Extract documents off the event loop and yield them as they are ready.
+
+        With more than one process, PDF and DOCX files of at least
+        ``parallel_min_bytes`` are extracted in the process pool, a few page ranges or fragments ahead of the
+        consumer; otherwise (and for CSV) extraction runs in a worker
+        thread, ``batch_size`` documents at a time. Either way extraction
+        runs only as far ahead as the consumer (e.g. ``add_documents``) reads.
+        """
+        parallel = self.processes > 1 and len(file_content) >= self.parallel_min_bytes
+
+        if parallel and file_format == AdminUploadedDatasetType.PDF:
+            documents = self._apdf_to_documents(file_content)
+        elif parallel and file_format == AdminUploadedDatasetType.WORD:
+            documents = self._adocx_to_documents(file_content)
+        else:
+            documents = self._aiter_in_thread(
+                self.iter_documents(file_content=file_content, file_format=file_format),
+                batch_size=batch_size,
+            )
+
+        async for doc in documents:
+            yield doc
+
+    def to_documents(self, file_content: bytes, file_format: AdminUploadedDatasetType) -> list[Document]:
+        return list(self.iter_documents(file_content=file_content, file_format=file_format))
 
 
 document_service = DocumentService(
     chunk_size=CHUNK_SIZE,
     chunk_overlap=CHUNK_OVERLAP,
-)
\ No newline at end of file
+)
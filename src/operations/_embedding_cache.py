@@ -0,0 +1,52 @@
+"""
+Shared cache of document embeddings.
+
+Embeddings computed during ingestion are kept by embedding model and
+hash of the chunk text, so a chunk repeated within or across datasets
+is embedded once.
+"""
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+import sqlalchemy as sa
+
+from src.models._base_sqlalchemy import CURRENT_TIME
+from src.models._llm import EmbeddingCacheEntry
+from src.operations._db_setup import DatabaseManager, db_manager
+
+
+class EmbeddingCacheOperations:
+    def __init__(self, db: DatabaseManager = db_manager) -> None:
+        self.session = db.get_sqlalchemy_db
+
+
+    async def get_many(self, model: str, text_hashes: list[bytes]) -> dict[bytes, list[float]]:
+        """Return the cached embeddings of the given text hashes, in one query."""
+        if not text_hashes:
+            return {}
+        query = sa.select(EmbeddingCacheEntry.text_hash, EmbeddingCacheEntry.embedding).where(
+            EmbeddingCacheEntry.model==model,
+            EmbeddingCacheEntry.text_hash.in_(text_hashes),
+        )
+
+        async with self.session() as session:
+            rows = await session.execute(query)
+
+        return {text_hash: embedding for text_hash, embedding in rows.all()}
+
+    async def put_many(self, model: str, embeddings: dict[bytes, list[float]]) -> None:
+        """Store embeddings by text hash; hashes already cached (e.g. by a concurrent job) are kept."""
+        if not embeddings:
+            return
+        query = pg_insert(EmbeddingCacheEntry).values([
+            {
+                "model": model,
+                "text_hash": text_hash,
+                "embedding": [float(dimension) for dimension in embedding],
+                "created_at": CURRENT_TIME(),
+            }
+            for text_hash, embedding in embeddings.items()
+        ]).on_conflict_do_nothing(index_elements=["model", "text_hash"])
+
+        async with self.session() as session:
+            _ = await session.execute(query)
+            await session.commit()
@@ -6,7 +6,9 @@ import sqlalchemy as sa
 import uuid
 
 
-from src.operations._db_setup import get_sqlalchemy_db
+from src.operations._chat_writer import chat_writer
+from src.operations._db_setup import DatabaseManager, db_manager
+from src.operations._metadata_cache import RAGSystemInfo, metadata_cache
 from src.models._llm import ChatSession, RAGSystem
 from src.schema._llm import CreateRAGSystemOutput, LLMType
 from src.models._base_sqlalchemy import CURRENT_TIME
@@ -21,8 +23,8 @@ logger = app_logger.getChild("src.operations._llm")
 
 
 class RAGSystemOperations:
-    def __init__(self):
-        self.session = get_sqlalchemy_db
+    def __init__(self, db: DatabaseManager = db_manager):
+        self.session = db.get_sqlalchemy_db
 
     
 
@@ -42,6 +44,7 @@ class RAGSystemOperations:
         async with self.session() as session:
             _ = await session.execute(query)
             await session.commit()
+        metadata_cache.invalidate_rag_system(rag_system_id)
 
 
     async def get(self, rag_system_id: uuid.UUID):
@@ -52,6 +55,18 @@ class RAGSystemOperations:
         
         return rag_system
 
+    async def get_info(self, rag_system_id: uuid.UUID) -> RAGSystemInfo | None:
+        """Return a cached snapshot of a RAG system, querying it on a miss."""
+        info = metadata_cache.get_rag_system(rag_system_id)
+        if info is None:
+            rag_system = await self.get(rag_system_id=rag_system_id)
+            if rag_system is None:
+                return None
+            info = RAGSystemInfo(id=rag_system.id, name=rag_system.name, dataset_id=rag_system.dataset_id)
+            metadata_cache.put_rag_system(info)
+        
+        return info
+
     async def list_available_rag_systems(self):
         query = sa.select(RAGSystem)
     
@@ -68,6 +83,7 @@ class RAGSystemOperations:
         async with self.session() as session:
             _ = await session.execute(query)
             await session.commit()
+        metadata_cache.invalidate_rag_system(rag_system_id)
 
 
 
@@ -77,8 +93,8 @@ class RAGSystemOperations:
 
 
 class ChatSessionOperations:
-    def __init__(self):
-        self.session = get_sqlalchemy_db
+    def __init__(self, db: DatabaseManager = db_manager):
+        self.session = db.get_sqlalchemy_db
     
     
     async def create(self, name: str, llm_type: LLMType, user_id: uuid.UUID, rag_system_id: uuid.UUID | None = None):
@@ -134,6 +150,11 @@ class ChatSessionOperations:
     
     
     async def update_last_active(self, session_id: uuid.UUID):
+        if chat_writer.enabled:
+            # written with the next batch of chat messages
+            chat_writer.touch_session(session_id=session_id)
+            return
+        
         query = sa.select(ChatSession).where(ChatSession.id==session_id)
     
         async with self.session() as session:
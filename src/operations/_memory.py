@@ -5,34 +5,89 @@ This module provides functionality to store and retrieve vector embeddings
 using PostgreSQL with pgvector and LangGraph AsyncPostgresStore.
 """
 
+import asyncio
+import time
 import uuid
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, AsyncIterator
 
+from langgraph.store.base import Item, PutOp
+from langgraph.store.postgres import AsyncPostgresStore
 
+from src.utils.config import get_config
 from src.utils.logger import app_logger
-from src.operations._db_setup import get_memory_db
+from src.utils.metrics import metrics
+from src.operations._db_setup import DatabaseManager, db_manager
 
 logger = app_logger.getChild("src.operations._memory")
 
 
+@dataclass
+class _QueuedWrite:
+    op: PutOp
+    # flushes failed so far
+    attempts: int = 0
+
+
 class MemoryService:
     """
     Service for interacting with the vector store.
     
     This class provides methods to store and retrieve vector embeddings
-    using LangGraph's AsyncPostgresStore.
+    using LangGraph's AsyncPostgresStore. Every call uses the store
+    shared by the application; namespace-wide deletes and listings go
+    to the store table directly, in one statement and in keyset pages.
     
     Attributes
     ----------
-    store : AsyncPostgresStore
-        The LangGraph AsyncPostgresStore instance.
-    dim : int
-        The dimension of the embedding vectors.
+    get_store : Callable[[], Awaitable[AsyncPostgresStore]]
+        Returns the shared LangGraph AsyncPostgresStore.
+    page_size : int
+        Number of memories read per page when listing.
+    write_batch_size : int
+        Number of queued memories that triggers an immediate write.
+    write_flush_interval_ms : float
+        Longest time a queued memory waits before being written.
+    write_max_attempts : int
+        Flushes a queued memory may fail before it is dropped.
+    max_queued_writes : int
+        Most memories kept queued; the oldest are dropped past it.
     """
     
-    def __init__(self) -> None:
-        """Initialize the vector store service."""
-        self.store = get_memory_db
+    def __init__(self, db: DatabaseManager = db_manager) -> None:
+        """
+        Initialize the vector store service.
+        
+        Parameters
+        ----------
+        db : DatabaseManager, optional
+            Connection manager owning the shared store.
+        """
+        self.get_store = db.get_memory_store
+        self.page_size = get_config("memory.page_size", 500)
+        self.write_batch_size = get_config("memory.write_batch_size", 64)
+        self.write_flush_interval_ms = get_config("memory.write_flush_interval_ms", 500)
+        self.write_max_attempts = get_config("memory.write_max_attempts", 5)
+        self.max_queued_writes = get_config("memory.max_queued_writes", 10000)
+        
+        self._queued: list[_QueuedWrite] = []
+        self._flush_lock: asyncio.Lock | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        
+        metrics.register_collector("memory", self.stats)
+    
+    
+    def stats(self) -> dict:
+        return {"queued_writes": len(self._queued)}
+    
+    
+    def _get_namespace(self, user_id: str) -> tuple[str, ...]:
+        return ("memories", str(user_id))
+    
+    def _get_prefix(self, namespace: tuple[str, ...]) -> str:
+        # AsyncPostgresStore keeps namespaces as dot-joined text in store.prefix
+        return ".".join(namespace)
     
     async def store_memory(
         self, user_id: str, content: str, metadata: Optional[Dict[str, Any]] = None
@@ -54,34 +109,153 @@ class MemoryService:
         uuid.UUID
             The ID of the stored memory in the vector store.
         """
-        async with self.store() as store:
+        store = await self.get_store()
+        try:
+            
+            # Prepare metadata
+            if metadata is None:
+                metadata = {}
+            
+            memory_data = {
+                "content": content,
+                "user_id": user_id,
+                "metadata": metadata,
+            }
+            
+            # Create namespace for memory entries
+            namespace = ("memories", user_id)
+            
+            # Generate a unique ID
+            memory_id = str(uuid.uuid4())
+            
+            # Store in vector store
+            await store.aput(namespace, memory_id, memory_data)
+            
+            logger.info(f"Stored memory for user {user_id}, ID: {memory_id}")
+            return uuid.UUID(memory_id)
+            
+        except Exception as e:
+            logger.error(f"Error storing memory: {str(e)}")
+            raise
+    
+    def _start(self) -> None:
+        # asyncio primitives are created inside the running loop
+        if self._task is None or self._task.done():
+            self._flush_lock = self._flush_lock or asyncio.Lock()
+            self._wakeup = self._wakeup or asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+    
+    async def _run(self) -> None:
+        while True:
             try:
-                
-                # Prepare metadata
-                if metadata is None:
-                    metadata = {}
-                
-                memory_data = {
-                    "content": content,
-                    "user_id": user_id,
-                    "metadata": metadata,
-                }
-                
-                # Create namespace for memory entries
-                namespace = ("memories", user_id)
-                
-                # Generate a unique ID
-                memory_id = str(uuid.uuid4())
-                
-                # Store in vector store
-                await store.aput(namespace, memory_id, memory_data)
-                
-                logger.info(f"Stored memory for user {user_id}, ID: {memory_id}")
-                return uuid.UUID(memory_id)
-                
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.write_flush_interval_ms / 1000)
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+            
+            try:
+                await self.flush()
             except Exception as e:
-                logger.error(f"Error storing memory: {str(e)}")
+                # memories stay queued for the next round
+                logger.error(f"Error writing queued memories: {str(e)}")
+    
+    def queue_memories(
+        self, user_id: str, contents: List[str], metadata: Optional[Dict[str, Any]] = None
+    ) -> list[uuid.UUID]:
+        """
+        Queue memories for a batched write.
+        
+        Queued memories are embedded and stored together by ``flush``,
+        which runs on a short interval or once ``write_batch_size``
+        memories are waiting.
+        
+        Parameters
+        ----------
+        user_id : str
+            The user ID associated with the memories.
+        contents : List[str]
+            The contents of the memories.
+        metadata : Dict[str, Any], optional
+            Additional metadata shared by the memories.
+            
+        Returns
+        -------
+        list[uuid.UUID]
+            The IDs the memories will be stored under.
+        """
+        self._start()
+        namespace = self._get_namespace(user_id)
+        memory_ids = [uuid.uuid4() for _ in contents]
+        self._queued.extend(
+            _QueuedWrite(PutOp(
+                namespace=namespace,
+                key=str(memory_id),
+                value={"content": content, "user_id": user_id, "metadata": metadata or {}},
+            ))
+            for memory_id, content in zip(memory_ids, contents)
+        )
+        self._trim_queue()
+        
+        if len(self._queued) >= self.write_batch_size:
+            self._wakeup.set()
+        return memory_ids
+    
+    async def flush(self) -> None:
+        """Embed and store every queued memory in one store batch."""
+        if self._flush_lock is None:
+            return
+        
+        async with self._flush_lock:
+            writes, self._queued = self._queued, []
+            if not writes:
+                return
+            
+            start = time.perf_counter()
+            try:
+                store = await self.get_store()
+                # one embedding call and one insert for the whole batch
+                await store.abatch([write.op for write in writes])
+            except asyncio.CancelledError:
+                self._queued[:0] = writes
+                raise
+            except Exception as e:
+                metrics.increment("memory.failed_flushes")
+                self._requeue(writes, error=e)
                 raise
+            
+            metrics.increment("memory.stored", len(writes))
+            metrics.observe("memory.batch_size", len(writes))
+            metrics.observe("memory.flush_latency_ms", (time.perf_counter() - start) * 1000)
+    
+    def _requeue(self, writes: list[_QueuedWrite], error: Exception) -> None:
+        retry = []
+        for write in writes:
+            write.attempts += 1
+            if write.attempts < self.write_max_attempts:
+                retry.append(write)
+        dropped = len(writes) - len(retry)
+        if dropped:
+            logger.error(f"Dropped {dropped} memories after {self.write_max_attempts} failed writes: {str(error)}")
+            metrics.increment("memory.dropped_writes", dropped)
+        # in front of what was queued meanwhile
+        self._queued[:0] = retry
+        self._trim_queue()
+    
+    def _trim_queue(self) -> None:
+        # bounded while the store is unreachable; the oldest memories go first
+        excess = len(self._queued) - self.max_queued_writes
+        if excess > 0:
+            del self._queued[:excess]
+            logger.warning(f"Memory write queue full, dropped the {excess} oldest memories")
+            metrics.increment("memory.dropped_writes", excess)
+    
+    async def close(self) -> None:
+        """Stop the flush loop and write what is still queued."""
+        if self._task is not None:
+            _ = self._task.cancel()
+            _ = await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
     
     async def search_memories(
         self, user_id: str, query: str, limit: int = 5
@@ -103,51 +277,106 @@ class MemoryService:
         List[Dict[str, Any]]
             List of memory entries sorted by relevance.
         """
-        async with self.store() as store:
-            try:
-                
-                # Create namespace for memory entries
-                namespace = ("memories", user_id)
-                
-                # Search vector store
-                results = await store.asearch(
-                    namespace,
-                    query=query,
-                    limit=limit,
-                )
-                
-                logger.info(f"Found {len(results)} relevant memories for user {user_id}")
-                return results
-                
-            except Exception as e:
-                logger.error(f"Error searching memories: {str(e)}")
-                raise
+        store = await self.get_store()
+        try:
+            
+            # Create namespace for memory entries
+            namespace = ("memories", user_id)
+            
+            # Search vector store
+            results = await store.asearch(
+                namespace,
+                query=query,
+                limit=limit,
+            )
+            
+            logger.info(f"Found {len(results)} relevant memories for user {user_id}")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error searching memories: {str(e)}")
+            raise
 
-    async def delete_memory_by_user_id(self, user_id: str):
+    async def delete_memory_by_user_id(self, user_id: str) -> int:
+        """
+        Delete every memory of a user in one statement.
+        
+        Parameters
+        ----------
+        user_id : str
+            The user whose memories are deleted.
+            
+        Returns
+        -------
+        int
+            Number of deleted memories.
+        """
+        prefix = self._get_prefix(self._get_namespace(user_id))
+        store = await self.get_store()
         
-        namespace = ('memories', user_id)
-        limit = 100000
+        # store_vectors rows go with them through ON DELETE CASCADE
+        async with store.conn.connection() as conn:
+            cursor = await conn.execute(
+                "DELETE FROM store WHERE prefix = %s OR prefix LIKE %s",
+                (prefix, prefix.replace("%", r"\%").replace("_", r"\_") + ".%"),
+            )
+            deleted = cursor.rowcount
         
-        async with self.store() as store:
-            results = await store.asearch(namespace, limit=limit)
-            if results:
-                keys = [r.key for r in results]
-                for key in keys:
-                    await store.adelete(namespace, key=key)
+        metrics.increment("memory.deleted", deleted)
+        logger.info(f"Deleted {deleted} memories of user {user_id}")
+        return deleted
     
     
+    async def iter_memories(self, user_id: str, page_size: int | None = None) -> AsyncIterator[Item]:
+        """
+        Iterate over the memories of a user, one keyset page at a time.
+        
+        Parameters
+        ----------
+        user_id : str
+            The user whose memories are listed.
+        page_size : int, optional
+            Memories read per round trip. Default is ``memory.page_size``.
+            
+        Yields
+        ------
+        Item
+            The memories of the user, ordered by key.
+        """
+        page_size = page_size or self.page_size
+        namespace = self._get_namespace(user_id)
+        prefix = self._get_prefix(namespace)
+        store = await self.get_store()
+        
+        last_key = None
+        while True:
+            async with store.conn.connection() as conn:
+                cursor = await conn.execute(
+                    "SELECT key, value, created_at, updated_at FROM store "
+                    "WHERE prefix = %s AND (%s::text IS NULL OR key > %s) "
+                    "ORDER BY key LIMIT %s",
+                    (prefix, last_key, last_key, page_size),
+                )
+                rows = await cursor.fetchall()
+            
+            for row in rows:
+                yield Item(
+                    value=row["value"],
+                    key=row["key"],
+                    namespace=namespace,
+                    created_at=row["created_at"],
+                    updated_at=row["updated_at"],
+                )
+            
+            if len(rows) < page_size:
+                return
+            last_key = rows[-1]["key"]
+    
     
     async def get_memory_by_user_id(self, user_id: str):
         
-        namespace = ('memories', user_id)
-        limit = 100000
-        
-        async with self.store() as store:
-            results = await store.asearch(namespace, limit=limit)
-            if results:
-                results = [r.value['content'] for r in results]
-                
-            return results
+        results = [item.value["content"] async for item in self.iter_memories(user_id)]
+        return results
 
 
 
@@ -0,0 +1,93 @@
+"""
+In-process cache of the metadata resolved on every chat request.
+
+This module keeps small snapshots of RAG systems and datasets (not the
+ORM rows, which may carry the dataset content) so that steady-state chat
+requests resolve their dataset without a query. Entries expire after a
+TTL, which bounds staleness across processes, and the operations that
+change or delete a row evict it at once.
+"""
+
+import uuid
+from dataclasses import dataclass
+from typing import Literal
+
+from src.utils.cache import TTLCache
+from src.utils.config import get_config
+from src.utils.metrics import metrics
+
+
+DatasetKind = Literal["admin", "user"]
+
+
+@dataclass(frozen=True)
+class RAGSystemInfo:
+    id: uuid.UUID
+    name: str
+    dataset_id: uuid.UUID
+
+
+@dataclass(frozen=True)
+class DatasetInfo:
+    id: uuid.UUID
+    is_vectorized: bool
+    expertise: str | None = None
+
+
+class MetadataCache:
+    """
+    TTL caches of RAG system and dataset snapshots.
+
+    Attributes
+    ----------
+    enabled : bool
+        Whether lookups are cached at all.
+    rag_systems : TTLCache[uuid.UUID, RAGSystemInfo]
+        RAG systems by id.
+    datasets : TTLCache[tuple[DatasetKind, uuid.UUID], DatasetInfo]
+        Admin and user datasets by kind and id.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = get_config("metadata_cache.enabled", True)
+        ttl = get_config("metadata_cache.ttl_seconds", 60)
+        max_size = get_config("metadata_cache.max_size", 1024)
+
+        self.rag_systems: TTLCache[uuid.UUID, RAGSystemInfo] = TTLCache(ttl=ttl, max_size=max_size)
+        self.datasets: TTLCache[tuple[DatasetKind, uuid.UUID], DatasetInfo] = TTLCache(ttl=ttl, max_size=max_size)
+
+        metrics.register_collector("metadata_cache", self.stats)
+
+
+    def stats(self) -> dict:
+        return {"rag_systems": self.rag_systems.stats(), "datasets": self.datasets.stats()}
+
+    def get_rag_system(self, rag_system_id: uuid.UUID) -> RAGSystemInfo | None:
+        return self.rag_systems.get(rag_system_id) if self.enabled else None
+
+    def put_rag_system(self, info: RAGSystemInfo) -> None:
+        if self.enabled:
+            self.rag_systems.put(info.id, info)
+
+    def invalidate_rag_system(self, rag_system_id: uuid.UUID) -> None:
+        _ = self.rag_systems.pop(rag_system_id)
+
+    def get_dataset(self, kind: DatasetKind, dataset_id: uuid.UUID) -> DatasetInfo | None:
+        return self.datasets.get((kind, dataset_id)) if self.enabled else None
+
+    def put_dataset(self, kind: DatasetKind, info: DatasetInfo) -> None:
+        if self.enabled:
+            self.datasets.put((kind, info.id), info)
+
+    def invalidate_dataset(self, kind: DatasetKind, dataset_id: uuid.UUID) -> None:
+        _ = self.datasets.pop((kind, dataset_id))
+        # RAG systems built on a deleted dataset go with it (ON DELETE CASCADE)
+        for rag_system_id in self.rag_systems:
+            info = self.rag_systems.get(rag_system_id)
+            if info is not None and info.dataset_id == dataset_id:
+                _ = self.rag_systems.pop(rag_system_id)
+
+
+
+
+metadata_cache = MetadataCache()
@@ -0,0 +1,161 @@
+"""
+Single-pass, token-aware text splitting.
+
+This module splits text into chunks sized in tokens of the embedding
+model, so chunks line up with its input limit. A text is scanned once
+with one precompiled separator pattern and tokenized once; chunk ends are
+then picked by binary search, preferring paragraph, then line, sentence
+and word boundaries. Chunks are returned as character spans of the text,
+which callers turn into byte offsets.
+"""
+
+import bisect
+import re
+
+from transformers import AutoTokenizer, PreTrainedTokenizerBase
+
+from src.utils.config import get_config
+from src.utils.logger import app_logger
+
+logger = app_logger.getChild("src.operations._text_splitter")
+
+
+EMBEDDING_MODEL = get_config("llm.embedding.model")
+OFFLINE = get_config("llm.embedding.offline", True)
+
+
+# one group per boundary level, in order of preference; a chunk ends after the separator
+_SEPARATORS = re.compile(
+    r"([ \t]*\n[ \t]*\n\s*)"  # paragraph
+    r"|([ \t]*\n\s*)"  # line
+    r"|((?<=[.!?;:؟؛۔…])[\"'»”)\]]*\s+)"  # sentence (Latin and Persian punctuation)
+    r"|(\s+)"  # word
+)
+_LEVELS = 4
+
+
+tokenizer: PreTrainedTokenizerBase | None = None
+
+
+def get_tokenizer() -> PreTrainedTokenizerBase:
+    """Load the tokenizer of the embedding model (without the model weights)."""
+    global tokenizer
+    if tokenizer is None:
+        tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL, local_files_only=OFFLINE)
+    return tokenizer
+
+
+class TokenTextSplitter:
+    """
+    Split text into overlapping chunks of at most ``chunk_size`` tokens.
+
+    A chunk is cut at the last paragraph boundary within its token
+    budget; if that would leave it less than half full, at the last line
+    boundary, and so on down to words. Text without any boundary is cut
+    between tokens. The next chunk starts at the first word boundary
+    ``chunk_overlap`` tokens before the end of the previous one.
+
+    Without a tokenizer, sizes are counted in characters.
+
+    Attributes
+    ----------
+    chunk_size : int
+        Most tokens (or characters) in a chunk.
+    chunk_overlap : int
+        Tokens (or characters) shared by consecutive chunks.
+    tokenizer : PreTrainedTokenizerBase, optional
+        Fast tokenizer of the embedding model.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        tokenizer: PreTrainedTokenizerBase | None = None,
+    ) -> None:
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})")
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.tokenizer = tokenizer
+
+    def _token_starts(self, text: str) -> list[int]:
+        # character offset where each token starts
+        if self.tokenizer is None:
+            return list(range(len(text)))
+        encoding = self.tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            verbose=False,
+        )
+        return [start for start, end in encoding["offset_mapping"] if end > start]
+
+    def split_spans(self, text: str) -> list[tuple[int, int]]:
+        """
+        Split a text into chunk spans.
+
+        Returns
+        -------
+        list[tuple[int, int]]
+            ``(start, end)`` character offsets of each chunk, in order,
+            with surrounding whitespace left out.
+        """
+        starts = self._token_starts(text)
+        # cut positions by level, and every cut position for the overlap starts
+        cuts: list[list[int]] = [[] for _ in range(_LEVELS)]
+        for match in _SEPARATORS.finditer(text):
+            cuts[match.lastindex - 1].append(match.end())
+        word_cuts = sorted(position for level in cuts for position in level)
+
+        spans = []
+        start = 0
+        while start < len(text):
+            first_token = bisect.bisect_left(starts, start)
+            last_token = first_token + self.chunk_size
+            if last_token >= len(starts):
+                end = len(text)
+            else:
+                limit = starts[last_token]
+                end = self._cut(cuts, start, limit)
+
+            span = self._strip(text, start, end)
+            if span is not None:
+                spans.append(span)
+            if end >= len(text):
+                break
+            start = self._next_start(starts, word_cuts, start, end)
+
+        return spans
+
+    def _cut(self, cuts: list[list[int]], start: int, limit: int) -> int:
+        half = start + (limit - start) // 2
+        for level, positions in enumerate(cuts):
+            i = bisect.bisect_right(positions, limit) - 1
+            # word boundaries are taken anywhere, coarser ones only past half the budget
+            lowest = start if level == _LEVELS - 1 else half
+            if i >= 0 and positions[i] > lowest:
+                return positions[i]
+        return limit
+
+    def _next_start(self, starts: list[int], word_cuts: list[int], start: int, end: int) -> int:
+        if self.chunk_overlap == 0:
+            return end
+        end_token = bisect.bisect_left(starts, end)
+        overlap_token = max(end_token - self.chunk_overlap, bisect.bisect_left(starts, start) + 1)
+        if overlap_token >= end_token:
+            return end
+        i = bisect.bisect_left(word_cuts, starts[overlap_token])
+        return word_cuts[i] if i < len(word_cuts) and word_cuts[i] < end else end
+
+    def _strip(self, text: str, start: int, end: int) -> tuple[int, int] | None:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return (start, end) if end > start else None
+
+    def split_text(self, text: str) -> list[str]:
+        return [text[start:end] for start, end in self.split_spans(text)]
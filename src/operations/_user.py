@@ -7,7 +7,8 @@ import sqlalchemy as sa
 import uuid
 
 
-from src.operations._db_setup import get_sqlalchemy_db
+from src.operations._db_setup import DatabaseManager, db_manager
+from src.operations._metadata_cache import DatasetInfo, metadata_cache
 from src.models._user import UserUploadedDatasetType, UserUploadedDataset, User
 from src.schema._user import ListAllUsersOutput, UserCreateOutput
 from src.utils.logger import app_logger
@@ -18,8 +19,8 @@ logger = app_logger.getChild("src.operations._user")
 
 
 class UserOperations:
-    def __init__(self) -> None:
-        self.session = get_sqlalchemy_db
+    def __init__(self, db: DatabaseManager = db_manager) -> None:
+        self.session = db.get_sqlalchemy_db
     
     async def create(self, username: str, user_id: uuid.UUID):
         new_user = User(
@@ -64,8 +65,8 @@ class UserOperations:
 
 
 class UserUploadedDatasetOperation:
-    def __init__(self) -> None:
-        self.session = get_sqlalchemy_db
+    def __init__(self, db: DatabaseManager = db_manager) -> None:
+        self.session = db.get_sqlalchemy_db
     
     
     
@@ -88,6 +89,7 @@ class UserUploadedDatasetOperation:
         async with self.session() as session:
             _ = await session.execute(query)
             await session.commit()
+        metadata_cache.invalidate_dataset("user", dataset_id)
     
     async def get_by_dataset_id(self, dataset_id: uuid.UUID):
         query = sa.select(UserUploadedDataset).where(UserUploadedDataset.id==dataset_id)
@@ -97,6 +99,23 @@ class UserUploadedDatasetOperation:
         
         return dataset
     
+    async def get_info(self, dataset_id: uuid.UUID) -> DatasetInfo | None:
+        """Return a cached snapshot of a dataset, querying it on a miss."""
+        info = metadata_cache.get_dataset("user", dataset_id)
+        if info is None:
+            # the row holds the uploaded file, only the flags are read
+            query = sa.select(UserUploadedDataset.id, UserUploadedDataset.is_vectorized)\
+                .where(UserUploadedDataset.id==dataset_id)
+            
+            async with self.session() as session:
+                row = (await session.execute(query)).first()
+            if row is None:
+                return None
+            info = DatasetInfo(id=row.id, is_vectorized=row.is_vectorized)
+            metadata_cache.put_dataset("user", info)
+        
+        return info
+    
     async def list_by_user_id(self, user_id: uuid.UUID):
         query = sa.select(UserUploadedDataset).where(UserUploadedDataset.user_id==user_id)
         
@@ -122,6 +141,7 @@ class UserUploadedDatasetOperation:
             if dataset:
                 _ = await session.execute(update_query)
                 await session.commit()
+                metadata_cache.invalidate_dataset("user", dataset_id)
                 dataset.is_vectorized = is_vectorized
                 return dataset
             else:
@@ -2,24 +2,35 @@
 
 
 
+import asyncio
+import hashlib
+import json
+import time
 import uuid
 import re
 
 from langchain_postgres import PGVectorStore
-from langchain_postgres.v2.indexes import HNSWIndex
 from langchain_postgres import Column
 
 from langchain_core.documents import Document
 
+from sqlalchemy import text
 from sqlalchemy.exc import ProgrammingError
 
-from typing import List
+from collections.abc import AsyncIterable, AsyncIterator, Iterable, Sized
+from dataclasses import dataclass
+from typing import Any, Callable, List
 
 
-from src.operations._db_setup import get_pg_engine, drop_table
-from src.llm._llm_setup import get_embedding_model
+from src.operations._db_setup import DatabaseManager, db_manager
+from src.operations._embedding_cache import EmbeddingCacheOperations
+from src.operations._llm import RAGSystemOperations
+from src.operations._vector_index import vector_index_service
+from src.llm._llm_setup import get_embedding_service
+from src.utils.cache import LRUCache, TTLCache
 from src.utils.config import get_config
 from src.utils.logger import app_logger
+from src.utils.metrics import metrics
 
 
 
@@ -27,19 +38,72 @@ from src.utils.logger import app_logger
 logger = app_logger.getChild("src.operations._vector_db")
 
 
+# extra columns of every dataset table, next to the ones PGVectorStore manages
+METADATA_COLUMNS = [("answer", "TEXT")]
+
+
+@dataclass
+class EmbeddingCacheStats:
+    """Documents of one ingestion whose embedding was found in the cache (hits) or computed (misses)."""
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_ratio(self) -> float | None:
+        total = self.hits + self.misses
+        return self.hits / total if total else None
+
+
+async def _aiter(items: Iterable[Any]) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+
 
 class VectorDbService:
     
-    def __init__(self) -> None:
-        self.engine = get_pg_engine()
+    def __init__(self, db: DatabaseManager = db_manager) -> None:
+        self.engine = db.get_pg_engine()
+        self.sqlalchemy_engine = db.sqlalchemy_engine
         
-        self.embedding = get_embedding_model()
+        self.embedding = get_embedding_service()
+        self.embedding_model_name = get_config("llm.embedding.model")
         self.VECTOR_SIZE = get_config("llm.embedding.vector_size")
         
         self.search_type = get_config("rag.search_type")
         self.k_retrieval = get_config("rag.k_retrieval")
         self.score_threshold = get_config("rag.score_threshold")
         
+        # hybrid (vector + full-text) search
+        self.text_search_config = get_config("rag.hybrid.text_search_config", "simple")
+        if not re.fullmatch(r"[a-z_]+", self.text_search_config):
+            raise ValueError(f"Invalid text search configuration: {self.text_search_config}")
+        self.hybrid_candidate_k = get_config("rag.hybrid.candidate_k", 20)
+        self.rrf_k = get_config("rag.hybrid.rrf_k", 60)
+        self._hybrid_ready: set[uuid.UUID] = set()
+        # tables found without the full-text column, checked again once the entry expires
+        self._hybrid_missing: TTLCache[uuid.UUID, bool] = TTLCache(
+            ttl=get_config("rag.hybrid.missing_column_ttl_seconds", 300),
+            max_size=get_config("rag.vectorstore_cache.max_size", 64),
+        )
+        
+        # PGVectorStore.create introspects the table, so handles are reused between requests
+        self._vectorstores: LRUCache[uuid.UUID, PGVectorStore] = LRUCache(
+            max_size=get_config("rag.vectorstore_cache.max_size", 64),
+        )
+        self._vectorstore_locks: dict[uuid.UUID, asyncio.Lock] = {}
+        metrics.register_collector("vectorstore_cache", self._vectorstores.stats)
+        
+        # ingestion pipeline
+        self.ingestion_max_batch_size = get_config("rag.ingestion.max_batch_size", 64)
+        self.ingestion_max_batch_chars = get_config("rag.ingestion.max_batch_chars", 32000)
+        self.ingestion_queue_size = get_config("rag.ingestion.queue_size", 4)
+        self.ingestion_embed_concurrency = get_config("rag.ingestion.embed_concurrency", 1)
+        self.ingestion_insert_concurrency = get_config("rag.ingestion.insert_concurrency", 2)
+        # embeddings shared across datasets by model and text hash
+        self.embedding_cache_enabled = get_config("rag.ingestion.embedding_cache", True)
+        self.embedding_cache = EmbeddingCacheOperations(db=db)
+        
     
     
     def _get_table_name(self, dataset_id: uuid.UUID) -> str:
@@ -56,41 +120,152 @@ class VectorDbService:
                 table_name=TABLE_NAME,
                 vector_size=self.VECTOR_SIZE,
                 metadata_columns=[
-                    Column("answer", "TEXT"),
+                    Column(name, data_type) for name, data_type in METADATA_COLUMNS
                 ]
             )
         except ProgrammingError:
             # Catching the exception here
             print("Table already exists. Skipping creation.")
+        
+        if self.search_type == "hybrid":
+            # the table is still empty, so adding the column does not rewrite any rows
+            await self.add_hybrid_search(dataset_id=dataset_id)
+
+    async def add_hybrid_search(self, dataset_id: uuid.UUID) -> None:
+        """
+        Add the full-text column and index hybrid search needs to a dataset table.
+
+        Done when the table is created. On a table created without them
+        (e.g. before ``rag.search_type`` was ``hybrid``) this rewrites the
+        whole table under an exclusive lock, so it is left to
+        ``scripts/add_hybrid_search.py`` rather than the search path.
+        """
+        TABLE_NAME = self._get_table_name(dataset_id=dataset_id)
+        
+        # generated column, so rows inserted by any path get their tsvector
+        async with self.sqlalchemy_engine.connect() as conn:
+            await conn.execute(text(
+                f'ALTER TABLE "{TABLE_NAME}" ADD COLUMN IF NOT EXISTS content_tsv tsvector '
+                f"GENERATED ALWAYS AS (to_tsvector('{self.text_search_config}', content)) STORED"
+            ))
+            await conn.execute(text(
+                f'CREATE INDEX IF NOT EXISTS "{TABLE_NAME}_tsv" ON "{TABLE_NAME}" USING gin (content_tsv)'
+            ))
+            await conn.commit()
+        
+        self._hybrid_ready.add(dataset_id)
+        _ = self._hybrid_missing.pop(dataset_id)
+
+    async def _has_hybrid_search(self, dataset_id: uuid.UUID) -> bool:
+        if dataset_id in self._hybrid_ready:
+            return True
+        if self._hybrid_missing.get(dataset_id):
+            return False
+        
+        TABLE_NAME = self._get_table_name(dataset_id=dataset_id)
+        
+        # a missing column is only cached for a while, so a table migrated meanwhile is picked up
+        query = text("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = :table_name AND column_name = 'content_tsv'
+        """)
+        async with self.sqlalchemy_engine.connect() as conn:
+            result = await conn.execute(query, {"table_name": TABLE_NAME})
+            found = result.first() is not None
+        
+        if found:
+            self._hybrid_ready.add(dataset_id)
+        else:
+            self._hybrid_missing.put(dataset_id, True)
+            logger.warning(
+                f"Vector table of dataset {dataset_id} has no full-text column, using similarity search "
+                f"(run scripts/add_hybrid_search.py to add it)"
+            )
+        return found
 
     
     async def delete_vectore_table(self, dataset_id: uuid.UUID) -> None:
         TABLE_NAME = self._get_table_name(dataset_id=dataset_id)
         
-        await drop_table(table_name=TABLE_NAME)
+        self.invalidate_vectorstore(dataset_id=dataset_id)
+        self._hybrid_ready.discard(dataset_id)
+        _ = self._hybrid_missing.pop(dataset_id)
+        vector_index_service.cancel(dataset_id=dataset_id)
+        await self.engine.adrop_table(TABLE_NAME)
 
     
+    def invalidate_vectorstore(self, dataset_id: uuid.UUID) -> None:
+        _ = self._vectorstores.pop(dataset_id)
     
     async def _get_vectorstore_api(self, dataset_id: uuid.UUID) -> PGVectorStore:
-        TABLE_NAME = self._get_table_name(dataset_id=dataset_id)
-        
+        vectorstore = self._vectorstores.get(dataset_id)
+        if vectorstore is not None:
+            return vectorstore
         
-        vectorstore = await PGVectorStore.create(
-            engine=self.engine,
-            table_name=TABLE_NAME,
-            embedding_service=self.embedding,
-        )
+        # one introspection per dataset even when many requests miss at once
+        lock = self._vectorstore_locks.setdefault(dataset_id, asyncio.Lock())
+        async with lock:
+            vectorstore = self._vectorstores.get(dataset_id)
+            if vectorstore is None:
+                TABLE_NAME = self._get_table_name(dataset_id=dataset_id)
+                
+                vectorstore = await PGVectorStore.create(
+                    engine=self.engine,
+                    table_name=TABLE_NAME,
+                    embedding_service=self.embedding,
+                )
+                self._vectorstores.put(dataset_id, vectorstore)
+        _ = self._vectorstore_locks.pop(dataset_id, None)
         
         return vectorstore
     
-    async def _apply_index_reindex(self, dataset_id: uuid.UUID) -> None:
-        vectorstore = await self._get_vectorstore_api(dataset_id=dataset_id)
-        index = HNSWIndex()
+    async def _prewarm_index(self, dataset_id: uuid.UUID) -> None:
+        TABLE_NAME = self._get_table_name(dataset_id=dataset_id)
         
+        # load the table's index pages (HNSW graph) into shared buffers
+        query = text("""
+            SELECT pg_prewarm(indexrelid::regclass)
+            FROM pg_index
+            WHERE indrelid = to_regclass(:table_name)
+        """)
+        async with self.sqlalchemy_engine.connect() as conn:
+            await conn.execute(query, {"table_name": TABLE_NAME})
+            await conn.commit()
+    
+    async def create_prewarm_extension(self) -> bool:
+        """Create the pg_prewarm extension index prewarming needs; False if it can't be."""
+        # once at startup: it needs the CREATE privilege and locks the catalog
         try:
-            await vectorstore.aapply_vector_index(index)
-        except:
-            await vectorstore.areindex()
+            async with self.sqlalchemy_engine.connect() as conn:
+                await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_prewarm"))
+                await conn.commit()
+        except Exception as e:
+            logger.warning(f"Could not create the pg_prewarm extension, index pages are not prewarmed: {str(e)}")
+            return False
+        return True
+    
+    async def warmup(self, dataset_ids: list[uuid.UUID], prewarm_index: bool = True) -> None:
+        """
+        Create vectorstore handles (and optionally load index pages) ahead of the first query.
+
+        Index pages are loaded with pg_prewarm, which ``create_prewarm_extension`` sets up.
+        """
+        for dataset_id in dataset_ids:
+            try:
+                _ = await self._get_vectorstore_api(dataset_id=dataset_id)
+                if self.search_type == "hybrid":
+                    _ = await self._has_hybrid_search(dataset_id=dataset_id)
+                if prewarm_index:
+                    await self._prewarm_index(dataset_id=dataset_id)
+            except Exception as e:
+                logger.warning(f"Could not warm up vectorstore of dataset {dataset_id}: {str(e)}")
+        
+        logger.info(f"Warmed up {len(dataset_ids)} vectorstores")
+    
+    async def get_index_status(self, dataset_id: uuid.UUID) -> dict:
+        TABLE_NAME = self._get_table_name(dataset_id=dataset_id)
+        
+        return await vector_index_service.get_status(dataset_id=dataset_id, table_name=TABLE_NAME)
     
     
 
@@ -115,42 +290,331 @@ class VectorDbService:
                         d.metadata[k] = self._sanitize_text(v)
         return docs
 
-    async def add_documents(self, documents: list[Document], dataset_id: uuid.UUID) -> None:
-        len_docs = len(documents)
-        batch_size = 10
+    async def _iter_batches(self, documents: Iterable[Document] | AsyncIterable[Document]) -> AsyncIterator[list[Document]]:
+        # documents are read a window at a time, so a generator is never materialized
+        window_size = self.ingestion_max_batch_size * self.ingestion_queue_size
+        window: list[Document] = []
+        
+        if not isinstance(documents, AsyncIterable):
+            documents = _aiter(documents)
+        async for doc in documents:
+            window.append(doc)
+            if len(window) >= window_size:
+                for batch in self._make_batches(self._sanitize_documents(window)):
+                    yield batch
+                window = []
+        
+        for batch in self._make_batches(self._sanitize_documents(window)):
+            yield batch
+
+    def _make_batches(self, documents: list[Document]) -> list[list[Document]]:
+        # length-sorted so texts of one batch need little padding,
+        # and bounded by characters so batches of long chunks stay small
+        documents = sorted(documents, key=lambda d: len(d.page_content), reverse=True)
+        
+        batches: list[list[Document]] = []
+        batch: list[Document] = []
+        batch_chars = 0
+        for doc in documents:
+            doc_chars = len(doc.page_content)
+            if batch and (len(batch) >= self.ingestion_max_batch_size or batch_chars + doc_chars > self.ingestion_max_batch_chars):
+                batches.append(batch)
+                batch = []
+                batch_chars = 0
+            batch.append(doc)
+            batch_chars += doc_chars
+        if batch:
+            batches.append(batch)
+        
+        return batches
+
+    async def _embed_documents(self, texts: list[str], cache_stats: EmbeddingCacheStats) -> list[list[float]]:
+        if not self.embedding_cache_enabled:
+            cache_stats.misses += len(texts)
+            return await self.embedding.aembed_documents(texts)
+        
+        # one lookup for the batch; repeats within the batch are embedded once
+        text_hashes = [hashlib.sha256(text.encode()).digest() for text in texts]
+        texts_by_hash = dict(zip(text_hashes, texts))
         try:
-            await self._init_vector_table(dataset_id=dataset_id)
-        finally:
-            vectorstore = await self._get_vectorstore_api(dataset_id=dataset_id)
-            
-            # batched vectorize for handling large number of documents
-            for i in range(0, len_docs, batch_size):
-                documents_batch = documents[i: i+batch_size]
-                documents_batch = self._sanitize_documents(documents_batch)
-                _ = await vectorstore.aadd_documents(documents=documents_batch)
+            embeddings = await self.embedding_cache.get_many(model=self.embedding_model_name, text_hashes=list(texts_by_hash))
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed, embedding the whole batch: {str(e)}")
+            embeddings = {}
+        
+        misses = [text_hash for text_hash in texts_by_hash if text_hash not in embeddings]
+        if misses:
+            computed = dict(zip(misses, await self.embedding.aembed_documents([texts_by_hash[text_hash] for text_hash in misses])))
+            try:
+                await self.embedding_cache.put_many(model=self.embedding_model_name, embeddings=computed)
+            except Exception as e:
+                logger.warning(f"Could not store {len(computed)} embeddings in the cache: {str(e)}")
+            embeddings.update(computed)
+        
+        cache_stats.hits += len(texts) - len(misses)
+        cache_stats.misses += len(misses)
+        metrics.increment("ingestion.embedding_cache.hits", len(texts) - len(misses))
+        metrics.increment("ingestion.embedding_cache.misses", len(misses))
+        return [embeddings[text_hash] for text_hash in text_hashes]
 
+    async def _insert_batch(self, dataset_id: uuid.UUID, documents: list[Document], embeddings: list[list[float]]) -> None:
+        TABLE_NAME = self._get_table_name(dataset_id=dataset_id)
+        metadata_names = [name for name, _ in METADATA_COLUMNS]
+        
+        columns = ", ".join(f'"{name}"' for name in ["langchain_id", "content", "embedding", *metadata_names, "langchain_metadata"])
+        values = ", ".join(f":{name}" for name in ["langchain_id", "content", "embedding", *metadata_names, "extra"])
+        query = text(f'INSERT INTO "{TABLE_NAME}" ({columns}) VALUES ({values})')
+        
+        rows = []
+        for doc, embedding in zip(documents, embeddings):
+            extra = {k: v for k, v in doc.metadata.items() if k not in metadata_names}
+            row = {
+                "langchain_id": doc.id or str(uuid.uuid4()),
+                "content": doc.page_content,
+                "embedding": str([float(dimension) for dimension in embedding]),
+                "extra": json.dumps(extra),
+            }
+            for name in metadata_names:
+                row[name] = doc.metadata.get(name)
+            rows.append(row)
+        
+        # one executemany in one transaction, instead of a connection and commit per row
+        async with self.sqlalchemy_engine.connect() as conn:
+            await conn.execute(query, rows)
+            await conn.commit()
+
+    async def add_documents(
+        self,
+        documents: Iterable[Document] | AsyncIterable[Document],
+        dataset_id: uuid.UUID,
+        on_progress: Callable[[int, int | None], Any] | None = None,
+        cache_stats: EmbeddingCacheStats | None = None,
+    ) -> int:
+        """
+        Embed and store documents of a dataset.
+        
+        Reading, embedding and inserting run as a pipeline: documents are
+        pulled from ``documents`` only as fast as bounded queues drain,
+        embedding workers put finished batches on a queue that insert
+        workers drain, so batch N+1 is embedded while batch N is written
+        to Postgres. Embeddings are looked up by text hash in the shared
+        embedding cache first, so only texts never embedded by the model
+        are sent to it.
+        
+        Parameters
+        ----------
+        documents : Iterable[Document] or AsyncIterable[Document]
+            Documents to store; generators are consumed incrementally.
+        dataset_id : uuid.UUID
+            ID of the dataset the documents belong to.
+        on_progress : Callable[[int, int | None], Any], optional
+            Called with (stored documents, total documents) after each
+            batch; the total is None when ``documents`` has no length.
+        cache_stats : EmbeddingCacheStats, optional
+            Counts the embedding cache hits and misses of this call.
             
-            await self._apply_index_reindex(dataset_id=dataset_id)
+        Returns
+        -------
+        int
+            Number of stored documents.
+        """
+        await self._init_vector_table(dataset_id=dataset_id)
+        
+        total = len(documents) if isinstance(documents, Sized) else None
+        cache_stats = cache_stats if cache_stats is not None else EmbeddingCacheStats()
+        batches: asyncio.Queue[list[Document] | None] = asyncio.Queue(maxsize=self.ingestion_queue_size)
+        queue: asyncio.Queue[tuple[list[Document], list[list[float]]] | None] = asyncio.Queue(maxsize=self.ingestion_queue_size)
+        stored = 0
+        start = time.perf_counter()
+        
+        async def read_batches():
+            async for batch in self._iter_batches(documents):
+                await batches.put(batch)
+            for _ in range(self.ingestion_embed_concurrency):
+                await batches.put(None)
+        
+        async def embed_worker():
+            # each worker pulls the next batch when ready
+            while (batch := await batches.get()) is not None:
+                embeddings = await self._embed_documents([doc.page_content for doc in batch], cache_stats=cache_stats)
+                await queue.put((batch, embeddings))
+        
+        async def insert_worker():
+            nonlocal stored
+            while (item := await queue.get()) is not None:
+                batch, embeddings = item
+                await self._insert_batch(dataset_id=dataset_id, documents=batch, embeddings=embeddings)
+                stored += len(batch)
+                logger.info(f"Stored {stored}/{total or '?'} documents of dataset {dataset_id}")
+                if on_progress is not None:
+                    on_progress(stored, total)
+        
+        async def close_queue(embed_tasks: list[asyncio.Task]):
+            await asyncio.gather(*embed_tasks)
+            for _ in range(self.ingestion_insert_concurrency):
+                await queue.put(None)
+        
+        try:
+            async with asyncio.TaskGroup() as tg:
+                _ = tg.create_task(read_batches())
+                for _ in range(self.ingestion_insert_concurrency):
+                    _ = tg.create_task(insert_worker())
+                embed_tasks = [tg.create_task(embed_worker()) for _ in range(self.ingestion_embed_concurrency)]
+                _ = tg.create_task(close_queue(embed_tasks))
+        except ExceptionGroup as eg:
+            # surface the failure itself (stored as the job's error), as a sequential loop would
+            raise eg.exceptions[0]
+        
+        elapsed = time.perf_counter() - start
+        metrics.increment("ingestion.documents", stored)
+        if elapsed > 0:
+            metrics.observe("ingestion.documents_per_second", stored / elapsed)
+        if cache_stats.hit_ratio is not None:
+            metrics.observe("ingestion.embedding_cache.hit_ratio", cache_stats.hit_ratio)
+            logger.info(f"Embedding cache hit ratio of dataset {dataset_id}: {cache_stats.hit_ratio:.1%}")
+        
+        # index maintenance runs in the background, so the caller does not wait for it
+        vector_index_service.schedule(
+            dataset_id=dataset_id,
+            table_name=self._get_table_name(dataset_id=dataset_id),
+            rows_changed=stored,
+        )
+        return stored
         
         
-    async def search(self, query: str, dataset_id: uuid.UUID) -> List[Document]:
+    async def _hybrid_search(self, query: str, dataset_id: uuid.UUID, k: int) -> List[Document]:
+        TABLE_NAME = self._get_table_name(dataset_id=dataset_id)
+        
+        embedding = await self.embedding.aembed_query(query)
+        metadata_names = [name for name, _ in METADATA_COLUMNS]
+        metadata_select = "".join(f', t."{name}"' for name in metadata_names)
+        
+        # both candidate lists and their reciprocal-rank fusion in one round trip;
+        # the inner LIMIT queries are what lets the HNSW and GIN indexes be used
+        hybrid_query = text(f"""
+            WITH dense AS (
+                SELECT langchain_id, distance, row_number() OVER (ORDER BY distance) AS rank
+                FROM (
+                    SELECT langchain_id, embedding <=> CAST(:embedding AS vector) AS distance
+                    FROM "{TABLE_NAME}"
+                    ORDER BY distance
+                    LIMIT :candidate_k
+                ) AS nearest
+            ),
+            lexical AS (
+                SELECT langchain_id, row_number() OVER (ORDER BY text_rank DESC) AS rank
+                FROM (
+                    SELECT langchain_id, ts_rank_cd(content_tsv, tsquery) AS text_rank
+                    FROM "{TABLE_NAME}", plainto_tsquery('{self.text_search_config}', :query) AS tsquery
+                    WHERE content_tsv @@ tsquery
+                    ORDER BY text_rank DESC
+                    LIMIT :candidate_k
+                ) AS matched
+            ),
+            fused AS (
+                SELECT
+                    coalesce(dense.langchain_id, lexical.langchain_id) AS langchain_id,
+                    coalesce(1.0 / (:rrf_k + dense.rank), 0) + coalesce(1.0 / (:rrf_k + lexical.rank), 0) AS rrf_score,
+                    dense.distance,
+                    lexical.rank AS lexical_rank
+                FROM dense FULL OUTER JOIN lexical ON dense.langchain_id = lexical.langchain_id
+            )
+            SELECT t.langchain_id, t.content, t.langchain_metadata{metadata_select}, fused.rrf_score, fused.distance
+            FROM fused JOIN "{TABLE_NAME}" AS t ON t.langchain_id = fused.langchain_id
+            -- only vector-only candidates must pass the similarity threshold; a full-text
+            -- match is kept even when it is also a (distant) dense candidate
+            WHERE fused.lexical_rank IS NOT NULL OR 1 - fused.distance >= :score_threshold
+            ORDER BY fused.rrf_score DESC
+            LIMIT :k
+        """)
+        params = {
+            "embedding": str([float(dimension) for dimension in embedding]),
+            "query": query,
+            "candidate_k": max(self.hybrid_candidate_k, k),
+            "rrf_k": self.rrf_k,
+            "score_threshold": self.score_threshold,
+            "k": k,
+        }
+        
+        async with self.sqlalchemy_engine.connect() as conn:
+            result = await conn.execute(hybrid_query, params)
+            rows = result.mappings().fetchall()
+        
+        retrieved_docs = []
+        for row in rows:
+            metadata = row["langchain_metadata"] or {}
+            if isinstance(metadata, str):
+                metadata = json.loads(metadata)
+            for name in metadata_names:
+                metadata[name] = row[name]
+            metadata["rrf_score"] = float(row["rrf_score"])
+            # lexical-only matches have no vector distance
+            metadata["similarity"] = None if row["distance"] is None else 1 - float(row["distance"])
+            retrieved_docs.append(Document(
+                page_content=row["content"],
+                metadata=metadata,
+                id=str(row["langchain_id"]),
+            ))
+        
+        return retrieved_docs
+    
+    async def search(self, query: str, dataset_id: uuid.UUID, k: int | None = None) -> List[Document]:
+        # callers reranking the result ask for more candidates than rag.k_retrieval
+        k = k or self.k_retrieval
+        
+        if self.search_type == "hybrid" and await self._has_hybrid_search(dataset_id=dataset_id):
+            return await self._hybrid_search(query=query, dataset_id=dataset_id, k=k)
+        
         vectorstore = await self._get_vectorstore_api(dataset_id=dataset_id)
         
         
         search_kwrags = {
-            'k': self.k_retrieval,
+            'k': k,
             'score_threshold': self.score_threshold,
         }
         
-        retrieved_docs = await vectorstore.asearch(
+        if self.search_type == "mmr":
+            retrieved_docs = await vectorstore.asearch(
+                query=query,
+                search_type=self.search_type,
+                **search_kwrags,
+            )
+            return retrieved_docs
+        
+        # same search asearch runs for similarity(_score_threshold) (and hybrid search
+        # on tables without the full-text column), keeping the
+        # scores so the relevance grader can decide without an LLM call
+        if self.search_type == "similarity":
+            search_kwrags.pop('score_threshold')
+        docs_and_scores = await vectorstore.asimilarity_search_with_relevance_scores(
             query=query,
-            search_type=self.search_type,
             **search_kwrags,
         )
         
+        retrieved_docs = []
+        for doc, score in docs_and_scores:
+            doc.metadata["similarity"] = float(score)
+            retrieved_docs.append(doc)
+        
         return retrieved_docs
 
 
 
 
-vector_db_service = VectorDbService()
\ No newline at end of file
+vector_db_service = VectorDbService()
+
+
+
+async def setup_vector_db():
+    if not get_config("rag.vectorstore_cache.prewarm", False):
+        return
+    
+    prewarm_index = get_config("rag.vectorstore_cache.prewarm_index", True)
+    if prewarm_index:
+        prewarm_index = await vector_db_service.create_prewarm_extension()
+    
+    rag_systems = await RAGSystemOperations().list_available_rag_systems()
+    await vector_db_service.warmup(
+        dataset_ids=[rag_system.dataset_id for rag_system in rag_systems],
+        prewarm_index=prewarm_index,
+    )
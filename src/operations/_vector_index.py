@@ -0,0 +1,223 @@
+"""
+Deferred HNSW index maintenance for dataset vector tables.
+
+This module builds and rebuilds the HNSW index of a dataset table in the
+background, off the admin request path, using ``CREATE INDEX CONCURRENTLY``
+so similarity queries keep running during the build.
+"""
+
+import asyncio
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Literal
+
+from langchain_postgres.v2.indexes import DEFAULT_INDEX_NAME_SUFFIX, HNSWIndex
+from sqlalchemy import text
+
+from src.models._base_sqlalchemy import CURRENT_TIME
+from src.operations._db_setup import DatabaseManager, db_manager
+from src.utils.config import get_config
+from src.utils.logger import app_logger
+from src.utils.metrics import metrics
+
+
+logger = app_logger.getChild("src.operations._vector_index")
+
+
+# postgres truncates identifiers longer than NAMEDATALEN - 1 characters
+MAX_IDENTIFIER_LENGTH = 63
+
+
+IndexBuildState = Literal["scheduled", "building", "ready", "skipped", "failed", "cancelled"]
+
+
+@dataclass
+class IndexBuildStatus:
+    dataset_id: uuid.UUID
+    state: IndexBuildState
+    rows_changed: int = 0
+    total_rows: int | None = None
+    m: int | None = None
+    ef_construction: int | None = None
+    scheduled_at: datetime = field(default_factory=CURRENT_TIME)
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    error: str | None = None
+
+
+class VectorIndexService:
+    """
+    Background scheduler for HNSW index builds.
+
+    Builds are debounced per dataset: rows added while a build is waiting
+    are folded into the same build. Existing indexes are left alone when
+    only a small share of the table changed, since pgvector keeps HNSW
+    indexes up to date on insert.
+
+    Attributes
+    ----------
+    build_delay_seconds : float
+        Time to wait for further changes before building.
+    rebuild_ratio : float
+        Share of changed rows above which an existing index is rebuilt.
+    """
+
+    def __init__(self, db: DatabaseManager = db_manager) -> None:
+        self.engine = db.sqlalchemy_engine
+
+        self.default_m = get_config("rag.hnsw.m", 16)
+        self.default_ef_construction = get_config("rag.hnsw.ef_construction", 64)
+        self.dataset_params = get_config("rag.hnsw.datasets", {}) or {}
+        self.build_delay_seconds = get_config("rag.hnsw.build_delay_seconds", 5)
+        self.rebuild_ratio = get_config("rag.hnsw.rebuild_ratio", 0.2)
+        self.maintenance_work_mem = get_config("rag.hnsw.maintenance_work_mem")
+
+        self._status: dict[uuid.UUID, IndexBuildStatus] = {}
+        self._tasks: dict[uuid.UUID, asyncio.Task] = {}
+
+
+    def _get_index_name(self, table_name: str) -> str:
+        return (table_name + DEFAULT_INDEX_NAME_SUFFIX)[:MAX_IDENTIFIER_LENGTH]
+
+    def _get_index(self, dataset_id: uuid.UUID, table_name: str) -> HNSWIndex:
+        params = self.dataset_params.get(str(dataset_id), {})
+        return HNSWIndex(
+            name=self._get_index_name(table_name),
+            m=params.get("m", self.default_m),
+            ef_construction=params.get("ef_construction", self.default_ef_construction),
+        )
+
+
+    def schedule(self, dataset_id: uuid.UUID, table_name: str, rows_changed: int) -> None:
+        """
+        Schedule an index build for a dataset table.
+
+        Parameters
+        ----------
+        dataset_id : uuid.UUID
+            ID of the dataset.
+        table_name : str
+            Vector table of the dataset.
+        rows_changed : int
+            Number of rows added since the last build.
+        """
+        status = self._status.get(dataset_id)
+        if status is not None and status.state == "scheduled":
+            status.rows_changed += rows_changed
+            return
+
+        if status is not None and status.state == "building":
+            # the running build may miss these rows, so queue another pass behind it
+            rows_changed += status.rows_changed
+
+        index = self._get_index(dataset_id=dataset_id, table_name=table_name)
+        self._status[dataset_id] = IndexBuildStatus(
+            dataset_id=dataset_id,
+            state="scheduled",
+            rows_changed=rows_changed,
+            m=index.m,
+            ef_construction=index.ef_construction,
+        )
+        previous = self._tasks.get(dataset_id)
+        self._tasks[dataset_id] = asyncio.create_task(self._run(dataset_id, table_name, index, previous))
+        metrics.increment("vector_index.scheduled")
+
+    def cancel(self, dataset_id: uuid.UUID) -> None:
+        task = self._tasks.pop(dataset_id, None)
+        if task is not None and not task.done():
+            _ = task.cancel()
+        _ = self._status.pop(dataset_id, None)
+
+    async def close(self) -> None:
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            _ = task.cancel()
+        _ = await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+
+    async def get_status(self, dataset_id: uuid.UUID, table_name: str) -> dict:
+        """
+        Return the build status of a dataset index.
+
+        Falls back to the catalog when no build ran in this process.
+        """
+        status = self._status.get(dataset_id)
+        if status is not None:
+            return asdict(status)
+
+        index_name = self._get_index_name(table_name)
+        async with self.engine.connect() as conn:
+            is_valid = await self._is_valid_index(conn, index_name)
+        state = "ready" if is_valid else "missing"
+        return {"dataset_id": dataset_id, "state": state}
+
+
+    async def _is_valid_index(self, conn, index_name: str) -> bool | None:
+        # None: no index, False: left invalid by an interrupted concurrent build
+        query = text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:index_name)")
+        return await conn.scalar(query, {"index_name": index_name})
+
+    async def _run(self, dataset_id: uuid.UUID, table_name: str, index: HNSWIndex, previous: asyncio.Task | None) -> None:
+        status = self._status[dataset_id]
+        try:
+            if previous is not None and not previous.done():
+                _ = await asyncio.gather(previous, return_exceptions=True)
+            await asyncio.sleep(self.build_delay_seconds)
+
+            status.state = "building"
+            status.started_at = CURRENT_TIME()
+            await self._build(table_name=table_name, index=index, status=status)
+            status.finished_at = CURRENT_TIME()
+            metrics.increment(f"vector_index.{status.state}")
+            logger.info(f"Index of dataset {dataset_id} {status.state} ({status.rows_changed} rows changed of {status.total_rows})")
+
+        except asyncio.CancelledError:
+            status.state = "cancelled"
+            raise
+        except Exception as e:
+            status.state = "failed"
+            status.error = str(e)
+            status.finished_at = CURRENT_TIME()
+            metrics.increment("vector_index.failed")
+            logger.error(f"Error building index of dataset {dataset_id}: {str(e)}")
+
+    async def _build(self, table_name: str, index: HNSWIndex, status: IndexBuildStatus) -> None:
+        async with self.engine.connect() as conn:
+            # CONCURRENTLY can not run inside a transaction block
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+
+            status.total_rows = await conn.scalar(
+                text("SELECT greatest(reltuples, 0)::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+                {"table_name": table_name},
+            )
+            is_valid = await self._is_valid_index(conn, index.name)
+
+            if is_valid and status.rows_changed < self.rebuild_ratio * (status.total_rows or 0):
+                status.state = "skipped"
+                return
+
+            if self.maintenance_work_mem:
+                _ = await conn.execute(text(f"SET maintenance_work_mem = '{self.maintenance_work_mem}'"))
+            try:
+                if is_valid:
+                    _ = await conn.execute(text(f'REINDEX INDEX CONCURRENTLY "{index.name}"'))
+                else:
+                    if is_valid is False:
+                        _ = await conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+                    _ = await conn.execute(text(
+                        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{index.name}" ON "{table_name}" '
+                        f'USING {index.index_type} (embedding {index.get_index_function()}) '
+                        f'WITH {index.index_options()}'
+                    ))
+            finally:
+                if self.maintenance_work_mem:
+                    _ = await conn.execute(text("RESET maintenance_work_mem"))
+
+            status.state = "ready"
+
+
+
+
+vector_index_service = VectorIndexService()
@@ -0,0 +1,314 @@
+"""
+Background vectorization of admin datasets.
+
+This module runs dataset vectorization as persisted jobs: a bounded pool
+of workers streams the documents extracted from the uploaded file into
+the embedding pipeline, and creates the RAG system only once everything
+is stored.
+The admin request that submits a job returns at once.
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import timedelta
+
+from src.models._base_sqlalchemy import CURRENT_TIME
+from src.operations._admin import (
+    AdminUploadedDatasetContentOperations,
+    AdminUploadedDatasetInfoOperations,
+    VectorizationJobOperations,
+)
+from src.operations._document_hadling import document_service
+from src.operations._llm import RAGSystemOperations
+from src.operations._vector_db import EmbeddingCacheStats, VectorDbService, vector_db_service
+from src.schema._admin import VectorizationJobState
+from src.utils.config import get_config
+from src.utils.logger import app_logger
+from src.utils.metrics import metrics
+
+
+logger = app_logger.getChild("src.operations._vectorization_jobs")
+
+
+ACTIVE_STATES = [VectorizationJobState.QUEUED, VectorizationJobState.RUNNING]
+
+
+class VectorizationJobService:
+    """
+    Bounded worker pool for vectorization jobs.
+
+    Jobs are queued in the ``vectorization_job`` table and in memory;
+    ``max_concurrent_jobs`` workers take them in order. Extraction runs
+    in a worker thread, only as far ahead of the embedding as its queues
+    allow, so the event loop keeps serving requests. Progress is written
+    to the job row every ``progress_interval_seconds`` while documents
+    are stored.
+
+    Several processes (API workers) may share the job table: each claims
+    queued jobs with a conditional update and refreshes the heartbeat of
+    the jobs it runs. A running job whose heartbeat is older than
+    ``stale_after_seconds`` was left by a stopped process and is failed.
+
+    Attributes
+    ----------
+    max_concurrent_jobs : int
+        Jobs running at the same time in this process.
+    heartbeat_interval_seconds : float
+        How often the heartbeat of running jobs is refreshed.
+    stale_after_seconds : float
+        Heartbeat age after which a running job is taken as abandoned.
+    """
+
+    def __init__(self, vector_db: VectorDbService = vector_db_service) -> None:
+        self.vector_db = vector_db
+        self.jobs = VectorizationJobOperations()
+
+        self.max_concurrent_jobs = get_config("vectorization.max_concurrent_jobs", 1)
+        self.progress_interval_seconds = get_config("vectorization.progress_interval_seconds", 2)
+        self.heartbeat_interval_seconds = get_config("vectorization.heartbeat_interval_seconds", 10)
+        self.stale_after_seconds = get_config("vectorization.stale_after_seconds", 60)
+
+        self._queue: asyncio.Queue[uuid.UUID] | None = None
+        self._workers: list[asyncio.Task] = []
+        self._heartbeat: asyncio.Task | None = None
+        self._running: dict[uuid.UUID, asyncio.Task] = {}
+        # jobs creating their RAG system, past the point where they can be cancelled
+        self._finalizing: set[uuid.UUID] = set()
+
+        metrics.register_collector("vectorization_jobs", self.stats)
+
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": len(self._running),
+        }
+
+    async def start(self) -> None:
+        """Start the workers and take over the jobs left by the previous run."""
+        if self._workers:
+            return
+
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_concurrent_jobs)]
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+        # running jobs of live processes keep their heartbeat and are left alone
+        await self._fail_stale_jobs()
+        # every process queues them; the claim in _run lets one of them run each
+        for job in await self.jobs.list_by_state([VectorizationJobState.QUEUED]):
+            self._queue.put_nowait(job.id)
+
+    async def close(self) -> None:
+        tasks = self._workers + ([self._heartbeat] if self._heartbeat is not None else [])
+        for task in tasks:
+            _ = task.cancel()
+        _ = await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._heartbeat = None
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval_seconds)
+            try:
+                if self._running:
+                    await self.jobs.heartbeat(list(self._running))
+                await self._fail_stale_jobs()
+            except Exception as e:
+                logger.error(f"Error refreshing vectorization job heartbeats: {str(e)}")
+
+    async def _fail_stale_jobs(self) -> None:
+        stale_before = CURRENT_TIME() - timedelta(seconds=self.stale_after_seconds)
+        for job_id, dataset_id in await self.jobs.fail_stale(stale_before, error="Interrupted: its process stopped"):
+            # stopped halfway, its partial vectors are dropped
+            await self.vector_db.delete_vectore_table(dataset_id=dataset_id)
+            metrics.increment("vectorization.interrupted")
+            logger.warning(f"Failed vectorization job {job_id}, abandoned by a stopped process")
+
+
+    async def submit(self, dataset_id: uuid.UUID, rag_name: str):
+        """
+        Queue the vectorization of a dataset.
+
+        Raises
+        ------
+        ValueError
+            If the dataset does not exist, is already vectorized or has a
+            job queued or running.
+        """
+        dataset = await AdminUploadedDatasetInfoOperations().get_by_dataset_id(dataset_id=dataset_id)
+        if dataset is None:
+            raise ValueError(f"Dataset with ID {dataset_id} not found")
+        if dataset.is_vectorized:
+            raise ValueError(f"Dataset with ID {dataset_id} is already vectorized")
+        if await self.jobs.get_active_by_dataset_id(dataset_id=dataset_id) is not None:
+            raise ValueError(f"Dataset with ID {dataset_id} already has a vectorization job")
+
+        job = await self.jobs.create(dataset_id=dataset_id, rag_name=rag_name)
+        await self.start()
+        self._queue.put_nowait(job.id)
+        metrics.increment("vectorization.submitted")
+        logger.info(f"Queued vectorization job {job.id} for dataset {dataset_id}")
+        return job
+
+    async def cancel(self, job_id: uuid.UUID) -> bool:
+        """
+        Cancel a queued or running job.
+
+        Returns
+        -------
+        bool
+            False if the job had already finished or is finishing.
+        """
+        if job_id in self._finalizing:
+            return False
+        
+        # the database orders this against the move to finalizing: only one of them applies
+        cancelled = await self.jobs.update(
+            job_id,
+            only_if_state=ACTIVE_STATES,
+            unless_stage="finalizing",
+            state=VectorizationJobState.CANCELLED,
+            finished_at=CURRENT_TIME(),
+        )
+        # a running job is stopped here; a queued one is skipped by the worker, and one
+        # that reached finalizing meanwhile stops by itself when it sees the state
+        task = self._running.get(job_id)
+        if cancelled and task is not None and job_id not in self._finalizing:
+            _ = task.cancel()
+        return cancelled
+
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            task = asyncio.create_task(self._run(job_id))
+            self._running[job_id] = task
+            try:
+                _ = await asyncio.gather(task, return_exceptions=True)
+            finally:
+                self._running.pop(job_id, None)
+
+    async def _run(self, job_id: uuid.UUID) -> None:
+        job = await self.jobs.get(job_id)
+        started = job is not None and await self.jobs.update(
+            job_id,
+            only_if_state=[VectorizationJobState.QUEUED],
+            state=VectorizationJobState.RUNNING,
+            stage="loading",
+            started_at=CURRENT_TIME(),
+            heartbeat_at=CURRENT_TIME(),
+        )
+        if not started:
+            # cancelled (or gone) while queued
+            return
+
+        start = time.perf_counter()
+        try:
+            await self._vectorize(job)
+        except asyncio.CancelledError:
+            await self.vector_db.delete_vectore_table(dataset_id=job.dataset_id)
+            # cancel() writes the cancelled state first, so a job still running was stopped by a shutdown
+            interrupted = await self.jobs.update(
+                job_id,
+                only_if_state=[VectorizationJobState.RUNNING],
+                state=VectorizationJobState.FAILED,
+                error="Interrupted by a shutdown",
+                finished_at=CURRENT_TIME(),
+            )
+            if interrupted:
+                metrics.increment("vectorization.interrupted")
+                logger.warning(f"Vectorization job {job_id} interrupted by a shutdown")
+            else:
+                metrics.increment("vectorization.cancelled")
+                logger.info(f"Cancelled vectorization job {job_id}")
+        except Exception as e:
+            await self.vector_db.delete_vectore_table(dataset_id=job.dataset_id)
+            # a job failed meanwhile as abandoned (or cancelled) keeps that state
+            await self.jobs.update(
+                job_id,
+                only_if_state=[VectorizationJobState.RUNNING],
+                state=VectorizationJobState.FAILED,
+                error=str(e),
+                finished_at=CURRENT_TIME(),
+            )
+            metrics.increment("vectorization.failed")
+            logger.error(f"Error in vectorization job {job_id}: {str(e)}")
+        else:
+            metrics.increment("vectorization.succeeded")
+            metrics.observe("vectorization.duration_s", time.perf_counter() - start)
+
+    async def _vectorize(self, job) -> None:
+        dataset = await AdminUploadedDatasetInfoOperations().get_by_dataset_id(dataset_id=job.dataset_id)
+        content = await AdminUploadedDatasetContentOperations().get_content(dataset_id=job.dataset_id)
+        if dataset is None or content is None:
+            raise ValueError(f"Dataset with ID {job.dataset_id} not found")
+
+        # extraction and embedding overlap; the total is known once the file is read through
+        documents = document_service.aiter_documents(file_content=content, file_format=dataset.dataset_type)
+        await self.jobs.update(job.id, stage="embedding", processed=0)
+        last_report = time.monotonic()
+        report: asyncio.Task | None = None
+        cache_stats = EmbeddingCacheStats()
+
+        def on_progress(stored: int, total: int | None) -> None:
+            nonlocal last_report, report
+            # one progress write in flight at a time, at most every progress_interval_seconds
+            if time.monotonic() - last_report < self.progress_interval_seconds or (report and not report.done()):
+                return
+            last_report = time.monotonic()
+            report = asyncio.create_task(self.jobs.update(
+                job.id,
+                processed=stored,
+                embedding_cache_hits=cache_stats.hits,
+                embedding_cache_misses=cache_stats.misses,
+            ))
+
+        stored = await self.vector_db.add_documents(
+            documents=documents,
+            dataset_id=job.dataset_id,
+            on_progress=on_progress,
+            cache_stats=cache_stats,
+        )
+        if report is not None:
+            _ = await asyncio.gather(report, return_exceptions=True)
+
+        # the RAG system only appears once every document is stored
+        self._finalizing.add(job.id)
+        try:
+            await self._finalize(job, stored=stored, cache_stats=cache_stats)
+        finally:
+            self._finalizing.discard(job.id)
+
+    async def _finalize(self, job, stored: int, cache_stats: EmbeddingCacheStats) -> None:
+        finalizing = await self.jobs.update(
+            job.id,
+            only_if_state=[VectorizationJobState.RUNNING],
+            stage="finalizing",
+            processed=stored,
+            total=stored,
+            embedding_cache_hits=cache_stats.hits,
+            embedding_cache_misses=cache_stats.misses,
+        )
+        if not finalizing:
+            # cancelled after the last document was stored; cleaned up like any cancel
+            raise asyncio.CancelledError()
+        _ = await AdminUploadedDatasetInfoOperations().change_vectorize_status(
+            dataset_id=job.dataset_id,
+            is_vectorized=True,
+        )
+        rag_system = await RAGSystemOperations().create(name=job.rag_name, dataset_id=job.dataset_id)
+        await self.jobs.update(
+            job.id,
+            state=VectorizationJobState.SUCCEEDED,
+            stage=None,
+            rag_system_id=rag_system.id,
+            finished_at=CURRENT_TIME(),
+        )
+        logger.info(f"Vectorization job {job.id} created RAG system {rag_system.id}")
+
+
+
+
+vectorization_job_service = VectorizationJobService()
@@ -3,7 +3,7 @@
 from enum import Enum
 import uuid
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, computed_field
 from datetime import datetime
 
 
@@ -12,3 +12,36 @@ class AdminUploadedDatasetType(str, Enum):
     WORD = "docx"
     CSV = "csv"
 
+
+class VectorizationJobState(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class VectorizationJobOutput(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: uuid.UUID
+    dataset_id: uuid.UUID
+    rag_name: str
+    state: VectorizationJobState
+    stage: str | None = None
+    processed: int = 0
+    total: int | None = None
+    error: str | None = None
+    embedding_cache_hits: int = 0
+    embedding_cache_misses: int = 0
+    rag_system_id: uuid.UUID | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    @computed_field
+    @property
+    def embedding_cache_hit_ratio(self) -> float | None:
+        embedded = self.embedding_cache_hits + self.embedding_cache_misses
+        return self.embedding_cache_hits / embedded if embedded else None
+
@@ -4,9 +4,11 @@ Utility modules for the MultiRAG application.
 
 from src.utils.config import get_config
 from src.utils.logger import setup_logger, app_logger
+from src.utils.metrics import metrics
 
 __all__ = [
     "get_config",
     "setup_logger",
     "app_logger",
+    "metrics",
 ]
@@ -0,0 +1,180 @@
+"""
+In-process caches for the MultiRAG application.
+
+This module provides a small size-bounded LRU cache used to keep
+expensive-to-build objects (vector store handles, scores, ...)
+alive between requests, and a variant whose entries also expire.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Iterator, Optional, TypeVar
+
+from src.utils.logger import app_logger
+
+# Set up logger
+logger = app_logger.getChild("src.utils.cache")
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Size-bounded least-recently-used cache.
+
+    Attributes
+    ----------
+    max_size : int
+        Maximum number of entries kept in the cache.
+    on_evict : Callable[[K, V], Any], optional
+        Called with the key and value of every evicted entry.
+    hits : int
+        Number of successful lookups.
+    misses : int
+        Number of failed lookups.
+    """
+
+    def __init__(self, max_size: int = 128, on_evict: Optional[Callable[[K, V], Any]] = None) -> None:
+        """
+        Initialize the cache.
+
+        Parameters
+        ----------
+        max_size : int, optional
+            Maximum number of entries. Default is 128.
+        on_evict : Callable[[K, V], Any], optional
+            Eviction callback.
+        """
+        self.max_size = max_size
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[K, V]" = OrderedDict()
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """
+        Return the cached value and mark it as recently used.
+
+        Parameters
+        ----------
+        key : K
+            Cache key.
+        default : V, optional
+            Value returned when the key is not cached.
+
+        Returns
+        -------
+        V or None
+            The cached value, or ``default``.
+        """
+        if key in self._data:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+        self.misses += 1
+        return default
+
+    def put(self, key: K, value: V) -> None:
+        """
+        Insert or replace a value, evicting the oldest entries if needed.
+
+        Parameters
+        ----------
+        key : K
+            Cache key.
+        value : V
+            Value to cache.
+        """
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            old_key, old_value = self._data.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(old_key, old_value)
+
+    def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Remove a key and return its value (no eviction callback)."""
+        return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._data.clear()
+
+    def stats(self) -> dict:
+        """Return size and hit/miss counts of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(list(self._data))
+
+
+class TTLCache(LRUCache[K, V]):
+    """
+    Size-bounded LRU cache whose entries expire ``ttl`` seconds after being put.
+
+    Expired entries count as misses and are dropped when looked up.
+
+    Attributes
+    ----------
+    ttl : float
+        Lifetime of an entry in seconds.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 128, on_evict: Optional[Callable[[K, V], Any]] = None) -> None:
+        """
+        Initialize the cache.
+
+        Parameters
+        ----------
+        ttl : float
+            Lifetime of an entry in seconds.
+        max_size : int, optional
+            Maximum number of entries. Default is 128.
+        on_evict : Callable[[K, V], Any], optional
+            Eviction callback (not called for expired entries).
+        """
+        super().__init__(max_size=max_size, on_evict=self._evicted)
+        self.ttl = ttl
+        self._on_evict = on_evict
+        self._expires_at: dict[K, float] = {}
+
+    def _evicted(self, key: K, value: V) -> None:
+        self._expires_at.pop(key, None)
+        if self._on_evict is not None:
+            self._on_evict(key, value)
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        expires_at = self._expires_at.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.pop(key)
+        return super().get(key, default)
+
+    def put(self, key: K, value: V) -> None:
+        self._expires_at[key] = time.monotonic() + self.ttl
+        super().put(key, value)
+
+    def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        self._expires_at.pop(key, None)
+        return super().pop(key, default)
+
+    def clear(self) -> None:
+        self._expires_at.clear()
+        super().clear()
+
+    def stats(self) -> dict:
+        return {**super().stats(), "ttl": self.ttl}
+
@@ -0,0 +1,146 @@
+"""
+In-process metrics for the MultiRAG application.
+
+This module provides a small registry of counters, gauges and
+value summaries, plus pluggable collectors that report live
+statistics (e.g. connection pool usage) on demand.
+"""
+
+from collections import defaultdict
+from threading import Lock
+from typing import Any, Callable, Dict
+
+from src.utils.logger import app_logger
+
+# Set up logger
+logger = app_logger.getChild("src.utils.metrics")
+
+
+class MetricsRegistry:
+    """
+    Registry of application metrics.
+
+    Counters and summaries are updated from request handlers and
+    background workers; collectors are callables evaluated lazily
+    whenever a snapshot is taken.
+
+    Attributes
+    ----------
+    counters : Dict[str, int]
+        Monotonic counters keyed by metric name.
+    gauges : Dict[str, float]
+        Last reported value keyed by metric name.
+    summaries : Dict[str, Dict[str, float]]
+        Count, sum, min, max and last value of observed samples.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.gauges: Dict[str, float] = {}
+        self.summaries: Dict[str, Dict[str, float]] = {}
+        self._collectors: Dict[str, Callable[[], Any]] = {}
+        self._lock = Lock()
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """
+        Increment a counter.
+
+        Parameters
+        ----------
+        name : str
+            Name of the counter.
+        value : int, optional
+            Amount to add. Default is 1.
+        """
+        with self._lock:
+            self.counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """
+        Set the current value of a gauge.
+
+        Parameters
+        ----------
+        name : str
+            Name of the gauge.
+        value : float
+            Current value.
+        """
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        """
+        Record a sample for a summary metric.
+
+        Parameters
+        ----------
+        name : str
+            Name of the summary.
+        value : float
+            Observed value (e.g. a latency in milliseconds).
+        """
+        with self._lock:
+            summary = self.summaries.get(name)
+            if summary is None:
+                self.summaries[name] = {
+                    "count": 1,
+                    "sum": value,
+                    "min": value,
+                    "max": value,
+                    "last": value,
+                }
+            else:
+                summary["count"] += 1
+                summary["sum"] += value
+                summary["min"] = min(summary["min"], value)
+                summary["max"] = max(summary["max"], value)
+                summary["last"] = value
+
+    def register_collector(self, name: str, collector: Callable[[], Any]) -> None:
+        """
+        Register a callable reporting live statistics.
+
+        Parameters
+        ----------
+        name : str
+            Key under which the collector output is reported.
+        collector : Callable[[], Any]
+            Function returning a JSON serializable value.
+        """
+        self._collectors[name] = collector
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Take a snapshot of every metric.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Counters, gauges, summaries (with their mean) and
+            the output of every registered collector.
+        """
+        with self._lock:
+            summaries = {
+                name: {**summary, "mean": summary["sum"] / summary["count"]}
+                for name, summary in self.summaries.items()
+            }
+            result: Dict[str, Any] = {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "summaries": summaries,
+            }
+
+        for name, collector in self._collectors.items():
+            try:
+                result[name] = collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector {name} failed: {str(e)}")
+                result[name] = None
+
+        return result
+
+
+# Create a singleton instance
+metrics = MetricsRegistry()
@@ -0,0 +1,122 @@
+import asyncio
+import uuid
+from collections import deque
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.operations._chat_history import ChatHistoryService, _SessionWindow
+
+
+def _window(n_messages: int, tokens_per_message: int = 10, complete: bool = False) -> _SessionWindow:
+    messages = [
+        HumanMessage(content=f"m{i}") if i % 2 == 0 else AIMessage(content=f"m{i}")
+        for i in range(n_messages)
+    ]
+    return _SessionWindow(
+        messages=deque(messages),
+        tokens=deque([tokens_per_message] * n_messages),
+        complete=complete,
+    )
+
+
+class _FakeWriter:
+    enabled = True
+
+    def has_pending(self, session_id: uuid.UUID) -> bool:
+        return False
+
+    async def append_messages(self, messages, user_id, session_id, targets=None) -> None:
+        pass
+
+
+def _service(loaded: list[_SessionWindow]) -> tuple[ChatHistoryService, list[dict]]:
+    service = ChatHistoryService(db=SimpleNamespace(get_psycopg_db=None), writer=_FakeWriter())
+    service.window_messages = 4
+    calls = []
+
+    async def load_tail(user_id, session_id, last_n, max_tokens=None):
+        calls.append({"last_n": last_n, "max_tokens": max_tokens})
+        return loaded.pop(0)
+
+    async def ensure_migrated(conn, user_id):
+        pass
+
+    service._load_tail = load_tail
+    service._ensure_migrated = ensure_migrated
+    return service, calls
+
+
+def test_covers_complete_window():
+    assert _window(2, complete=True).covers(last_n=100, max_tokens=10_000)
+
+
+def test_covers_without_limits():
+    assert not _window(4).covers(last_n=None, max_tokens=None)
+
+
+def test_covers_when_either_limit_is_reached():
+    window = _window(50, tokens_per_message=10)  # 500 tokens
+    # enough messages, though fewer tokens than the budget
+    assert window.covers(last_n=50, max_tokens=2000)
+    # enough tokens, though fewer messages than asked for
+    assert window.covers(last_n=100, max_tokens=400)
+    assert window.covers(last_n=None, max_tokens=500)
+    assert window.covers(last_n=20, max_tokens=None)
+
+
+def test_does_not_cover_past_the_window():
+    window = _window(50, tokens_per_message=10)
+    assert not window.covers(last_n=51, max_tokens=None)
+    assert not window.covers(last_n=None, max_tokens=501)
+    assert not window.covers(last_n=100, max_tokens=2000)
+
+
+def test_append_keeps_a_grown_window():
+    window = _window(6)
+    window.max_messages = 6
+    window.append(HumanMessage(content="new"), token_count=10, max_messages=4)
+    assert len(window.messages) == 6
+    assert window.messages[-1].content == "new"
+
+
+def test_cached_window_serves_later_requests():
+    service, calls = _service([_window(4)])
+    user_id, session_id = uuid.uuid4(), uuid.uuid4()
+
+    first = asyncio.run(service.get_session_messages(user_id, session_id, last_n=3))
+    second = asyncio.run(service.get_session_messages(user_id, session_id, last_n=4))
+
+    assert len(calls) == 1
+    assert [m.content for m in first] == ["m1", "m2", "m3"]
+    assert len(second) == 4
+
+
+def test_miss_reloads_once_and_caches_the_larger_window():
+    service, calls = _service([_window(4), _window(8)])
+    user_id, session_id = uuid.uuid4(), uuid.uuid4()
+
+    messages = asyncio.run(service.get_session_messages(user_id, session_id, last_n=8))
+    assert len(calls) == 2
+    assert calls[1] == {"last_n": 8, "max_tokens": None}
+    assert len(messages) == 8
+
+    # the next turn appends and reads the same tail from the cache
+    asyncio.run(service.add_user_message("next", user_id=user_id, session_id=session_id))
+    messages = asyncio.run(service.get_session_messages(user_id, session_id, last_n=8))
+    assert len(calls) == 2
+    assert messages[-1].content == "next"
+
+
+def test_long_loads_are_not_cached():
+    service, calls = _service([_window(4), _window(300, complete=True), _window(300, complete=True)])
+    service.max_window_messages = 200
+    user_id, session_id = uuid.uuid4(), uuid.uuid4()
+
+    # the whole session, without limits
+    messages = asyncio.run(service.get_session_messages(user_id, session_id))
+    assert len(messages) == 300
+    # the small window stays cached, the next full read loads again
+    assert len(service._windows.get((user_id, session_id)).messages) == 4
+    _ = asyncio.run(service.get_session_messages(user_id, session_id))
+    assert len(calls) == 3
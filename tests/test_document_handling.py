@@ -0,0 +1,48 @@
+import random
+
+from src.operations._document_hadling import _ChunkStream, join_pieces
+from src.operations._text_splitter import TokenTextSplitter
+
+
+def _chunks(pieces: list[str], buffer_chars: int = 120) -> list[tuple[int, str, int, int]]:
+    # sized in characters, no tokenizer needed
+    splitter = TokenTextSplitter(chunk_size=40, chunk_overlap=10)
+    stream = _ChunkStream(splitter.split_spans, buffer_chars=buffer_chars)
+    chunks = [chunk for label, text in enumerate(pieces) for chunk in stream.feed(label, text)]
+    chunks.extend(stream.flush())
+    return chunks
+
+
+def _assert_offsets_match(pieces: list[str]) -> None:
+    document = join_pieces(pieces).encode()
+    chunks = _chunks(pieces)
+    for _, text, start_byte, end_byte in chunks:
+        assert document[start_byte:end_byte].decode() == text
+
+
+def test_offsets_with_leading_empty_pieces():
+    pieces = ["", "", "first page text", "", "second page text"]
+    chunks = _chunks(pieces)
+    assert [text for _, text, _, _ in chunks] == ["first page text\n\n\n\nsecond page text"]
+    _assert_offsets_match(pieces)
+
+
+def test_offsets_of_random_pieces():
+    rng = random.Random(0)
+    words = ["alpha", "beta", "گاما", "délta", "epsilon."]
+    for _ in range(50):
+        pieces = [
+            "" if rng.random() < 0.3 else " ".join(rng.choice(words) for _ in range(rng.randint(1, 60)))
+            for _ in range(rng.randint(1, 12))
+        ]
+        _assert_offsets_match(pieces)
+
+
+def test_chunks_are_labelled_with_the_piece_they_start_in():
+    pieces = ["", "one two three", "", "four five six"]
+    splitter = TokenTextSplitter(chunk_size=14, chunk_overlap=0)
+    stream = _ChunkStream(splitter.split_spans, buffer_chars=0)
+    chunks = [chunk for label, text in enumerate(pieces) for chunk in stream.feed(label, text)]
+    chunks.extend(stream.flush())
+    # empty pieces start where the next one does, which labels the chunk
+    assert [(label, text) for label, text, _, _ in chunks] == [(1, "one two"), (1, "three"), (3, "four five six")]
@@ -0,0 +1,98 @@
+import asyncio
+import uuid
+
+import psycopg
+import pytest
+
+from src.operations._db_setup import PSYCOPG_DB_URI
+
+
+def _database_available() -> bool:
+    try:
+        with psycopg.connect(PSYCOPG_DB_URI, connect_timeout=2) as conn:
+            return conn.execute("SELECT 1 FROM pg_extension WHERE extname = 'vector'").fetchone() is not None
+    except psycopg.Error:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not _database_available(), reason="needs PostgreSQL with pgvector")
+
+
+class _FakeEmbedding:
+    async def aembed_query(self, text: str) -> list[float]:
+        return [1.0, 0.0, 0.0]
+
+
+def _service():
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from src.operations._db_setup import SQLALCHEMY_DB_URI
+    from src.operations._vector_db import VectorDbService
+
+    # only what hybrid search uses, without loading the embedding model
+    service = VectorDbService.__new__(VectorDbService)
+    service.sqlalchemy_engine = create_async_engine(SQLALCHEMY_DB_URI)
+    service.embedding = _FakeEmbedding()
+    service.text_search_config = "simple"
+    service.hybrid_candidate_k = 20
+    service.rrf_k = 60
+    service.score_threshold = 0.5
+    return service
+
+
+async def _search(rows: list[tuple[str, list[float]]], query: str) -> list[str]:
+    from sqlalchemy import text
+
+    service = _service()
+    dataset_id = uuid.uuid4()
+    table_name = service._get_table_name(dataset_id=dataset_id)
+    try:
+        async with service.sqlalchemy_engine.begin() as conn:
+            await conn.execute(text(f"""
+                CREATE TABLE "{table_name}" (
+                    langchain_id uuid PRIMARY KEY,
+                    content text,
+                    embedding vector(3),
+                    langchain_metadata json,
+                    answer text,
+                    content_tsv tsvector GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED
+                )
+            """))
+            for content, embedding in rows:
+                await conn.execute(
+                    text(
+                        f'INSERT INTO "{table_name}" (langchain_id, content, embedding) '
+                        "VALUES (:id, :content, CAST(:embedding AS vector))"
+                    ),
+                    {"id": uuid.uuid4(), "content": content, "embedding": str(embedding)},
+                )
+        docs = await service._hybrid_search(query=query, dataset_id=dataset_id, k=5)
+        return [doc.page_content for doc in docs]
+    finally:
+        async with service.sqlalchemy_engine.begin() as conn:
+            await conn.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
+        await service.sqlalchemy_engine.dispose()
+
+
+def test_lexical_match_survives_low_similarity():
+    # both rows are dense candidates; the exact-term hit is far from the query vector
+    contents = asyncio.run(_search(
+        rows=[
+            ("how retrieval works", [1.0, 0.0, 0.0]),
+            ("error code kx42 means the index is stale", [0.0, 1.0, 0.0]),
+        ],
+        query="kx42",
+    ))
+    assert "error code kx42 means the index is stale" in contents
+    assert "how retrieval works" in contents
+
+
+def test_dense_only_candidates_below_threshold_are_dropped():
+    contents = asyncio.run(_search(
+        rows=[
+            ("how retrieval works", [1.0, 0.0, 0.0]),
+            ("unrelated text", [0.0, 1.0, 0.0]),
+        ],
+        query="nothing matches this",
+    ))
+    assert contents == ["how retrieval works"]
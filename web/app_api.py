@@ -6,8 +6,17 @@ from src.utils.config import get_config
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from src.operations._db_setup import setup_sqlalchemy, setup_langgraph_db
+from src.operations._db_setup import setup_sqlalchemy, setup_langgraph_db, close_db
+from src.operations._chat_history import setup_chat_history
+from src.operations._chat_writer import chat_writer
+from src.operations._memory import memory_service
+from src.operations._vector_db import setup_vector_db
+from src.operations._vector_index import vector_index_service
+from src.operations._vectorization_jobs import vectorization_job_service
+from src.operations._document_hadling import document_service
 from src.llm._llm_setup import setup_llm
+from src.llm._summarizer import summarizer
+from src.llm._memory_extractor import memory_extractor
 # from src.models import (_admin, _association_tables, _llm, _user)
 
 
@@ -22,10 +31,20 @@ async def lifespan(app: FastAPI):
     setup_llm()
     await setup_langgraph_db()
     await setup_sqlalchemy()
+    await setup_chat_history()
+    await setup_vector_db()
+    await vectorization_job_service.start()
 
     yield
     # after app shoutdown
-    pass
+    await vectorization_job_service.close()
+    document_service.close()
+    await vector_index_service.close()
+    await summarizer.close()
+    await memory_extractor.close()
+    await memory_service.close()
+    await chat_writer.close()
+    await close_db()
 
 
 
@@ -0,0 +1,23 @@
+from fastapi import HTTPException, status
+
+
+
+
+class DatasetNotFound(HTTPException):
+    def __init__(self):
+        self.status_code = status.HTTP_404_NOT_FOUND
+        self.detail = "Dataset not found."
+
+
+
+class JobNotFound(HTTPException):
+    def __init__(self):
+        self.status_code = status.HTTP_404_NOT_FOUND
+        self.detail = "Vectorization job not found."
+
+
+
+class JobConflict(HTTPException):
+    def __init__(self, detail: str):
+        self.status_code = status.HTTP_409_CONFLICT
+        self.detail = detail
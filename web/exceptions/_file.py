@@ -29,6 +29,12 @@ class ValidationErrorHTTP(HTTPException):
         detail= error
 
 
+class InvalidDatasetContent(HTTPException):
+    def __init__(self, error: str):
+        self.status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+        self.detail = error
+
+
 class SavingFile(HTTPException):
     def __init__(self):
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Body
+from fastapi import APIRouter, Body, status
 
 import uuid
 
-from src.operations._admin import AdminUploadedDatasetContentOperations, AdminUploadedDatasetInfoOperations
+from src.operations._admin import AdminUploadedDatasetInfoOperations, VectorizationJobOperations
 from src.operations._association_operations import UserRAGSystemJunctionOperations
 from src.operations._chat_history import chat_history_service
-from src.operations._document_hadling import document_service
 from src.operations._llm import RAGSystemOperations
+from src.operations._memory import memory_service
 from src.operations._user import UserOperations
 from src.operations._vector_db import vector_db_service
+from src.operations._vectorization_jobs import vectorization_job_service
+from src.schema._admin import VectorizationJobOutput
+from src.utils.metrics import metrics
+from web.exceptions._admin import DatasetNotFound, JobConflict, JobNotFound
 from web.schema._admin import UserAccessInput, ChangeNameRAGSystemInput, CreateRAGSystemInput, GetRAGSystemOutput, GetUserOutput, ListAllDatasetsInput, UserCreateInput
 
 
@@ -44,6 +48,7 @@ async def list_all_users():
 async def delete_user(user_id: uuid.UUID):
     await UserOperations().delete(user_id=user_id)
     await chat_history_service.delete_user_chat_history(user_id=user_id)
+    await memory_service.delete_memory_by_user_id(user_id=str(user_id))
     return {"message": "User successfuly deleted"}
 
 
@@ -57,27 +62,40 @@ async def delete_user(user_id: uuid.UUID):
 # async def upload_dataset():
 #     pass
 
-@admin_router.post("/dataset", tags=["Admin-Dataset Management"])
-async def vectorize_dataset_and_create_rag_system(data: CreateRAGSystemInput = Body()):
-    dataset_info = await AdminUploadedDatasetInfoOperations().get_by_dataset_id(dataset_id=data.dataset_id)
-    dataset_content = await AdminUploadedDatasetContentOperations().get_content(dataset_id=data.dataset_id)
-    documents = document_service.to_documents(
-        file_format=dataset_info.dataset_type,
-        file_content=dataset_content,
-    )
-    await vector_db_service.add_documents(
-        documents=documents,
-        dataset_id=data.dataset_id,
-    )
-    _ = await AdminUploadedDatasetInfoOperations().change_vectorize_status(
-        dataset_id=data.dataset_id,
-        is_vectorized=True,
-    )
-    rag_system = await RAGSystemOperations().create(
-        name=data.rag_name,
-        dataset_id=data.dataset_id,
-    )
-    return rag_system
+@admin_router.post("/dataset", status_code=status.HTTP_202_ACCEPTED, tags=["Admin-Dataset Management"])
+async def vectorize_dataset_and_create_rag_system(data: CreateRAGSystemInput = Body()) -> VectorizationJobOutput:
+    # parsing, embedding and indexing run in a background job; the RAG system is created when it succeeds
+    if await AdminUploadedDatasetInfoOperations().get_info(dataset_id=data.dataset_id) is None:
+        raise DatasetNotFound
+    try:
+        job = await vectorization_job_service.submit(dataset_id=data.dataset_id, rag_name=data.rag_name)
+    except ValueError as e:
+        raise JobConflict(str(e))
+    return job
+
+
+@admin_router.get("/dataset/job", tags=["Admin-Dataset Management"])
+async def get_vectorization_job(job_id: uuid.UUID) -> VectorizationJobOutput:
+    job = await VectorizationJobOperations().get(job_id=job_id)
+    if job is None:
+        raise JobNotFound
+    return job
+
+
+@admin_router.get("/dataset/jobs", tags=["Admin-Dataset Management"])
+async def list_vectorization_jobs(dataset_id: uuid.UUID) -> list[VectorizationJobOutput]:
+    jobs = await VectorizationJobOperations().list_by_dataset_id(dataset_id=dataset_id)
+    return jobs
+
+
+@admin_router.delete("/dataset/job", tags=["Admin-Dataset Management"])
+async def cancel_vectorization_job(job_id: uuid.UUID):
+    job = await VectorizationJobOperations().get(job_id=job_id)
+    if job is None:
+        raise JobNotFound
+    if not await vectorization_job_service.cancel(job_id=job_id):
+        raise JobConflict(f"Vectorization job {job_id} has already finished.")
+    return {"message": f"Vectorization job {job_id} cancelled."}
 
 
 
@@ -90,8 +108,17 @@ async def list_all_datasets(is_vectorized: bool | None = None):
     return datasets
 
 
+@admin_router.get("/dataset/index", tags=["Admin-Dataset Management"])
+async def get_dataset_index_status(dataset_id: uuid.UUID):
+    index_status = await vector_db_service.get_index_status(dataset_id=dataset_id)
+    return index_status
+
+
 @admin_router.delete("/dataset", tags=["Admin-Dataset Management"])
 async def delete_dataset_and_rag_system(dataset_id: uuid.UUID):
+    job = await VectorizationJobOperations().get_active_by_dataset_id(dataset_id=dataset_id)
+    if job is not None:
+        _ = await vectorization_job_service.cancel(job_id=job.id)
     await vector_db_service.delete_vectore_table(dataset_id=dataset_id)
     await AdminUploadedDatasetInfoOperations().delete(dataset_id=dataset_id)
     return {"message": "Dataset successfully deleted."}
@@ -179,3 +206,13 @@ async def remove_user_access(data: UserAccessInput = Body()):
     )
     return {"message": "Access removed successfully."}
 
+
+
+
+
+#### monitoring
+
+
+@admin_router.get("/metrics", tags=["Admin-Monitoring"])
+async def get_metrics():
+    return metrics.snapshot()
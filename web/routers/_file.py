@@ -11,7 +11,8 @@ from pydantic import ValidationError
 
 from src.operations._admin import AdminUploadedDatasetContentOperations, AdminUploadedDatasetInfoOperations
 from src.utils.config import get_config
-from web.exceptions._file import FileNotFound, SavingFile, ValidationErrorHTTP
+from src.operations._document_hadling import document_service
+from web.exceptions._file import FileNotFound, InvalidDatasetContent, SavingFile, ValidationErrorHTTP
 from web.schema._file import DownloadFileInput, UploadFileInput
 from web.utils._file import validate_file
 
@@ -44,6 +45,9 @@ async def upload_file(file: UploadFile = File(...), data: UploadFileInput = Depe
             shutil.copyfileobj(file.file, f)
         with open(file_path, "rb") as f:
             content = f.read()
+        if file_path.suffix.lower() == ".csv":
+            # a CSV without question/answer columns would only fail at vectorization
+            document_service.validate_csv(content)
         file_size_mb = f"{os.path.getsize(file_path) / (1024*1024):.2f}"
         file_size_mb = float(file_size_mb)
         dataset = await AdminUploadedDatasetInfoOperations().create(
@@ -58,6 +62,9 @@ async def upload_file(file: UploadFile = File(...), data: UploadFileInput = Depe
             content=content,
         )
     except ValidationError as e: raise ValidationErrorHTTP(e.json(indent=2))
+    except ValueError as e:
+        file_path.unlink(missing_ok=True)
+        raise InvalidDatasetContent(str(e))
     except Exception: raise SavingFile
     
     try:
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Body
+from fastapi import APIRouter, Body, Header, Query
 
+import asyncio
 import uuid
 
 from fastapi.responses import StreamingResponse
 
 from src.llm._llm_factory import create_llm
+from src.llm._streaming import MEDIA_TYPES, StreamFormat, negotiate_stream_format
 from src.operations._chat_history import chat_history_service
 from src.operations._llm import ChatSessionOperations
 from web.schema._user import ChatInput, CreateChatSessionInput, DeleteChatSessionInput, ReturnChatHistoryInput
@@ -42,6 +44,14 @@ async def list_chat_sessions(user_id: uuid.UUID):
 
 @user_router.post("/chat/history")
 async def return_history_for_a_chat_session(data: ReturnChatHistoryInput = Body()):
+    if data.limit is not None or data.before_id is not None:
+        return await chat_history_service.get_session_messages_page(
+            user_id=data.user_id,
+            session_id=data.session_id,
+            before_id=data.before_id,
+            limit=data.limit,
+        )
+    
     chat_history = await chat_history_service.get_session_messages(
         user_id=data.user_id,
         session_id=data.session_id,
@@ -61,18 +71,36 @@ async def delete_chat_session(data: DeleteChatSessionInput = Body()):
     
 
 @user_router.post("/chat")
-async def chat(data: ChatInput = Body()):
-    llm = await create_llm(
-        llm_type=data.llm_type,
-        user_id=data.user_id,
-        session_id=data.session_id,
-        rag_system_id=data.rag_system_id,
-    )
-    await ChatSessionOperations().update_last_active(session_id=data.session_id)
+async def chat(
+    data: ChatInput = Body(),
+    stream: StreamFormat | None = Query(default=None),
+    progress: bool = Query(default=False),
+    accept: str | None = Header(default=None),
+):
+    stream_format = negotiate_stream_format(stream=stream, accept=accept)
+    # metadata lookups, the session touch and the history window load overlap
+    try:
+        async with asyncio.TaskGroup() as tg:
+            llm_task = tg.create_task(create_llm(
+                llm_type=data.llm_type,
+                user_id=data.user_id,
+                session_id=data.session_id,
+                rag_system_id=data.rag_system_id,
+            ))
+            _ = tg.create_task(ChatSessionOperations().update_last_active(session_id=data.session_id))
+            _ = tg.create_task(chat_history_service.warm_session(user_id=data.user_id, session_id=data.session_id))
+    except ExceptionGroup as eg:
+        raise eg.exceptions[0]
+    llm, config = llm_task.result()
 
     return StreamingResponse(
-        content=llm.generate_chat_response(user_query=data.user_prompt),
-        media_type="application/x-ndjson; charset=utf-8",
+        content=llm.generate_chat_response(
+            user_query=data.user_prompt,
+            config=config,
+            stream_format=stream_format,
+            progress=progress,
+        ),
+        media_type=MEDIA_TYPES[stream_format],
     )
 
 
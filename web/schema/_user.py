@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import uuid
 
 
@@ -15,6 +15,9 @@ class CreateChatSessionInput(BaseModel):
 class ReturnChatHistoryInput(BaseModel):
     user_id: uuid.UUID
     session_id: uuid.UUID
+    # set limit to page through the session backwards, newest page first
+    limit: int | None = Field(default=None, gt=0)
+    before_id: int | None = None
 
 
 class DeleteChatSessionInput(BaseModel):